@@ -0,0 +1,84 @@
+"""End-to-end time saved by validating scripts before they reach the main thread.
+
+Run from the repository root::
+
+    python benchmarks/bench_pipeline.py [latency_ms] [tick_ms]
+
+A fake provider answers after *latency_ms*; running a script first waits for
+the next dispatcher tick (*tick_ms*). The naive path compiles the raw text
+on the main thread and, when it fails, asks again with the error; the
+pipeline path extracts and checks the code on the worker and only re-asks
+when the code itself is broken.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+try:
+    import bpy  # noqa: F401  (running inside ``blender -b``)
+except ModuleNotFoundError:
+    sys.path.insert(0, str(ROOT / "tests"))
+    import conftest  # noqa: F401  installs the fake bpy
+
+from blendair import pipeline  # noqa: E402
+
+GOOD = "total = sum(i * i for i in range(1000))"
+# First response per prompt, followed by the provider's answer to a retry.
+CASES = {
+    "clean": [GOOD],
+    "fenced": ["Sure! Here is the script:\n```python\n" + GOOD + "\n```\nLet me know.", GOOD],
+    "syntax error": ["total = sum(i * i for i in range(1000)", GOOD],
+    "forbidden import": ["import os\n" + GOOD, GOOD],
+}
+
+
+def _provider(responses, latency):
+    answers = iter(responses)
+
+    def fetch(prompt, attempt=0):
+        time.sleep(latency)
+        return next(answers, responses[-1])
+    return fetch
+
+
+def naive(responses, latency, tick):
+    fetch = _provider(responses, latency)
+    while True:
+        text = fetch("prompt")
+        time.sleep(tick)  # queued for the main thread
+        try:
+            exec(compile(text, "<naive>", "exec"), {})
+            return
+        except SyntaxError:
+            continue
+        # A forbidden import would simply run here.
+
+
+def checked(responses, latency, tick):
+    prepared = pipeline.fetch_prepared(_provider(responses, latency), "prompt", retries=2)
+    time.sleep(tick)
+    exec(prepared.code, {})
+
+
+def main(latency_ms=200.0, tick_ms=20.0):
+    latency, tick = latency_ms / 1000, tick_ms / 1000
+    print(f"provider latency {latency_ms:.0f} ms, dispatcher tick {tick_ms:.0f} ms")
+    print(f"{'case':18} {'naive':>10} {'pipeline':>10} {'saved':>10}")
+    for name, responses in CASES.items():
+        results = []
+        for run in (naive, checked):
+            start = time.perf_counter()
+            run(responses, latency, tick)
+            results.append((time.perf_counter() - start) * 1000)
+        note = "  (naive ran the os import)" if name == "forbidden import" else ""
+        print(f"{name:18} {results[0]:8.1f}ms {results[1]:8.1f}ms {results[0] - results[1]:8.1f}ms{note}")
+    stats = pipeline.stats()
+    print(f"check cost: {stats['check_time'] / max(1, stats['prepared']) * 1e6:.0f} us per script")
+
+
+if __name__ == "__main__":
+    args = [float(a) for a in sys.argv[1:3]]
+    main(*args)
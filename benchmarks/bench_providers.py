@@ -0,0 +1,75 @@
+"""Micro-benchmark of per-provider request build + response parse overhead.
+
+Run from the repository root::
+
+    python benchmarks/bench_providers.py [iterations]
+
+Outside Blender the fake ``bpy`` from ``tests/conftest.py`` is installed so
+the add-on package can be imported.
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+try:
+    import bpy  # noqa: F401  (running inside ``blender -b``)
+except ModuleNotFoundError:
+    sys.path.insert(0, str(ROOT / "tests"))
+    import conftest  # noqa: F401  installs the fake bpy
+
+from blendair import providers  # noqa: E402
+
+PROMPT = "Add a 3-point light rig around the selected object"
+SCRIPT = "import bpy\nbpy.ops.object.light_add(type='AREA')\n"
+
+_CHAT = json.dumps({"choices": [{"message": {"content": SCRIPT}}]})
+SAMPLE_BODIES = {
+    "blendair_cloud": json.dumps({"script": SCRIPT}),
+    "local": json.dumps({"script": SCRIPT}),
+    "openai": _CHAT,
+    "grok": _CHAT,
+    "deepseek": _CHAT,
+    "pplx": _CHAT,
+    "gemini": json.dumps({"candidates": [{"content": {"parts": [{"text": SCRIPT}]}}]}),
+    "huggingface": json.dumps([{"generated_text": SCRIPT}]),
+    "anthropic": json.dumps({"content": [{"text": SCRIPT}]}),
+    "replicate": json.dumps({"output": SCRIPT}),
+}
+
+
+class _Prefs:
+    """Preferences with every API key filled in."""
+
+    def __getattr__(self, name):
+        if name.endswith(("_api_key", "_api_token")):
+            return "bench-key"
+        if name == "local_llm_endpoint":
+            return "http://localhost:8000/generate"
+        raise AttributeError(name)
+
+
+def bench(iterations: int) -> dict:
+    prefs = _Prefs()
+    results = {}
+    for name, body in SAMPLE_BODIES.items():
+        start = time.perf_counter()
+        for _ in range(iterations):
+            adapter = providers.PROVIDERS[name]
+            adapter.request(prefs, PROMPT)
+            adapter.parse_response(json.loads(body))
+        results[name] = (time.perf_counter() - start) / iterations * 1e6
+    return results
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    for name, micros in bench(iterations).items():
+        print(f"{name:16s} {micros:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    main()
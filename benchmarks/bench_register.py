@@ -0,0 +1,87 @@
+"""Wall time and imported modules of ``blendair.register()``.
+
+Run from the repository root::
+
+    python benchmarks/bench_register.py [runs]
+
+Each measurement runs in a fresh interpreter, so module imports are not
+shared between runs:
+
+* ``cold``: dependency cache removed, so every package is probed,
+* ``warm``: probe results come from the on-disk cache,
+* ``import probe``: the old check, which imported each package.
+
+Outside Blender the fake ``bpy`` from ``tests/conftest.py`` is used.
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("cv2", "mediapipe", "supabase", "blendluxcore")
+
+
+def _child(mode):
+    sys.path.insert(0, str(ROOT))
+    try:
+        import bpy  # noqa: F401  (running inside ``blender -b``)
+    except ModuleNotFoundError:
+        sys.path.insert(0, str(ROOT / "tests"))
+        import conftest  # noqa: F401  installs the fake bpy
+        import bpy
+        # Pieces register() touches that the test stub leaves out.
+        bpy.context.window_manager = SimpleNamespace(popup_menu=lambda *_, **__: None, windows=())
+        bpy.props.CollectionProperty = lambda *_, **__: None
+    before = set(sys.modules)
+    start = time.perf_counter()
+    import blendair
+    from blendair import deps
+    if mode == "cold":
+        deps.invalidate()
+    elif mode == "import probe":
+        deps.missing_packages = lambda refresh=False: [
+            pkg for pkg, module in deps.PACKAGES.items() if not _imports(module)]
+    probe_start = time.perf_counter()
+    deps.missing_packages()
+    probe = time.perf_counter() - probe_start
+    blendair.register()
+    elapsed = time.perf_counter() - start
+    imported = set(sys.modules) - before
+    blendair.unregister()
+    print(json.dumps({"seconds": elapsed, "probe": probe, "modules": len(imported),
+                      "heavy": sorted(name for name in imported if name.split(".")[0] in HEAVY)}))
+
+
+def _imports(module):
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def main(runs=5):
+    for mode in ("cold", "warm", "import probe"):
+        results = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, __file__, "--child", mode], capture_output=True,
+                                 text=True, check=True).stdout
+            results.append(json.loads(out.strip().splitlines()[-1]))
+        times = [r["seconds"] * 1000 for r in results]
+        probes = [r["probe"] * 1000 for r in results]
+        heavy = sorted({name.split(".")[0] for r in results for name in r["heavy"]})
+        print(f"{mode:<13} register {statistics.median(times):8.1f} ms  "
+              f"dependency check {statistics.median(probes):8.2f} ms  "
+              f"modules imported {results[-1]['modules']:5d}  heavy: {', '.join(heavy) or 'none'}")
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        _child(sys.argv[sys.argv.index("--child") + 1])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,83 @@
+"""Per-object ``bpy.ops`` loops versus their data-API rewrite.
+
+Run inside Blender on a synthetic scene (default 10,000 objects)::
+
+    blender -b --factory-startup -P benchmarks/bench_rewrite.py -- [objects]
+
+The original script selects each object and calls transform and modifier
+operators; the rewritten one is what :mod:`blendair.rewrite` produces. Both
+run on the same scene and their wall times are compared. Outside Blender
+only the cost of the rewrite pass itself is measured.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+try:
+    import bpy
+    IN_BLENDER = hasattr(bpy.types, "Object")
+except ModuleNotFoundError:
+    sys.path.insert(0, str(ROOT / "tests"))
+    import conftest  # noqa: F401  installs the fake bpy
+    IN_BLENDER = False
+
+from blendair import pipeline, rewrite  # noqa: E402
+
+TRANSFORM_SCRIPT = """import bpy
+for obj in bpy.data.objects:
+    bpy.ops.object.select_all(action='DESELECT')
+    obj.select_set(True)
+    bpy.context.view_layer.objects.active = obj
+    bpy.ops.transform.translate(value=(0, 0, 0.5))
+    bpy.ops.transform.resize(value=(1.1, 1.1, 1.1))
+"""
+MODIFIER_SCRIPT = """import bpy
+for obj in bpy.data.objects:
+    bpy.context.view_layer.objects.active = obj
+    bpy.ops.object.modifier_add(type='BEVEL')
+    obj["tagged"] = True
+"""
+
+
+def _build_scene(count):
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    mesh = bpy.data.meshes.new("Shared")
+    mesh.from_pydata([(0, 0, 0), (1, 0, 0), (0, 1, 0)], [], [(0, 1, 2)])
+    collection = bpy.context.scene.collection
+    for i in range(count):
+        obj = bpy.data.objects.new(f"Obj.{i:05d}", mesh)
+        obj.location = (i % 100, i // 100, 0)
+        collection.objects.link(obj)
+
+
+def _run(source, rewrite_ops):
+    prepared = pipeline.prepare(source, rewrite=rewrite_ops)
+    start = time.perf_counter()
+    exec(prepared.code, dict(rewrite.namespace(), bpy=bpy))
+    bpy.context.view_layer.update()
+    return time.perf_counter() - start
+
+
+def main(count=10000):
+    for name, source in (("transform", TRANSFORM_SCRIPT), ("modifier", MODIFIER_SCRIPT)):
+        start = time.perf_counter()
+        for _ in range(100):
+            rewrite.rewrite_source(source)
+        rewrite_us = (time.perf_counter() - start) * 1e4
+        if not IN_BLENDER:
+            print(f"{name:10} rewrite pass {rewrite_us:7.1f} us (run inside Blender for scene timings)")
+            continue
+        _build_scene(count)
+        before = _run(source, False)
+        _build_scene(count)
+        after = _run(source, True)
+        print(f"{name:10} {count} objects: bpy.ops {before:8.2f}s, data API {after:8.3f}s, "
+              f"{before / after:6.0f}x faster (rewrite pass {rewrite_us:.0f} us)")
+
+
+if __name__ == "__main__":
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    main(int(argv[0]) if argv else 10000)
@@ -0,0 +1,74 @@
+"""Cost of building, incrementally updating and rendering scene context.
+
+Run from the repository root::
+
+    python benchmarks/bench_scene_context.py [objects]
+
+Outside Blender a synthetic scene of plain Python objects stands in for
+``bpy.types.Object``; inside ``blender -b`` the current scene is used.
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+try:
+    import bpy  # noqa: F401  (running inside ``blender -b``)
+    IN_BLENDER = hasattr(bpy.types, "Object")
+except ModuleNotFoundError:
+    sys.path.insert(0, str(ROOT / "tests"))
+    import conftest  # noqa: F401  installs the fake bpy
+    import bpy
+    IN_BLENDER = False
+
+from blendair import scene_context  # noqa: E402
+
+
+class SyntheticObject:
+    type = "MESH"
+    parent = None
+
+    def __init__(self, index):
+        self.name = f"Object.{index:05d}"
+        self.location = (index * 0.1, 0.0, 0.0)
+        self.modifiers = [SimpleNamespace(name="Subdivision", type="SUBSURF")]
+        self.material_slots = [SimpleNamespace(material=SimpleNamespace(name=f"Mat.{index % 50}"))]
+
+    def as_pointer(self):
+        return id(self)
+
+
+def _scene(count):
+    if IN_BLENDER:
+        return bpy.context.scene
+    bpy.types.Object = SyntheticObject
+    bpy.types.Collection = type("Collection", (), {})
+    objects = [SyntheticObject(i) for i in range(count)]
+    return SimpleNamespace(name="Scene", frame_current=1, objects=objects)
+
+
+def main(count=50000):
+    scene = _scene(count)
+    objects = list(scene.objects)
+    ctx = scene_context.SceneContext()
+
+    ctx.build(scene)
+    changed = [SimpleNamespace(id=obj) for obj in objects[:10]]
+    start = time.perf_counter()
+    for _ in range(100):
+        ctx.update(scene, changed)
+    update_ms = (time.perf_counter() - start) * 10
+    text = ctx.render(scene, budget=8192, selected=objects[:5], active=objects[0])
+    stats = ctx.stats()
+
+    print(f"{len(objects)} objects")
+    print(f"full build:          {stats['build_ms']:8.2f} ms")
+    print(f"update (10 objects): {update_ms:8.3f} ms")
+    print(f"render (8 KB budget):{stats['render_ms']:8.2f} ms, {len(text)} chars")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
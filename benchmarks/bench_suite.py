@@ -0,0 +1,352 @@
+"""Headless benchmark suite against a local mock LLM server.
+
+Run from the repository root::
+
+    python benchmarks/bench_suite.py [--requests N] [--latency MS] [--output FILE] [--compare FILE]
+
+or inside Blender with ``blender -b --python benchmarks/bench_suite.py -- [options]``.
+Outside Blender the fake ``bpy`` from ``tests/conftest.py`` is used.
+
+Provider adapters are pointed at :mod:`mock_llm_server`, which answers in
+each provider's wire format after a fixed latency. Scenarios:
+
+* ``fetch``: sequential ``fetch_script`` latency per wire format, and the
+  add-on's own overhead on top of the server latency (with a per-stage
+  breakdown from :mod:`blendair.tracing`),
+* ``stream``: time to first token and total time of ``stream_script``,
+* ``throughput``: requests per second with concurrent callers sharing one
+  pooled session,
+* ``cache``: response-cache miss versus hit,
+* ``errors``: success rate and latency with injected 503s and dropped
+  connections, with and without transport retries,
+* ``job_queue``: queue wait per job kind when prompts arrive behind renders.
+
+Results are written as JSON (default ``benchmarks/results/<UTC time>.json``).
+``--compare`` prints the change of every metric against an earlier file.
+"""
+
+import argparse
+import dataclasses
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+try:
+    import bpy  # noqa: F401  (running inside ``blender -b``)
+    IN_BLENDER = hasattr(bpy, "app") and hasattr(bpy.app, "version")
+except ModuleNotFoundError:
+    sys.path.insert(0, str(ROOT / "tests"))
+    import conftest  # noqa: F401  installs the fake bpy
+    IN_BLENDER = False
+
+from blendair import cache, prompts, provider_stats, providers, tracing, transport, utils  # noqa: E402
+from mock_llm_server import MockConfig, MockLLMServer  # noqa: E402
+
+PROMPT = "Add three cubes in a row"
+# Providers whose adapters are redirected to the mock server.
+REDIRECTED = ("openai", "anthropic", "gemini")
+# Scenario name -> (provider, local endpoint path or None)
+FETCH_TARGETS = {
+    "openai": ("openai", None),
+    "anthropic": ("anthropic", None),
+    "gemini": ("gemini", None),
+    "local": ("local", "/generate"),
+}
+STREAM_TARGETS = {
+    "openai": ("openai", None),
+    "anthropic": ("anthropic", None),
+    "gemini": ("gemini", None),
+    "ollama": ("local", "/api/generate"),
+    "ollama_chat": ("local", "/api/chat"),
+}
+
+
+class _Prefs:
+    """Preferences for the benchmark: every key set, caching off unless asked for."""
+
+    def __init__(self, server_url, cache_dir):
+        self.server_url = server_url
+        self.llm_provider = "openai"
+        self.local_llm_endpoint = server_url + "/generate"
+        self.http_pool_size = transport.DEFAULT_POOL_SIZE
+        self.http_max_retries = 0
+        self.cache_enabled = False
+        self.cache_dir = cache_dir
+
+    def __getattr__(self, name):
+        if name.endswith(("_api_key", "_api_token")):
+            return "bench-key"
+        raise AttributeError(name)
+
+    def use(self, provider, endpoint=None):
+        self.llm_provider = provider
+        if endpoint:
+            self.local_llm_endpoint = self.server_url + endpoint
+
+
+def _redirect(adapter, base):
+    """Copy of *adapter* sending its requests to *base*, keeping path and query."""
+    build = adapter.build_request
+
+    def build_request(prefs, key, prompt, max_tokens=providers.DEFAULT_MAX_TOKENS):
+        url, headers, data = build(prefs, key, prompt, max_tokens)
+        parts = urlsplit(url)
+        return base + parts.path + (f"?{parts.query}" if parts.query else ""), headers, data
+    return dataclasses.replace(adapter, build_request=build_request)
+
+
+def _ms(values):
+    """Summary of durations in seconds, as milliseconds."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]  # noqa: E731
+    return {"count": len(values), "mean_ms": statistics.fmean(values) * 1000,
+            "p50_ms": pick(0.5) * 1000, "p95_ms": pick(0.95) * 1000, "max_ms": ordered[-1] * 1000}
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+# -----------------------------------------------------------------------------
+# Scenarios
+# -----------------------------------------------------------------------------
+
+def bench_fetch(server, prefs, requests):
+    results = {}
+    for name, (provider, endpoint) in FETCH_TARGETS.items():
+        prefs.use(provider, endpoint)
+        prompts.fetch_script(PROMPT, use_cache=False)  # warm the connection pool
+        tracing.reset()
+        tracing.set_enabled(True)
+        latencies, failures = [], 0
+        for _ in range(requests):
+            elapsed, script = _timed(prompts.fetch_script, PROMPT, use_cache=False)
+            latencies.append(elapsed)
+            failures += not script
+        tracing.set_enabled(False)
+        row = _ms(latencies)
+        row["overhead_ms"] = row["p50_ms"] - server.config.latency * 1000
+        row["failures"] = failures
+        row["stages_p50_ms"] = {stage: stats["p50"] * 1000 for stage, stats in tracing.summary().items()}
+        results[name] = row
+    tracing.reset()
+    return results
+
+
+def bench_stream(server, prefs, requests):
+    results = {}
+    for name, (provider, endpoint) in STREAM_TARGETS.items():
+        prefs.use(provider, endpoint)
+        first, total, chunks = [], [], 0
+        for _ in range(requests):
+            stats = prompts.StreamStats()
+            text = "".join(prompts.stream_script(PROMPT, stats, use_cache=False))
+            if text and stats.ttft is not None:
+                first.append(stats.ttft)
+                total.append(stats.elapsed)
+                chunks = stats.chunks
+        results[name] = {"ttft": _ms(first), "total": _ms(total), "chunks": chunks,
+                         "failures": requests - len(total)}
+    return results
+
+
+def bench_throughput(server, prefs, requests, levels=(1, 4, 16)):
+    prefs.use("openai")
+    results = {}
+    for workers in levels:
+        prefs.http_pool_size = workers
+        transport.close_all()
+        before = transport.pool_stats().get("openai", {"opened": 0})["opened"]
+        total = requests * workers
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            start = time.perf_counter()
+            scripts = list(pool.map(lambda _: prompts.fetch_script(PROMPT, use_cache=False), range(total)))
+            elapsed = time.perf_counter() - start
+        results[f"concurrency_{workers}"] = {
+            "requests": total,
+            "requests_per_s": total / elapsed,
+            "failures": sum(1 for script in scripts if not script),
+            "connections_opened": transport.pool_stats()["openai"]["opened"] - before,
+        }
+    prefs.http_pool_size = transport.DEFAULT_POOL_SIZE
+    return results
+
+
+def bench_cache(server, prefs, requests):
+    prefs.use("openai")
+    prefs.cache_enabled = True
+    try:
+        store = cache.get_cache(prefs)
+        store.clear()
+        misses, hits = [], []
+        for index in range(requests):
+            misses.append(_timed(prompts.fetch_script, f"{PROMPT} #{index}")[0])
+        calls = sum(server.requests.values())
+        for index in range(requests):
+            hits.append(_timed(prompts.fetch_script, f"{PROMPT} #{index}")[0])
+        return {"miss": _ms(misses), "hit": _ms(hits),
+                "hit_network_requests": sum(server.requests.values()) - calls,
+                "speedup": statistics.median(misses) / max(statistics.median(hits), 1e-9)}
+    finally:
+        prefs.cache_enabled = False
+        cache.close_cache()
+
+
+def bench_errors(server, prefs, requests, error_rate=0.2):
+    prefs.use("openai")
+    results = {}
+    for status, label in ((503, "http_503"), (0, "dropped")):
+        for retries in (0, transport.DEFAULT_RETRIES):
+            prefs.http_max_retries = retries
+            server.reset(error_rate=error_rate, error_status=status)
+            latencies, ok = [], 0
+            for _ in range(requests):
+                elapsed, script = _timed(prompts.fetch_script, PROMPT, use_cache=False)
+                latencies.append(elapsed)
+                ok += bool(script)
+            results[f"{label}_retries_{retries}"] = dict(
+                _ms(latencies), success_rate=ok / requests, injected=server.failures)
+    server.reset(error_rate=0.0)
+    prefs.http_max_retries = 0
+    return results
+
+
+def bench_job_queue(server, prefs, requests, workers=2, render_time=0.2):
+    """Prompts queued behind slow renders; priorities should let them overtake."""
+    prefs.use("openai")
+    utils.start_background_threads(workers)
+    try:
+        jobs = [utils.enqueue_job({"func": time.sleep, "args": (render_time,), "kind": "render"})
+                for _ in range(workers * 2)]
+        jobs += [utils.enqueue_job({"func": prompts.fetch_script, "args": (PROMPT,),
+                                    "kwargs": {"use_cache": False}, "kind": "prompt"})
+                 for _ in range(requests)]
+        start = time.perf_counter()
+        while not all(job.done for job in jobs):
+            time.sleep(0.005)
+        makespan = time.perf_counter() - start
+    finally:
+        utils.stop_background_threads()
+    results = {"workers": workers, "makespan_ms": makespan * 1000}
+    for kind in ("prompt", "render"):
+        of_kind = [job for job in jobs if job.kind == kind]
+        results[kind] = dict(
+            _ms([job.started - job.submitted for job in of_kind if job.started is not None]),
+            failed=sum(1 for job in of_kind if job.status != "done"))
+    return results
+
+
+SCENARIOS = {
+    "fetch": bench_fetch,
+    "stream": bench_stream,
+    "throughput": bench_throughput,
+    "cache": bench_cache,
+    "errors": bench_errors,
+    "job_queue": bench_job_queue,
+}
+
+
+# -----------------------------------------------------------------------------
+# Reporting
+# -----------------------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(data, prefix=""):
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, name + ".")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(previous, current):
+    """Print every numeric metric of *current* next to its value in *previous*."""
+    old = dict(_flatten(previous["results"]))
+    for name, value in _flatten(current["results"]):
+        if name in old and old[name]:
+            print(f"{name:60s} {old[name]:12.2f} -> {value:12.2f}  ({(value / old[name] - 1) * 100:+6.1f}%)")
+
+
+def run(requests=20, latency=0.05, scenarios=tuple(SCENARIOS)):
+    results = {}
+    original = {name: providers.PROVIDERS[name] for name in REDIRECTED}
+    get_pref, save_stats = prompts.get_pref, provider_stats.save
+    with tempfile.TemporaryDirectory(prefix="blendair_bench_") as cache_dir, \
+            MockLLMServer(config=MockConfig(latency=latency)) as server:
+        prefs = _Prefs(server.url, cache_dir)
+        prompts.get_pref = lambda: prefs
+        provider_stats.save = lambda path=None: None  # keep the user's routing stats untouched
+        for name, adapter in original.items():
+            providers.register_provider(_redirect(adapter, server.url))
+        try:
+            for name in scenarios:
+                server.reset()
+                provider_stats._STATS.clear()
+                start = time.perf_counter()
+                results[name] = SCENARIOS[name](server, prefs, requests)
+                print(f"{name:<12} done in {time.perf_counter() - start:6.2f} s", file=sys.stderr)
+        finally:
+            for adapter in original.values():
+                providers.register_provider(adapter)
+            prompts.get_pref, provider_stats.save = get_pref, save_stats
+            provider_stats._STATS.clear()
+            transport.close_all()
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "blender": IN_BLENDER,
+            "requests": requests,
+            "server_latency_ms": latency * 1000,
+        },
+        "results": results,
+    }
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=20, help="requests per measurement")
+    parser.add_argument("--latency", type=float, default=50.0, help="mock server latency in ms")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="run only this scenario (repeatable)")
+    parser.add_argument("--output", type=Path, help="JSON results file")
+    parser.add_argument("--compare", type=Path, help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args.requests, args.latency / 1000, tuple(args.scenario or SCENARIOS))
+    output = args.output or ROOT / "benchmarks" / "results" / (
+        report["meta"]["time"].replace(":", "").replace("-", "") + ".json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Results written to {output}")
+    if args.compare:
+        compare(json.loads(args.compare.read_text(encoding="utf-8")), report)
+
+
+if __name__ == "__main__":
+    # Blender passes its own arguments; ours follow ``--``.
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:])
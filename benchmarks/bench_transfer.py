@@ -0,0 +1,116 @@
+"""Export + transfer + import cost of each model transfer format.
+
+Run inside Blender for real exports and imports::
+
+    blender -b --factory-startup --python benchmarks/bench_transfer.py -- [mbit_per_s]
+
+For every representative scene and format it reports export, compression,
+simulated transfer (bytes / bandwidth) and decompression + import time
+plus the bytes on the wire. Outside Blender only OBJ and OBJ + gzip are
+measured, on a synthetic OBJ file, since GLB needs Blender's exporter::
+
+    python benchmarks/bench_transfer.py [mbit_per_s]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+try:
+    import bpy  # noqa: F401  (running inside ``blender -b``)
+    IN_BLENDER = hasattr(bpy.types, "Object")
+except ModuleNotFoundError:
+    sys.path.insert(0, str(ROOT / "tests"))
+    import conftest  # noqa: F401  installs the fake bpy
+    import bpy
+    IN_BLENDER = False
+
+from blendair import formats  # noqa: E402
+
+# (label, builder arguments) of the scenes measured inside Blender.
+SCENES = [
+    ("100 cubes", {"cubes": 100}),
+    ("monkey, subdiv 4", {"subdiv": 4}),
+    ("1000 cubes + monkey subdiv 3", {"cubes": 1000, "subdiv": 3}),
+]
+
+
+def _build_scene(cubes=0, subdiv=0):
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    for i in range(cubes):
+        bpy.ops.mesh.primitive_cube_add(size=0.5, location=(i % 32, i // 32, 0))
+    if subdiv:
+        bpy.ops.mesh.primitive_monkey_add(location=(0, 0, 5))
+        modifier = bpy.context.object.modifiers.new("Subdivision", 'SUBSURF')
+        modifier.levels = subdiv
+        bpy.ops.object.modifier_apply(modifier=modifier.name)
+
+
+def _synthetic_obj(path, grid=400):
+    """A grid mesh of ``grid * grid`` vertices written as OBJ text."""
+    with open(path, "w") as fp:
+        for y in range(grid):
+            fp.writelines(f"v {x * 0.01:.6f} {y * 0.01:.6f} {((x * y) % 7) * 0.001:.6f}\n"
+                          for x in range(grid))
+        for y in range(grid - 1):
+            fp.writelines(f"f {y * grid + x + 1} {y * grid + x + 2} {(y + 1) * grid + x + 2} "
+                          f"{(y + 1) * grid + x + 1}\n" for x in range(grid - 1))
+    return path
+
+
+def _measure(name, workdir, bandwidth):
+    fmt = formats.FORMATS[name]
+    target = os.path.join(workdir, formats.filename(name))
+    start = time.perf_counter()
+    if IN_BLENDER:
+        exported = formats.export_scene(target, name)
+    else:
+        exported = _synthetic_obj(target[:-3] if target.endswith(".gz") else target)
+    export_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if exported != target:
+        formats.compress(exported, target)
+    compress_s = time.perf_counter() - start
+    wire = os.path.getsize(target)
+
+    start = time.perf_counter()
+    local = target
+    if target.endswith(".gz"):
+        local = formats.decompress(target, target[:-3])
+    if IN_BLENDER:
+        bpy.ops.wm.read_factory_settings(use_empty=True)
+        formats.import_file(local)
+    import_s = time.perf_counter() - start
+    for path in {local, target}:
+        os.remove(path)
+    transfer_s = wire / bandwidth
+    total = export_s + compress_s + transfer_s + import_s
+    print(f"  {fmt.label:<20} {wire / 1e6:9.2f} MB  export {export_s:6.2f}s  "
+          f"compress {compress_s:6.2f}s  transfer {transfer_s:6.2f}s  "
+          f"import {import_s:6.2f}s  total {total:6.2f}s")
+
+
+def main(mbit=50.0):
+    bandwidth = mbit * 1e6 / 8
+    print(f"bandwidth {mbit:g} Mbit/s")
+    names = list(formats.FORMATS) if IN_BLENDER else ["obj", "obj_gz"]
+    scenes = SCENES if IN_BLENDER else [("synthetic 400x400 grid", None)]
+    with tempfile.TemporaryDirectory() as workdir:
+        for label, spec in scenes:
+            print(label)
+            for name in names:
+                if spec is not None:
+                    _build_scene(**spec)
+                _measure(name, workdir, bandwidth)
+    if not IN_BLENDER:
+        print("(GLB needs Blender's glTF exporter; run inside blender -b to include it)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    main(float(args[0]) if args else 50.0)
@@ -0,0 +1,259 @@
+"""Local stand-in for LLM provider APIs, used by the benchmarks.
+
+Speaks the wire formats ``blendair.providers`` parses, chosen by path:
+
+* ``/v1/chat/completions``: OpenAI-compatible (OpenAI, Grok, DeepSeek, ...),
+* ``/v1/messages``: Anthropic,
+* ``/v1beta/models/<model>:generateContent`` and ``:streamGenerateContent``: Gemini,
+* ``/api/generate`` and ``/api/chat``: Ollama,
+* anything else: ``{"script": ...}`` (BlendAIr Cloud and plain local servers).
+
+Requests with ``"stream": true`` (or Gemini's streaming path) are answered
+as Server-Sent Events, or newline-delimited JSON for Ollama, split into
+:attr:`MockConfig.chunks` pieces.
+
+Latency and failures are set on :attr:`MockLLMServer.config` while the
+server runs. Each request sleeps ``latency`` before the headers and
+``chunk_delay`` between streamed chunks. A fraction ``error_rate`` of
+requests, spread evenly so runs are repeatable, fails with
+``error_status``; status 0 drops the connection without answering.
+
+Standalone, for pointing Blender's "Local" provider at it::
+
+    python benchmarks/mock_llm_server.py [port] [latency_ms]
+"""
+
+import json
+import socket
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SCRIPT = ("import bpy\n"
+          "for i in range(3):\n"
+          "    bpy.ops.mesh.primitive_cube_add(location=(i * 2.5, 0, 0))\n")
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.05  # seconds before the response headers
+    chunk_delay: float = 0.005  # seconds between streamed chunks
+    chunks: int = 8
+    error_rate: float = 0.0
+    error_status: int = 503  # 0: close the connection without answering
+    script: str = SCRIPT
+
+
+def _split(text, parts):
+    size = max(1, -(-len(text) // max(1, parts)))
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _usage(prompt_tokens, completion_tokens):
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+
+
+# -----------------------------------------------------------------------------
+# Wire formats: (full response body, streamed events, end-of-stream line)
+# -----------------------------------------------------------------------------
+
+def _openai(script, pieces):
+    body = {"choices": [{"message": {"role": "assistant", "content": script}}],
+            "usage": _usage(40, len(script) // 4)}
+    events = [{"choices": [{"delta": {"content": piece}}]} for piece in pieces]
+    return body, events, "[DONE]"
+
+
+def _anthropic(script, pieces):
+    body = {"content": [{"type": "text", "text": script}],
+            "usage": {"input_tokens": 40, "output_tokens": len(script) // 4}}
+    events = ([{"type": "message_start"}]
+              + [{"type": "content_block_delta", "delta": {"type": "text_delta", "text": piece}}
+                 for piece in pieces]
+              + [{"type": "message_stop"}])
+    return body, events, None
+
+
+def _gemini(script, pieces):
+    def candidate(text):
+        return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+    body = dict(candidate(script), usageMetadata={"promptTokenCount": 40,
+                                                 "candidatesTokenCount": len(script) // 4})
+    return body, [candidate(piece) for piece in pieces], None
+
+
+def _ollama(script, pieces, chat):
+    def event(text, done):
+        if chat:
+            return {"message": {"role": "assistant", "content": text}, "done": done}
+        return {"response": text, "done": done}
+    return event(script, True), [event(piece, False) for piece in pieces] + [event("", True)], None
+
+
+def _script(script, pieces):
+    return {"script": script}, None, None
+
+
+def wire_format(path):
+    """Name of the wire format served at *path*."""
+    path = path.split("?", 1)[0]
+    if path.endswith("/chat/completions"):
+        return "openai"
+    if path.endswith("/v1/messages"):
+        return "anthropic"
+    if ":generateContent" in path or ":streamGenerateContent" in path:
+        return "gemini"
+    if path.endswith("/api/generate"):
+        return "ollama"
+    if path.endswith("/api/chat"):
+        return "ollama_chat"
+    return "script"
+
+
+_FORMATS = {
+    "openai": _openai,
+    "anthropic": _anthropic,
+    "gemini": _gemini,
+    "ollama": lambda script, pieces: _ollama(script, pieces, chat=False),
+    "ollama_chat": lambda script, pieces: _ollama(script, pieces, chat=True),
+    "script": _script,
+}
+
+
+# -----------------------------------------------------------------------------
+# Server
+# -----------------------------------------------------------------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection pooling is measured too
+    # Headers and body are separate writes; with Nagle on, delayed ACKs add ~40 ms.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+    def do_POST(self):  # noqa: N802
+        server = self.server.owner
+        config = server.config
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            request = {}
+        kind = wire_format(self.path)
+        fail = server.count(kind)
+        time.sleep(config.latency)
+        if fail:
+            if not config.error_status:
+                self.close_connection = True
+                self.connection.shutdown(socket.SHUT_RDWR)
+                return
+            self._send_json({"error": {"message": "injected failure"}}, config.error_status)
+            return
+
+        full, events, sentinel = _FORMATS[kind](config.script, _split(config.script, config.chunks))
+        streaming = ":streamGenerateContent" in self.path or request.get("stream") is True
+        if not streaming or events is None:
+            self._send_json(full)
+            return
+        ndjson = kind.startswith("ollama")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson" if ndjson else "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        lines = [json.dumps(event) for event in events]
+        if sentinel is not None:
+            lines.append(sentinel)
+        for index, line in enumerate(lines):
+            if index:
+                time.sleep(config.chunk_delay)
+            self._write_chunk((line + "\n") if ndjson else f"data: {line}\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, text):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class MockLLMServer:
+    """Threaded mock provider server; use as a context manager."""
+
+    def __init__(self, port=0, config=None):
+        self.config = config or MockConfig()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.owner = self
+        self._thread = None
+        self._lock = threading.Lock()
+        self._debt = 0.0
+        self.requests = {}
+        self.failures = 0
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, kind):
+        """Count one request of *kind*; return True if it should fail."""
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            self._debt += self.config.error_rate
+            fail = self._debt >= 1.0
+            if fail:
+                self._debt -= 1.0
+                self.failures += 1
+            return fail
+
+    def reset(self, **changes):
+        """Clear the counters and apply *changes* to :attr:`config`."""
+        with self._lock:
+            for name, value in changes.items():
+                setattr(self.config, name, value)
+            self._debt = 0.0
+            self.requests = {}
+            self.failures = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="MockLLMServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    server = MockLLMServer(port, MockConfig(latency=latency)).start()
+    print(f"Mock LLM server on {server.url} (e.g. {server.url}/api/generate); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
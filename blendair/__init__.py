@@ -16,22 +16,29 @@ bl_info = {
 }
 
 import bpy
-from . import addon_prefs, deps, operators, panels, blenderkit
+from . import addon_prefs, cache, deps, dispatch, history, logger, operators, panels, blenderkit, provider_stats, scene_context, tracing, transport, utils
 
 # --- REGISTRATION --- #
 
 # This list is the single source of truth for all add-on classes.
 CLASSES = [
     # Core / Preferences
-    addon_prefs.BlendAirAddonPreferences,
+    addon_prefs.BlendAirPreferences,
+    deps.BLENDAIR_OT_InstallMissing,
 
     # Operators
     operators.BLENDAIR_OT_ExecutePrompt,
+    operators.BLENDAIR_OT_RunScript,
+    operators.BLENDAIR_OT_BatchPrompt,
+    operators.BLENDAIR_OT_ClearCache,
+    operators.BLENDAIR_OT_ExportTrace,
+    operators.BLENDAIR_OT_ResetTrace,
     operators.BLENDAIR_OT_RestoreHistory,
     operators.BLENDAIR_OT_FavoriteHistory,
     operators.BLENDAIR_OT_CopyHistory,
     operators.BLENDAIR_OT_DeleteHistory,
     operators.BLENDAIR_OT_GoBackHistory,
+    operators.BLENDAIR_OT_HistoryMore,
     operators.BLENDAIR_OT_UploadModel,
     operators.BLENDAIR_OT_DownloadModel,
     operators.BLENDAIR_OT_Render,
@@ -41,7 +48,11 @@ CLASSES = [
     # Panels & UI
     panels.BLENDAIR_PT_MainPanel,
     panels.BLENDAIR_PT_PromptPanel,
+    panels.BlendAirHistoryItem,
+    panels.BLENDAIR_UL_History,
     panels.BLENDAIR_PT_PromptHistory,
+    panels.BLENDAIR_PT_Log,
+    panels.BLENDAIR_PT_Performance,
 
     # BlenderKit Integration
     blenderkit.BlendAirBKitAsset,
@@ -51,22 +62,32 @@ CLASSES = [
     blenderkit.BLENDAIR_UL_BKitAssets,
 ]
 
+def _job_workers():
+    """Worker count from preferences, falling back to the default."""
+    try:
+        return addon_prefs.get_pref().job_workers
+    except (AttributeError, KeyError):
+        return utils.DEFAULT_WORKERS
+
+def _pref(name, default):
+    try:
+        return getattr(addon_prefs.get_pref(), name, default)
+    except (AttributeError, KeyError):
+        return default
+
 def register():
     """Register all add-on classes and properties."""
+    logger.start(utils.LOG_PATH, level=_pref('log_level', "INFO"))
+    tracing.set_enabled(_pref('enable_tracing', False))
     deps.check_and_prompt_install()
 
-    print("--- Registering BlendAIr --- ")
+    logger.debug("Registering BlendAIr")
     for cls in CLASSES:
         try:
             bpy.utils.register_class(cls)
-            print(f"Registered class: {cls.__name__}")
+            logger.debug(f"Registered class: {cls.__name__}")
         except Exception as e:
-            print(f"\n--- BLENDAIR REGISTRATION ERROR ---")
-            print(f"Failed to register class: {cls.__name__}")
-            print(f"Error: {e}")
-            import traceback
-            traceback.print_exc()
-            print("-------------------------------------\n")
+            logger.error(f"Failed to register class {cls.__name__}: {e}", e)
             # Unregister all previously registered classes before failing
             unregister()
             return
@@ -81,29 +102,59 @@ def register():
         name="BlendAIr Status",
         default="Ready"
     )
+    bpy.types.Scene.blendair_bypass_cache = bpy.props.BoolProperty(
+        name="Bypass Cache",
+        description="Always ask the provider, ignoring cached responses",
+        default=False
+    )
+    bpy.types.Scene.blendair_search_query = bpy.props.StringProperty(
+        name="Search History",
+        description="Show history entries containing these words",
+        default="",
+        update=panels.on_history_query
+    )
+    bpy.types.Scene.blendair_history_items = bpy.props.CollectionProperty(type=panels.BlendAirHistoryItem)
+    bpy.types.Scene.blendair_history_index = bpy.props.IntProperty(
+        name="History Index", default=0, update=panels.on_history_index
+    )
     # BlenderKit properties
     bpy.types.Scene.blendair_bkit_query = bpy.props.StringProperty(name="BlenderKit Query", default="")
     bpy.types.Scene.blendair_bkit_assets = bpy.props.CollectionProperty(type=blenderkit.BlendAirBKitAsset)
     bpy.types.Scene.blendair_bkit_asset_index = bpy.props.IntProperty(name="Asset Index", default=0)
 
+    provider_stats.load()
+    dispatch.start()
+    scene_context.start()
+    utils.start_background_threads(_job_workers())
+    history.subscribe(panels.on_history_changed)
+    history.load_async()
+
 def unregister():
     """Unregister all add-on classes and properties in reverse order."""
-    print("--- Unregistering BlendAIr --- ")
+    logger.debug("Unregistering BlendAIr")
+    utils.stop_background_threads()
+    dispatch.stop()
+    scene_context.stop()
     for cls in reversed(CLASSES):
         try:
             bpy.utils.unregister_class(cls)
-            print(f"Unregistered class: {cls.__name__}")
+            logger.debug(f"Unregistered class: {cls.__name__}")
         except Exception as e:
-            print(f"\n--- BLENDAIR UNREGISTRATION ERROR ---")
-            print(f"Failed to unregister class: {cls.__name__}")
-            print(f"Error: {e}")
-            import traceback
-            traceback.print_exc()
-            print("---------------------------------------\n")
+            logger.error(f"Failed to unregister class {cls.__name__}: {e}", e)
 
     # Unregister scene properties
     del bpy.types.Scene.blendair_prompt
     del bpy.types.Scene.blendair_status
+    del bpy.types.Scene.blendair_bypass_cache
+    del bpy.types.Scene.blendair_search_query
+    del bpy.types.Scene.blendair_history_items
+    del bpy.types.Scene.blendair_history_index
     del bpy.types.Scene.blendair_bkit_query
     del bpy.types.Scene.blendair_bkit_assets
     del bpy.types.Scene.blendair_bkit_asset_index
+
+    transport.close_all()
+    provider_stats.save()
+    cache.close_cache()
+    history.close()
+    logger.stop()
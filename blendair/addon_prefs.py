@@ -1,6 +1,7 @@
 import bpy
 from bpy.types import AddonPreferences, PropertyGroup
-from bpy.props import StringProperty, FloatProperty, EnumProperty, PointerProperty
+from bpy.props import StringProperty, FloatProperty, EnumProperty, PointerProperty, IntProperty, BoolProperty
+from . import formats, logger, providers, tracing
 
 
 def get_pref():
@@ -13,15 +14,7 @@ class BlendAirPreferences(AddonPreferences):
     llm_provider: EnumProperty(
         name="LLM Provider",
         description="Choose which LLM service to use for prompts.",
-        items=[
-            ('blendair_cloud', 'Blend(AI)r Cloud', 'Use Blend(AI)r paid cloud service'),
-            ('openai', 'OpenAI', 'Use your own OpenAI API key'),
-            ('gemini', 'Gemini', 'Use your own Gemini API key'),
-            ('huggingface', 'HuggingFace', 'Use your own HuggingFace Inference API key'),
-            ('grok', 'Grok', 'Use your own Grok API key'),
-            ('deepseek', 'DeepSeek', 'Use your own DeepSeek API key'),
-            ('local', 'Local (Ollama/LM Studio)', 'Use a local LLM server'),
-        ],
+        items=providers.enum_items(),
         default='blendair_cloud',
     )
     blendair_api_key: StringProperty(
@@ -84,6 +77,159 @@ class BlendAirPreferences(AddonPreferences):
         subtype="PASSWORD",
         default="",
     )
+    anthropic_api_key: StringProperty(
+        name="Anthropic API Key",
+        description="Your Anthropic API key.",
+        subtype="PASSWORD",
+        default="",
+    )
+    pplx_api_key: StringProperty(
+        name="Perplexity API Key",
+        description="Your Perplexity API key.",
+        subtype="PASSWORD",
+        default="",
+    )
+    replicate_api_token: StringProperty(
+        name="Replicate API Token",
+        description="Your Replicate API token.",
+        subtype="PASSWORD",
+        default="",
+    )
+    routing_mode: EnumProperty(
+        name="Routing",
+        description="How prompts are distributed across providers",
+        items=[
+            ('single', 'Single', 'Use only the selected provider'),
+            ('race', 'Race', 'Ask all race providers at once and keep the first valid script'),
+            ('hedge', 'Hedged', 'Ask a backup provider only if the fastest one exceeds its p90 latency'),
+            ('adaptive', 'Adaptive', 'Use the cheapest provider that meets the latency target'),
+        ],
+        default='single',
+    )
+    race_providers: StringProperty(
+        name="Candidate Providers",
+        description="Comma-separated provider ids used alongside the selected one (e.g. local,deepseek)",
+        default="",
+    )
+    latency_slo: FloatProperty(
+        name="Latency Target (s)",
+        description="Adaptive routing prefers the cheapest provider whose p90 latency is below this",
+        default=5.0,
+        min=0.1,
+        max=120.0,
+    )
+    hedge_delay: FloatProperty(
+        name="Hedge Delay (s)",
+        description="Wait before firing the backup until enough latency samples exist",
+        default=2.0,
+        min=0.1,
+        max=60.0,
+    )
+    send_scene_context: BoolProperty(
+        name="Send Scene Context",
+        description="Describe the current scene (objects, selection, modifiers, materials) with each prompt",
+        default=True,
+    )
+    script_retries: IntProperty(
+        name="Script Retries",
+        description="Times to re-ask the provider, with the error, when a script fails validation",
+        default=1,
+        min=0,
+        max=3,
+    )
+    rewrite_ops_loops: BoolProperty(
+        name="Rewrite Operator Loops",
+        description="Turn per-object bpy.ops loops in generated scripts into batched data API calls",
+        default=False,
+    )
+    stream_responses: BoolProperty(
+        name="Stream Responses",
+        description="Show tokens as they arrive for providers that support streaming",
+        default=True,
+    )
+    http_pool_size: IntProperty(
+        name="Connection Pool Size",
+        description="Keep-alive connections kept open per provider",
+        default=4,
+        min=1,
+        max=32,
+    )
+    http_max_retries: IntProperty(
+        name="Max Retries",
+        description="Retries with backoff on rate-limit (429) and server (5xx) errors",
+        default=2,
+        min=0,
+        max=10,
+    )
+    job_workers: IntProperty(
+        name="Background Workers",
+        description="Threads running queued prompts, uploads and renders (applies on restart)",
+        default=2,
+        min=1,
+        max=16,
+    )
+    batch_concurrency: IntProperty(
+        name="Batch Concurrency",
+        description="Maximum simultaneous requests per provider when running prompt batches",
+        default=4,
+        min=1,
+        max=32,
+    )
+    cache_enabled: BoolProperty(
+        name="Cache Responses",
+        description="Reuse previous scripts for identical prompts instead of calling the provider",
+        default=True,
+    )
+    cache_dir: StringProperty(
+        name="Cache Directory",
+        description="Where cached responses are stored (empty uses the system temp folder)",
+        subtype="DIR_PATH",
+        default="",
+    )
+    cache_max_mb: IntProperty(
+        name="Cache Size (MB)",
+        description="Least recently used responses are evicted beyond this size",
+        default=64,
+        min=1,
+        max=4096,
+    )
+    cache_ttl_hours: FloatProperty(
+        name="Cache Lifetime (h)",
+        description="Cached responses older than this are fetched again",
+        default=168.0,
+        min=0.1,
+        max=8760.0,
+    )
+    transfer_format: EnumProperty(
+        name="Transfer Format",
+        description="Format for model uploads; downloads fall back to whatever the server has",
+        items=formats.enum_items(),
+        default="glb",
+    )
+    delta_sync: BoolProperty(
+        name="Delta Sync",
+        description="Upload and download only the objects that changed, as per-object GLB chunks",
+        default=False,
+    )
+    log_level: EnumProperty(
+        name="Log Level",
+        description="Least severe events written to the log file and console",
+        items=[(level, level.title(), "") for level in logger.LEVELS],
+        default="INFO",
+        update=lambda self, _context: logger.set_level(self.log_level),
+    )
+    enable_tracing: BoolProperty(
+        name="Record Timing Spans",
+        description="Time each stage of prompts, transfers and renders for the Performance panel",
+        default=False,
+        update=lambda self, _context: tracing.set_enabled(self.enable_tracing),
+    )
+    wheelhouse_dir: StringProperty(
+        name="Wheelhouse",
+        description="Folder of pre-downloaded wheels to install dependencies from without network",
+        subtype="DIR_PATH",
+        default="",
+    )
     supabase_url: StringProperty(
         name="Supabase URL",
         description="Your Supabase project URL",
@@ -115,27 +261,14 @@ class BlendAirPreferences(AddonPreferences):
         col.prop(self, "llm_provider", text="Provider")
         provider = self.llm_provider
         # Provider-specific fields
-        if provider == 'blendair_cloud':
-            col.prop(self, "blendair_api_key")
-            col.operator("blendair.test_key", text="Test Blend(AI)r Key").provider = 'blendair_cloud'
-        elif provider == 'openai':
-            col.prop(self, "openai_api_key")
-            col.operator("blendair.test_key", text="Test OpenAI Key").provider = 'openai'
+        adapter = providers.get_provider(provider)
+        if adapter is not None and adapter.key_pref:
+            col.prop(self, adapter.key_pref)
+            col.operator("blendair.test_key", text=f"Test {adapter.label} Key").provider = provider
+        if provider == 'openai':
             col.prop(self, "local_llm_model", text="Model")
             col.prop(self, "local_llm_context", text="Context Window")
             col.prop(self, "local_llm_timeout", text="Timeout (s)")
-        elif provider == 'gemini':
-            col.prop(self, "gemini_api_key")
-            col.operator("blendair.test_key", text="Test Gemini Key").provider = 'gemini'
-        elif provider == 'huggingface':
-            col.prop(self, "huggingface_api_key")
-            col.operator("blendair.test_key", text="Test HuggingFace Key").provider = 'huggingface'
-        elif provider == 'grok':
-            col.prop(self, "grok_api_key")
-            col.operator("blendair.test_key", text="Test Grok Key").provider = 'grok'
-        elif provider == 'deepseek':
-            col.prop(self, "deepseek_api_key")
-            col.operator("blendair.test_key", text="Test DeepSeek Key").provider = 'deepseek'
         elif provider == 'local':
             col.prop(self, "local_llm_endpoint")
             col.prop(self, "local_llm_model", text="Model")
@@ -143,14 +276,73 @@ class BlendAirPreferences(AddonPreferences):
             col.prop(self, "local_llm_timeout", text="Timeout (s)")
             col.operator("blendair.test_key", text="Test Local LLM").provider = 'local'
         col.separator()
+        col.label(text="Routing:")
+        col.prop(self, "routing_mode")
+        if self.routing_mode != 'single':
+            col.prop(self, "race_providers")
+        if self.routing_mode == 'hedge':
+            col.prop(self, "hedge_delay")
+        if self.routing_mode == 'adaptive':
+            col.prop(self, "latency_slo")
+        from . import provider_stats
+        for name, stats in provider_stats.snapshot().items():
+            icon = 'ERROR' if stats['breaker'] == 'open' else 'NONE'
+            col.label(text=f"{name}: p50 {stats['p50']:.2f}s, p90 {stats['p90']:.2f}s, "
+                           f"errors {stats['error_rate'] * 100:.0f}%, ${stats['mean_cost']:.4f}/req, "
+                           f"{stats['breaker']} ({stats['count']} requests)", icon=icon)
+        col.separator()
+        col.label(text="Network:")
+        col.prop(self, "send_scene_context")
+        if self.send_scene_context:
+            from . import scene_context
+            ctx = scene_context.stats()
+            col.label(text=f"Scene context: {ctx['objects']} objects, build {ctx['build_ms']:.1f} ms, "
+                           f"last update {ctx['update_ms']:.2f} ms, render {ctx['render_ms']:.1f} ms")
+        col.prop(self, "script_retries")
+        col.prop(self, "rewrite_ops_loops")
+        from . import pipeline
+        checks = pipeline.stats()
+        col.label(text=f"Scripts: {checks['prepared']:.0f} compiled, {checks['cache_hits']:.0f} reused, "
+                       f"{checks['rejected']:.0f} rejected, {checks['retries']:.0f} retries, "
+                       f"{checks['check_time'] * 1000:.1f} ms checking")
+        col.prop(self, "stream_responses")
+        col.prop(self, "http_pool_size")
+        col.prop(self, "http_max_retries")
+        col.prop(self, "job_workers")
+        col.prop(self, "batch_concurrency")
+        from . import transport
+        for name, stats in transport.pool_stats().items():
+            col.label(text=f"{name}: {stats['opened']} opened / {stats['reused']} reused")
+        col.separator()
+        col.label(text="Response Cache:")
+        col.prop(self, "cache_enabled")
+        col.prop(self, "cache_dir")
+        col.prop(self, "cache_max_mb")
+        col.prop(self, "cache_ttl_hours")
+        col.separator()
         col.label(text="Supabase Configuration:")
         col.prop(self, "supabase_url")
         col.prop(self, "supabase_key")
+        col.prop(self, "transfer_format")
+        col.prop(self, "delta_sync")
         col.operator("blendair.test_supabase", text="Test Supabase")
         col.separator()
         col.label(text="BlenderMCP Server:")
         col.prop(self, "mcp_url")
         col.prop(self, "gesture_threshold")
+        col.separator()
+        col.label(text="Logging:")
+        col.prop(self, "log_level")
+        col.prop(self, "enable_tracing")
+        col.separator()
+        col.label(text="Dependencies:")
+        from . import deps
+        missing = deps.cached_missing()
+        col.label(text=f"Missing: {', '.join(missing)}" if missing else "All optional packages installed",
+                  icon='ERROR' if missing else 'CHECKMARK')
+        col.prop(self, "wheelhouse_dir")
+        if missing:
+            col.operator("wm.blendair_install_missing")
 
 
 # registration helpers
@@ -159,14 +351,17 @@ class BlendAirTestKeyOperator(bpy.types.Operator):
     bl_label = "Test API Key"
     provider: bpy.props.StringProperty()
     def execute(self, context):
-        import requests
+        from . import transport
         prefs = context.preferences.addons[__package__].preferences
+        session = transport.session_for(prefs, self.provider)
+        timeout = transport.request_timeout(prefs)
         try:
             if self.provider == 'openai':
                 key = prefs.openai_api_key
-                r = requests.get(
+                r = session.get(
                     'https://api.openai.com/v1/models',
-                    headers={'Authorization': f'Bearer {key}'}
+                    headers={'Authorization': f'Bearer {key}'},
+                    timeout=timeout,
                 )
                 if r.status_code == 200:
                     self.report({'INFO'}, "OpenAI key valid!")
@@ -174,8 +369,9 @@ class BlendAirTestKeyOperator(bpy.types.Operator):
                     self.report({'ERROR'}, f"OpenAI key invalid: {r.status_code}")
             elif self.provider == 'gemini':
                 key = prefs.gemini_api_key
-                r = requests.get(
-                    f'https://generativelanguage.googleapis.com/v1beta/models?key={key}'
+                r = session.get(
+                    f'https://generativelanguage.googleapis.com/v1beta/models?key={key}',
+                    timeout=timeout,
                 )
                 if r.status_code == 200:
                     self.report({'INFO'}, "Gemini key valid!")
@@ -183,9 +379,10 @@ class BlendAirTestKeyOperator(bpy.types.Operator):
                     self.report({'ERROR'}, f"Gemini key invalid: {r.status_code}")
             elif self.provider == 'huggingface':
                 key = prefs.huggingface_api_key
-                r = requests.get(
+                r = session.get(
                     'https://huggingface.co/api/whoami-v2',
-                    headers={'Authorization': f'Bearer {key}'}
+                    headers={'Authorization': f'Bearer {key}'},
+                    timeout=timeout,
                 )
                 if r.status_code == 200:
                     self.report({'INFO'}, "HuggingFace key valid!")
@@ -196,9 +393,10 @@ class BlendAirTestKeyOperator(bpy.types.Operator):
                 if not key:
                     self.report({'ERROR'}, "Anthropic key not set")
                     return {'CANCELLED'}
-                r = requests.get(
+                r = session.get(
                     'https://api.anthropic.com/v1/models',
-                    headers={'x-api-key': key}
+                    headers={'x-api-key': key},
+                    timeout=timeout,
                 )
                 if r.status_code == 200:
                     self.report({'INFO'}, "Anthropic key valid!")
@@ -0,0 +1,106 @@
+"""Concurrent multi-prompt batches.
+
+Completions for a list of prompts are fetched concurrently, bounded per
+provider by :func:`transport.provider_slot`, and compiled off the main
+thread. The caller then applies the scripts in input order.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import CodeType
+from typing import Callable, Iterable, List, Optional
+
+from . import pipeline, transport
+
+DEFAULT_CONCURRENCY = 4
+
+
+def parse_prompts(lines: Iterable[str]) -> List[str]:
+    """Return one prompt per non-empty line, skipping ``#`` comments."""
+    prompts = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            prompts.append(line)
+    return prompts
+
+
+def read_prompts(source: str, texts=None) -> List[str]:
+    """Read prompts from a Blender text block named *source* or a file path."""
+    text = texts.get(source) if texts is not None else None
+    if text is not None:
+        return parse_prompts(line.body for line in text.lines)
+    path = Path(source).expanduser()
+    if not path.is_file():
+        raise FileNotFoundError(f"No text block or file named '{source}'")
+    return parse_prompts(path.read_text(encoding='utf-8').splitlines())
+
+
+class BatchItem:
+    """Outcome of one prompt in a batch."""
+
+    def __init__(self, index: int, prompt: str) -> None:
+        self.index = index
+        self.prompt = prompt
+        self.script: Optional[str] = None
+        self.code: Optional[CodeType] = None
+        self.error: Optional[str] = None
+        self.latency = 0.0
+
+
+class BatchReport:
+    """Results in input order plus aggregate throughput."""
+
+    def __init__(self, items: List[BatchItem], elapsed: float) -> None:
+        self.items = items
+        self.elapsed = elapsed
+
+    @property
+    def throughput(self) -> float:
+        """Prompts fetched per minute."""
+        return len(self.items) / self.elapsed * 60.0 if self.elapsed > 0 else 0.0
+
+    @property
+    def latencies(self) -> List[float]:
+        return [item.latency for item in self.items]
+
+    def summary(self) -> str:
+        latencies = sorted(self.latencies)
+        median = latencies[len(latencies) // 2] if latencies else 0.0
+        worst = latencies[-1] if latencies else 0.0
+        failed = sum(1 for item in self.items if item.code is None)
+        return (f"{len(self.items)} prompts in {self.elapsed:.1f}s "
+                f"({self.throughput:.1f}/min, p50 {median:.2f}s, max {worst:.2f}s, {failed} failed)")
+
+
+def fetch_all(prompts: List[str], fetch: Callable[[str], Optional[str]], provider: str,
+              concurrency: int = DEFAULT_CONCURRENCY) -> BatchReport:
+    """Fetch and compile every prompt concurrently; results keep input order."""
+    slot = transport.provider_slot(provider, concurrency)
+    items = [BatchItem(i, p) for i, p in enumerate(prompts)]
+
+    def _fetch(item: BatchItem) -> None:
+        with slot:
+            start = time.perf_counter()
+            try:
+                item.script = fetch(item.prompt)
+            except Exception as exc:  # noqa: BLE001
+                item.error = str(exc)
+            item.latency = time.perf_counter() - start
+        if item.script:
+            try:
+                item.code = pipeline.prepare(item.script, f'<BlendAIr batch #{item.index + 1}>').code
+            except pipeline.ScriptError as exc:
+                item.error = str(exc)
+        elif item.error is None:
+            item.error = "No code returned from AI."
+
+    start = time.perf_counter()
+    if items:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(items))),
+                                thread_name_prefix='BlendAIrBatch') as pool:
+            list(pool.map(_fetch, items))
+    return BatchReport(items, time.perf_counter() - start)
@@ -0,0 +1,173 @@
+"""Content-addressed on-disk cache for generated scripts.
+
+Responses are keyed by a hash of provider, model, normalized prompt and a
+scene-context fingerprint, stored in a small SQLite file and evicted in
+least-recently-used order once the cache exceeds its size budget.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from . import logger
+
+# ``bpy.app.tempdir`` is a per-session folder that Blender deletes on exit, so
+# the default cache lives beside it in the system temp dir to survive restarts.
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "blendair_cache"
+CACHE_FILENAME = "responses.sqlite3"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 7 * 24 * 3600.0
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so trivially different prompts share a cache entry."""
+    return " ".join(prompt.split())
+
+
+def cache_key(provider: str, model: str, prompt: str, context: str = "") -> str:
+    """Return the content hash identifying one request."""
+    material = json.dumps([provider, model, normalize_prompt(prompt), context])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of responses backed by SQLite."""
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: float = DEFAULT_TTL) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.directory / CACHE_FILENAME), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._db.commit()
+        self.entries, self.size = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for *key*, or None on miss/expiry."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, size, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[2] > self.ttl:
+                self._delete(key, row[1])
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """Store *value* under *key*, evicting old entries past the size budget."""
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if old is not None:
+                self._delete(key, old[0])
+            self._db.execute(
+                "INSERT INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self.entries += 1
+            self.size += size
+            self._evict()
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self.entries = self.size = 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return in-memory counters; safe to call from panel ``draw``."""
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": self.entries, "bytes": self.size}
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _delete(self, key: str, size: int) -> None:
+        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self.entries -= 1
+        self.size -= size
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes:
+            row = self._db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._delete(*row)
+
+
+# -----------------------------------------------------------------------------
+# Shared instance configured from preferences
+# -----------------------------------------------------------------------------
+_CACHE: Optional[ResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache(prefs: Any) -> Optional[ResponseCache]:
+    """Return the shared cache for the current preferences, or None if disabled."""
+    global _CACHE  # noqa: PLW0603
+    if not getattr(prefs, "cache_enabled", True):
+        return None
+    directory = Path(getattr(prefs, "cache_dir", "") or DEFAULT_CACHE_DIR)
+    max_bytes = int(getattr(prefs, "cache_max_mb", DEFAULT_MAX_BYTES // (1024 * 1024))) * 1024 * 1024
+    ttl = float(getattr(prefs, "cache_ttl_hours", DEFAULT_TTL / 3600.0)) * 3600.0
+    with _CACHE_LOCK:
+        if _CACHE is None or _CACHE.directory != directory:
+            if _CACHE is not None:
+                _CACHE.close()
+            try:
+                _CACHE = ResponseCache(directory, max_bytes, ttl)
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning(f"Response cache unavailable: {exc}")
+                _CACHE = None
+                return None
+        _CACHE.max_bytes = max_bytes
+        _CACHE.ttl = ttl
+        return _CACHE
+
+
+def current_stats() -> Optional[Dict[str, Any]]:
+    """Return stats of the open cache without opening one."""
+    return _CACHE.stats() if _CACHE is not None else None
+
+
+def close_cache() -> None:
+    global _CACHE  # noqa: PLW0603
+    with _CACHE_LOCK:
+        if _CACHE is not None:
+            _CACHE.close()
+        _CACHE = None
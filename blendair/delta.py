@@ -0,0 +1,288 @@
+"""Content-addressed, per-object delta sync of scenes.
+
+Instead of one export of the whole scene, every object is stored as its
+own GLB chunk under ``<project>/objects/<hash>.glb`` in :data:`BUCKET`. The hash covers the
+object's transform, its mesh (or other data) and its modifier and
+material settings, but not its name, so renames and identical duplicates
+reuse chunks. ``<project>/manifest.json`` maps object names to hashes.
+
+Uploads export and send only objects whose hash is new. Downloads fetch
+the manifest and re-import only objects whose hash differs from the one
+stored on the local object. Objects keep the hash they were last uploaded
+with (:data:`SENT_PROP`) apart from the one they were received with
+(:data:`RECEIVED_PROP`), since a glTF round trip does not preserve it.
+Only received objects are ever replaced or removed by a download; a remote
+object whose name is taken by a local one is skipped.
+Fingerprinting, export and import touch ``bpy`` and run on the main
+thread; everything with network I/O runs on a worker.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from array import array
+from typing import AbstractSet, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import bpy
+
+from . import storage
+
+SENT_PROP = "blendair_sent_hash"
+RECEIVED_PROP = "blendair_received_hash"
+MANIFEST_NAME = "manifest.json"
+CHUNK_DIR = "objects"
+MANIFEST_VERSION = 1
+# Uploads and downloads must agree on one bucket, or a delta upload is never found.
+BUCKET = storage.UPLOAD_BUCKET
+
+
+# -----------------------------------------------------------------------------
+# Fingerprints (main thread)
+# -----------------------------------------------------------------------------
+
+def _rna_values(struct: Any) -> str:
+    """Stable text of *struct*'s plain RNA properties (no pointers or collections)."""
+    rna = getattr(struct, "bl_rna", None)
+    if rna is None:
+        return ""
+    values = []
+    for prop in rna.properties:
+        if prop.identifier == "rna_type" or prop.type in {"POINTER", "COLLECTION"}:
+            continue
+        value = getattr(struct, prop.identifier, None)
+        if getattr(prop, "is_array", False):
+            value = tuple(value)
+        values.append(f"{prop.identifier}={value!r}")
+    return ";".join(values)
+
+
+def _floats(collection: Any, attr: str, width: int) -> bytes:
+    values = array("f", [0.0]) * (len(collection) * width)
+    collection.foreach_get(attr, values)
+    return values.tobytes()
+
+
+def _ints(collection: Any, attr: str, width: int = 1) -> bytes:
+    values = array("i", [0]) * (len(collection) * width)
+    collection.foreach_get(attr, values)
+    return values.tobytes()
+
+
+def mesh_digest(mesh: Any) -> bytes:
+    """Digest of a mesh's vertex positions and face topology."""
+    h = hashlib.sha256()
+    h.update(_floats(mesh.vertices, "co", 3))
+    h.update(_ints(mesh.loops, "vertex_index"))
+    h.update(_ints(mesh.polygons, "loop_total"))
+    return h.digest()
+
+
+def fingerprint(obj: Any, mesh_cache: Optional[Dict[int, bytes]] = None) -> str:
+    """Content hash of *obj* as it would be exported.
+
+    *mesh_cache* shares mesh digests between objects using the same mesh.
+    """
+    h = hashlib.sha256(obj.type.encode("utf-8"))
+    h.update(array("f", [v for row in obj.matrix_world for v in row]).tobytes())
+    data = getattr(obj, "data", None)
+    if obj.type == "MESH" and data is not None:
+        key = data.as_pointer()
+        if mesh_cache is None or key not in mesh_cache:
+            digest = mesh_digest(data)
+            if mesh_cache is not None:
+                mesh_cache[key] = digest
+        else:
+            digest = mesh_cache[key]
+        h.update(digest)
+    elif data is not None:
+        h.update(_rna_values(data).encode("utf-8"))
+    for modifier in getattr(obj, "modifiers", ()):
+        h.update(_rna_values(modifier).encode("utf-8"))
+    for slot in getattr(obj, "material_slots", ()):
+        material = slot.material
+        h.update((material.name if material is not None else "-").encode("utf-8"))
+        if material is not None:
+            h.update(repr(tuple(material.diffuse_color)).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+def scene_manifest(objects: Iterable[Any]) -> Dict[str, str]:
+    """Map object names to fingerprints."""
+    cache: Dict[int, bytes] = {}
+    return {obj.name: fingerprint(obj, cache) for obj in objects}
+
+
+def diff(local: Dict[str, str], remote: Dict[str, str],
+         keep: AbstractSet[str] = frozenset()) -> Tuple[List[str], List[str]]:
+    """Return ``(changed, removed)`` names going from *local* to *remote*.
+
+    Names in *keep* (see :func:`local_only`) are never changed or removed.
+    """
+    changed = [name for name, digest in remote.items() if local.get(name) != digest and name not in keep]
+    removed = [name for name in local if name not in remote and name not in keep]
+    return changed, removed
+
+
+def chunk_key(project: str, digest: str) -> str:
+    return f"{project}/{CHUNK_DIR}/{digest}.glb"
+
+
+def manifest_key(project: str) -> str:
+    return f"{project}/{MANIFEST_NAME}"
+
+
+def pending_uploads(objects: Iterable[Any], manifest: Dict[str, str]) -> List[Any]:
+    """Objects whose current hash has not been uploaded from this file yet."""
+    return [obj for obj in objects if obj.get(SENT_PROP) != manifest[obj.name]]
+
+
+def export_chunks(objects: Iterable[Any], manifest: Dict[str, str], directory: str) -> Dict[str, str]:
+    """Export each object to ``<directory>/<hash>.glb``; return ``{hash: path}``."""
+    view_layer = bpy.context.view_layer
+    selected = [obj for obj in view_layer.objects if obj.select_get()]
+    active = view_layer.objects.active
+    paths: Dict[str, str] = {}
+    previous = None
+    try:
+        # Deselect once, then only swap the exported object in and out.
+        for obj in selected:
+            obj.select_set(False)
+        for obj in objects:
+            digest = manifest[obj.name]
+            if digest in paths:
+                continue
+            if previous is not None:
+                previous.select_set(False)
+            obj.select_set(True)
+            previous = obj
+            paths[digest] = os.path.join(directory, f"{digest}.glb")
+            bpy.ops.export_scene.gltf(filepath=paths[digest], export_format='GLB', use_selection=True)
+    finally:
+        if previous is not None:
+            previous.select_set(False)
+        for obj in selected:
+            obj.select_set(True)
+        view_layer.objects.active = active
+    return paths
+
+
+# -----------------------------------------------------------------------------
+# Transfer (worker thread)
+# -----------------------------------------------------------------------------
+
+def upload(prefs: Any, project: str, manifest: Dict[str, str], chunks: Dict[str, str],
+           bucket: str = BUCKET,
+           on_progress: Optional[Callable[[int, int], None]] = None,
+           cancel: Optional[Callable[[], bool]] = None) -> Dict[str, int]:
+    """Upload *chunks* the bucket does not have yet, then the manifest.
+
+    Returns counts and bytes of uploaded and skipped chunks.
+    """
+    existing = set(storage.list_objects(prefs, bucket, f"{project}/{CHUNK_DIR}"))
+    todo = {digest: path for digest, path in chunks.items() if f"{digest}.glb" not in existing}
+    total = sum(os.path.getsize(path) for path in todo.values())
+    sent = 0
+    for digest, path in todo.items():
+        size = os.path.getsize(path)
+        storage.upload_file(prefs, path, chunk_key(project, digest), bucket=bucket,
+                            content_type="model/gltf-binary", upsert=True, cancel=cancel,
+                            on_progress=(lambda done, _, base=sent: on_progress(base + done, total))
+                            if on_progress else None)
+        sent += size
+    manifest_path = os.path.join(bpy.app.tempdir, f"blendair_manifest_{project}.json")
+    with open(manifest_path, "w", encoding="utf-8") as fp:
+        json.dump({"version": MANIFEST_VERSION, "created_at": time.time(), "objects": manifest}, fp)
+    try:
+        storage.upload_file(prefs, manifest_path, manifest_key(project), bucket=bucket,
+                            content_type="application/json", upsert=True)
+    finally:
+        os.remove(manifest_path)
+    return {"uploaded": len(todo), "skipped": len(chunks) - len(todo), "bytes": sent}
+
+
+def fetch_manifest(prefs: Any, project: str,
+                   bucket: str = BUCKET) -> Optional[Dict[str, str]]:
+    """Return the remote ``{name: hash}`` manifest, or None if there is none."""
+    if MANIFEST_NAME not in storage.list_objects(prefs, bucket, project):
+        return None
+    path = storage.fetch_cached(prefs, manifest_key(project), bucket).path
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)["objects"]
+
+
+def download_chunks(prefs: Any, project: str, digests: Iterable[str],
+                    bucket: str = BUCKET,
+                    on_progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, str]:
+    """Fetch each chunk once through the download cache; return ``{hash: path}``.
+
+    Chunks are content-addressed, so cached ones are only revalidated.
+    *on_progress* counts chunks, not bytes.
+    """
+    digests = list(dict.fromkeys(digests))
+    paths: Dict[str, str] = {}
+    for index, digest in enumerate(digests, 1):
+        paths[digest] = storage.fetch_cached(prefs, chunk_key(project, digest), bucket).path
+        if on_progress is not None:
+            on_progress(index, len(digests))
+    return paths
+
+
+# -----------------------------------------------------------------------------
+# Apply (main thread)
+# -----------------------------------------------------------------------------
+
+def mark_sent(manifest: Dict[str, str], names: Iterable[str]) -> None:
+    """Remember the uploaded hash on objects that still match it."""
+    cache: Dict[int, bytes] = {}
+    for name in names:
+        obj = bpy.data.objects.get(name)
+        if obj is not None and fingerprint(obj, cache) == manifest[name]:
+            obj[SENT_PROP] = manifest[name]
+
+
+def local_manifest(objects: Iterable[Any]) -> Dict[str, str]:
+    """``{name: hash}`` of synced objects: the hash received with, else the one last uploaded."""
+    manifest = {}
+    for obj in objects:
+        digest = obj.get(RECEIVED_PROP) or obj.get(SENT_PROP)
+        if digest:
+            manifest[obj.name] = digest
+    return manifest
+
+
+def local_only(objects: Iterable[Any]) -> frozenset:
+    """Names of objects that did not come from a download; a download leaves them alone."""
+    return frozenset(obj.name for obj in objects if not obj.get(RECEIVED_PROP))
+
+
+def apply(remote: Dict[str, str], changed: Iterable[str], removed: Iterable[str],
+          paths: Dict[str, str]) -> int:
+    """Replace *changed* objects from their chunks and delete *removed* ones.
+
+    Objects without :data:`RECEIVED_PROP` are never removed, and a changed
+    name taken by such an object is skipped rather than overwritten.
+    """
+    objects = bpy.data.objects
+    clashes = set()
+    for name in list(removed) + list(changed):
+        obj = objects.get(name)
+        if obj is None:
+            continue
+        if obj.get(RECEIVED_PROP):
+            objects.remove(obj, do_unlink=True)
+        else:
+            clashes.add(name)
+    imported = 0
+    for name in changed:
+        if name in clashes:
+            continue
+        bpy.ops.import_scene.gltf(filepath=paths[remote[name]])
+        new = [obj for obj in bpy.context.selected_objects if obj.parent is None]
+        if new:
+            new[0].name = name
+            new[0][RECEIVED_PROP] = remote[name]
+            imported += 1
+    return imported
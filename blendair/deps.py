@@ -1,45 +1,230 @@
-import bpy
+"""Optional third-party packages: detection and install prompt.
+
+Detection must not slow down Blender's startup, so nothing is imported
+here. Packages are found with ``importlib.util.find_spec`` under their
+module name, with distribution metadata as a fallback. Results are cached
+on disk, keyed on the interpreter and the modification times of the
+``sys.path`` directories, so the probe is skipped entirely until packages
+are installed or removed. Features import their heavy modules themselves,
+the first time they are used; call :func:`missing_for` before that.
+
+Missing packages are installed by one pip run on a worker thread, with
+pip's output streamed to the status line. With a wheelhouse directory
+(filled beforehand with ``pip download -d <dir> <packages>``) pip installs
+from it with ``--no-index`` and needs no network.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
 import subprocess
 import sys
+import tempfile
+from importlib import metadata
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import bpy
 from bpy.props import BoolProperty
 
-REQUIRED_PACKAGES = [
-    'supabase',
-    'blendluxcore',
-    'mediapipe',
-    'opencv-python',
-]
+from . import logger
+
+# pip distribution name -> importable module name
+PACKAGES = {
+    'supabase': 'supabase',
+    'blendluxcore': 'blendluxcore',
+    'mediapipe': 'mediapipe',
+    'opencv-python': 'cv2',
+}
+REQUIRED_PACKAGES = list(PACKAGES)
+# Which packages each optional feature needs.
+FEATURES = {
+    'supabase': ['supabase'],
+    'render': ['blendluxcore'],
+    'gestures': ['mediapipe', 'opencv-python'],
+}
+CACHE_PATH = Path(tempfile.gettempdir()) / "blendair_deps.json"
+OUTPUT_TAIL = 20  # pip output lines kept for error messages
+
+_STATE: Dict[str, object] = {}
+# Last missing_packages() result, for draw() callbacks; set at register time
+# and after an install.
+_MISSING: Optional[List[str]] = None
+
+
+def _environment_key() -> str:
+    """Identify the interpreter and the state of its package directories."""
+    parts = [sys.executable, sys.version]
+    for entry in sys.path:
+        try:
+            parts.append(f"{entry}:{os.stat(entry or '.').st_mtime_ns}")
+        except OSError:
+            continue
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _probe(pkg: str) -> bool:
+    """True if *pkg* can be imported, without importing it."""
+    try:
+        if importlib.util.find_spec(PACKAGES.get(pkg, pkg)) is not None:
+            return True
+    except (ImportError, ValueError):
+        pass
+    try:
+        metadata.distribution(pkg)
+        return True
+    except metadata.PackageNotFoundError:
+        return False
+
+
+def installed(refresh: bool = False) -> Dict[str, bool]:
+    """``{package: available}`` for :data:`REQUIRED_PACKAGES`, cached in memory and on disk."""
+    key = _environment_key()
+    if not refresh and _STATE.get('key') == key:
+        return dict(_STATE['result'])
+    result: Optional[Dict[str, bool]] = None
+    if not refresh:
+        try:
+            cached = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+            if cached.get('key') == key and set(cached['result']) == set(REQUIRED_PACKAGES):
+                result = cached['result']
+        except (OSError, ValueError, KeyError):
+            pass
+    if result is None:
+        result = {pkg: _probe(pkg) for pkg in REQUIRED_PACKAGES}
+        try:
+            CACHE_PATH.write_text(json.dumps({'key': key, 'result': result}), encoding="utf-8")
+        except OSError as exc:
+            logger.warning(f"Could not cache dependency check: {exc}")
+    _STATE.update(key=key, result=result)
+    return dict(result)
+
+
+def missing_packages(refresh: bool = False) -> List[str]:
+    global _MISSING  # noqa: PLW0603
+    _MISSING = [pkg for pkg, ok in installed(refresh).items() if not ok]
+    return list(_MISSING)
+
+
+def cached_missing() -> List[str]:
+    """The last :func:`missing_packages` result, without touching the disk.
+
+    UI ``draw()`` runs on every redraw, too often to stat ``sys.path``.
+    """
+    if _MISSING is None:
+        return missing_packages()
+    return list(_MISSING)
+
+
+def missing_for(feature: str) -> List[str]:
+    """Packages *feature* needs that are not installed."""
+    available = installed()
+    return [pkg for pkg in FEATURES.get(feature, ())
+            if not (available[pkg] if pkg in available else _probe(pkg))]
+
+
+def invalidate() -> None:
+    """Forget cached results, e.g. after installing packages."""
+    _STATE.clear()
+    try:
+        CACHE_PATH.unlink()
+    except OSError:
+        pass
+
+
+class InstallError(RuntimeError):
+    """pip could not install the requested packages."""
+
+
+def pip_command(packages: List[str], wheelhouse: str = "") -> List[str]:
+    """One pip invocation installing all *packages*, offline if *wheelhouse* is set."""
+    cmd = [sys.executable, "-m", "pip", "install", "--disable-pip-version-check",
+           "--progress-bar", "off"]
+    if wheelhouse:
+        cmd += ["--no-index", "--find-links", wheelhouse]
+    return cmd + list(packages)
+
+
+def install(packages: List[str], wheelhouse: str = "",
+            on_output: Optional[Callable[[str], None]] = None,
+            cancel: Optional[Callable[[], bool]] = None) -> List[str]:
+    """Run pip for *packages*, passing each output line to *on_output*.
+
+    Returns the last lines of output; raises :class:`InstallError` if pip
+    fails or *cancel* returns True.
+    """
+    if importlib.util.find_spec("pip") is None:
+        # Blender's bundled Python may ship without pip.
+        subprocess.run([sys.executable, "-m", "ensurepip", "--upgrade"], check=True,
+                       capture_output=True)
+    tail: List[str] = []
+    with subprocess.Popen(pip_command(packages, wheelhouse), stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT, text=True, bufsize=1) as proc:
+        for line in proc.stdout:
+            line = line.rstrip()
+            if not line:
+                continue
+            tail = (tail + [line])[-OUTPUT_TAIL:]
+            if on_output is not None:
+                on_output(line)
+            if cancel is not None and cancel():
+                proc.terminate()
+                raise InstallError("Installation cancelled")
+    invalidate()
+    missing_packages(refresh=True)
+    if proc.returncode:
+        raise InstallError(f"pip exited with {proc.returncode}: {tail[-1] if tail else 'no output'}")
+    return tail
+
 
 def check_and_prompt_install():
-    missing = [pkg for pkg in REQUIRED_PACKAGES if not _is_installed(pkg)]
+    missing = missing_packages()
     if missing:
-        def install_cb(self, context):
-            for pkg in missing:
-                _pip_install(pkg)
-            self.report({'INFO'}, "BlendAIr: Installed missing dependencies. Please restart Blender.")
         bpy.context.window_manager.popup_menu(
             lambda self, ctx: self.layout.operator('wm.blendair_install_missing', text=f"Install: {', '.join(missing)}"),
             title="BlendAIr: Missing Python Packages", icon='ERROR')
 
 class BLENDAIR_OT_InstallMissing(bpy.types.Operator):
+    """Install missing packages in the background with a single pip run."""
     bl_idname = "wm.blendair_install_missing"
     bl_label = "Install Missing Packages"
+
     def execute(self, context):
-        for pkg in REQUIRED_PACKAGES:
-            if not _is_installed(pkg):
-                _pip_install(pkg)
-        self.report({'INFO'}, "Installed missing dependencies. Please restart Blender.")
-        return {'FINISHED'}
+        from . import dispatch
+        from .utils import current_job, enqueue_job
+        missing = missing_packages(refresh=True)
+        if not missing:
+            self.report({'INFO'}, "All dependencies are installed.")
+            return {'FINISHED'}
+        try:
+            from .addon_prefs import get_pref
+            wheelhouse = bpy.path.abspath(getattr(get_pref(), 'wheelhouse_dir', '') or '')
+        except (AttributeError, KeyError):
+            wheelhouse = ''
+        scene = context.scene
+        wm = context.window_manager
 
-def _is_installed(pkg):
-    try:
-        __import__(pkg)
-        return True
-    except ImportError:
-        return False
+        def _install():
+            job = current_job()
+            return install(missing, wheelhouse,
+                           on_output=lambda line: dispatch.set_status(scene, f"pip: {line[:100]}"),
+                           cancel=lambda: job is not None and job.cancel_requested)
 
-def _pip_install(pkg):
-    subprocess.check_call([sys.executable, '-m', 'pip', 'install', pkg])
+        def _on_done(job):
+            if job.error is not None:
+                message, icon = f"Install failed: {job.error}", 'ERROR'
+            else:
+                message, icon = f"Installed {', '.join(missing)}. Please restart Blender.", 'INFO'
+            scene.blendair_status = message
+            (logger.error if job.error is not None else logger.info)(message)
+            wm.popup_menu(lambda menu, ctx: menu.layout.label(text=message),
+                          title="BlendAIr Dependencies", icon=icon)
+
+        scene.blendair_status = f"Installing {', '.join(missing)}..."
+        enqueue_job({"func": _install, "label": "pip install", "on_done": _on_done})
+        self.report({'INFO'}, "Installing dependencies in the background.")
+        return {'FINISHED'}
 
 def register():
     bpy.utils.register_class(BLENDAIR_OT_InstallMissing)
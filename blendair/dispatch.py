@@ -0,0 +1,188 @@
+"""Main-thread dispatcher for work that must touch ``bpy``.
+
+Worker threads do network I/O and then hand callables (usually compiled
+prompt scripts) to :func:`submit`. A ``bpy.app.timers`` callback drains the
+queue in submission order, running jobs until the per-tick time budget is
+spent so the viewport keeps redrawing between them.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from queue import Empty, Queue
+from types import CodeType
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import bpy
+
+from . import logger, tracing
+
+TICK_BUDGET = 0.02  # seconds of main-thread work per timer tick
+IDLE_INTERVAL = 0.05
+BUSY_INTERVAL = 0.0
+HISTORY_SIZE = 50
+
+
+class MainThreadJob:
+    """One unit of main-thread work with its timing."""
+
+    def __init__(self, func: Callable[[], Any], label: str = "",
+                 on_done: Optional[Callable[["MainThreadJob"], None]] = None) -> None:
+        self.func = func
+        self.label = label
+        self.on_done = on_done
+        self.submitted = time.perf_counter()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    @property
+    def wait_time(self) -> Optional[float]:
+        """Seconds spent queued before the main thread picked the job up."""
+        return None if self.started is None else self.started - self.submitted
+
+    @property
+    def exec_time(self) -> Optional[float]:
+        """Seconds spent running on the main thread."""
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+    def run(self) -> None:
+        self.started = time.perf_counter()
+        tracing.record("dispatch.wait", self.started - self.submitted, self.submitted, label=self.label)
+        try:
+            self.result = self.func()
+        except Exception as exc:  # noqa: BLE001
+            self.error = exc
+            logger.error(f"Main-thread job '{self.label}' failed: {exc}", exc, label=self.label)
+        self.finished = time.perf_counter()
+        if self.on_done is not None:
+            try:
+                self.on_done(self)
+            except Exception as exc:  # noqa: BLE001
+                logger.error(f"Completion callback for '{self.label}' failed: {exc}", exc, label=self.label)
+
+
+_QUEUE: "Queue[MainThreadJob]" = Queue()
+_DONE: Deque[MainThreadJob] = deque(maxlen=HISTORY_SIZE)
+_STATUS_LOCK = threading.Lock()
+_PENDING_STATUS: Dict[int, Tuple[Any, str]] = {}
+
+
+def submit(func: Callable[[], Any], label: str = "",
+           on_done: Optional[Callable[[MainThreadJob], None]] = None) -> MainThreadJob:
+    """Queue *func* to run on the main thread; safe to call from any thread."""
+    job = MainThreadJob(func, label, on_done)
+    _QUEUE.put(job)
+    return job
+
+
+def submit_code(code: CodeType, label: str = "",
+                on_done: Optional[Callable[[MainThreadJob], None]] = None,
+                namespace: Optional[Dict[str, Any]] = None) -> MainThreadJob:
+    """Queue a compiled prompt script for execution on the main thread.
+
+    The script runs as one undo step (see :mod:`.execution`); the job result
+    is its :class:`~.execution.ScriptTiming`. *namespace* adds globals next
+    to ``bpy`` (e.g. rewrite helpers).
+    """
+    from . import execution
+    return submit(lambda: execution.run(code, namespace, label), label, on_done)
+
+
+def set_status(scene: Any, text: str) -> None:
+    """Set ``scene.blendair_status`` from any thread.
+
+    Only the latest text per scene is kept, so fast progress updates from a
+    stream never pile up behind real work.
+    """
+    with _STATUS_LOCK:
+        _PENDING_STATUS[id(scene)] = (scene, text)
+
+
+def _flush_status() -> None:
+    with _STATUS_LOCK:
+        pending = list(_PENDING_STATUS.values())
+        _PENDING_STATUS.clear()
+    for scene, text in pending:
+        try:
+            scene.blendair_status = text
+        except (AttributeError, ReferenceError):
+            pass  # scene was removed while the job ran
+    if pending:
+        _tag_redraw()
+
+
+def _tag_redraw() -> None:
+    wm = getattr(getattr(bpy, "context", None), "window_manager", None)
+    for window in getattr(wm, "windows", ()):
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+
+def drain(budget: float = TICK_BUDGET) -> int:
+    """Run queued jobs until *budget* seconds are used; return how many ran.
+
+    At least one job runs per call so a single slow script cannot starve the
+    queue.
+    """
+    _flush_status()
+    deadline = time.perf_counter() + budget
+    ran = 0
+    while ran == 0 or time.perf_counter() < deadline:
+        try:
+            job = _QUEUE.get_nowait()
+        except Empty:
+            break
+        job.run()
+        _DONE.append(job)
+        ran += 1
+    if ran:
+        _flush_status()
+    return ran
+
+
+def _timer() -> float:
+    drain()
+    return BUSY_INTERVAL if not _QUEUE.empty() else IDLE_INTERVAL
+
+
+def stats() -> Dict[str, Any]:
+    """Return queue depth and wait/execution times of recent jobs."""
+    done = list(_DONE)
+    waits = [j.wait_time for j in done if j.wait_time is not None]
+    execs = [j.exec_time for j in done if j.exec_time is not None]
+    return {
+        "depth": _QUEUE.qsize(),
+        "completed": len(done),
+        "last_wait": waits[-1] if waits else 0.0,
+        "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+        "last_exec": execs[-1] if execs else 0.0,
+        "avg_exec": sum(execs) / len(execs) if execs else 0.0,
+    }
+
+
+def start() -> None:
+    """Register the drain timer (no-op outside Blender)."""
+    timers = getattr(getattr(bpy, "app", None), "timers", None)
+    if timers is not None and not timers.is_registered(_timer):
+        timers.register(_timer, first_interval=IDLE_INTERVAL, persistent=True)
+
+
+def stop() -> None:
+    """Unregister the drain timer and drop any queued work."""
+    timers = getattr(getattr(bpy, "app", None), "timers", None)
+    if timers is not None and timers.is_registered(_timer):
+        timers.unregister(_timer)
+    while True:
+        try:
+            _QUEUE.get_nowait()
+        except Empty:
+            break
+    with _STATUS_LOCK:
+        _PENDING_STATUS.clear()
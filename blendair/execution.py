@@ -0,0 +1,125 @@
+"""Run generated scripts as one atomic, undoable step.
+
+Operators called from a timer each push their own undo step and may
+re-evaluate the depsgraph. Running the script inside the internal
+``blendair.run_script`` operator (``UNDO`` flag) makes Blender suppress
+those nested pushes and record exactly one step for the whole script.
+Our own depsgraph handlers are paused while it runs and the depsgraph is
+evaluated once afterwards, which is timed separately from the script. If
+the script raises, the partial changes are rolled back to the last undo
+step.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import itertools
+import threading
+import time
+from types import CodeType
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import bpy
+
+from . import logger, scene_context, tracing
+
+
+class ScriptTiming(NamedTuple):
+    script: float  # seconds in script code
+    depsgraph: float  # seconds evaluating the depsgraph afterwards
+    undo: float  # seconds of operator and undo-push overhead
+
+
+_TOKENS = itertools.count(1)
+_LOCK = threading.Lock()
+_PENDING: Dict[int, Tuple[CodeType, Dict[str, Any]]] = {}
+_OUTCOMES: Dict[int, Tuple[float, Optional[BaseException]]] = {}
+
+
+def execute_pending(token: int) -> bool:
+    """Run the script registered under *token*; called by ``blendair.run_script``.
+
+    Returns False if the script raised; the error is kept for :func:`run`.
+    """
+    with _LOCK:
+        code, namespace = _PENDING.pop(token)
+    start = time.perf_counter()
+    error: Optional[BaseException] = None
+    try:
+        exec(code, namespace)
+    except Exception as exc:  # noqa: BLE001
+        error = exc
+    with _LOCK:
+        _OUTCOMES[token] = (time.perf_counter() - start, error)
+    return error is None
+
+
+def window_override():
+    """Context override giving operators called from timers a window."""
+    windows = getattr(getattr(bpy.context, "window_manager", None), "windows", None)
+    if not windows or not hasattr(bpy.context, "temp_override"):
+        return contextlib.nullcontext()
+    return bpy.context.temp_override(window=windows[0])
+
+
+def _has_operator() -> bool:
+    return hasattr(getattr(bpy.ops, "blendair", None), "run_script")
+
+
+def _rollback(label: str) -> bool:
+    """Restore the last undo step, discarding changes made since."""
+    ed = getattr(bpy.ops, "ed", None)
+    if ed is None or getattr(bpy.app, "background", False):
+        return False
+    try:
+        with window_override():
+            # Record the broken state as its own step, then step back over it.
+            ed.undo_push(message=f"BlendAIr failed: {label}")
+            ed.undo()
+        return True
+    except (RuntimeError, AttributeError) as exc:
+        logger.warning(f"Could not roll back failed script: {exc}", label=label)
+        return False
+
+
+def _evaluate_depsgraph() -> float:
+    view_layer = getattr(bpy.context, "view_layer", None)
+    start = time.perf_counter()
+    if view_layer is not None:
+        view_layer.update()
+    return time.perf_counter() - start
+
+
+def run(code: CodeType, namespace: Optional[Dict[str, Any]] = None, label: str = "") -> ScriptTiming:
+    """Run *code* as one undo step on the main thread.
+
+    If the script raises, its changes are rolled back and the exception is
+    re-raised with a ``rolled_back`` attribute telling whether that worked.
+    """
+    token = next(_TOKENS)
+    with _LOCK:
+        _PENDING[token] = (code, dict(namespace or {}, bpy=bpy))
+    start = time.perf_counter()
+    with scene_context.paused():
+        try:
+            if _has_operator():
+                with window_override():
+                    bpy.ops.blendair.run_script('EXEC_DEFAULT', token=token, label=label[:60])
+            else:
+                execute_pending(token)
+        finally:
+            with _LOCK:
+                _PENDING.pop(token, None)
+                script_time, error = _OUTCOMES.pop(token, (0.0, None))
+        total = time.perf_counter() - start
+        if error is not None:
+            error.rolled_back = _has_operator() and _rollback(label)
+            raise error
+        depsgraph_time = _evaluate_depsgraph()
+    timing = ScriptTiming(script_time, depsgraph_time, max(0.0, total - script_time))
+    if tracing.enabled():
+        # The operator call (script plus undo push) encloses the script span.
+        tracing.record("exec.operator", total, start, label=label)
+        tracing.record("exec.script", timing.script, start, label=label)
+        tracing.record("exec.depsgraph", timing.depsgraph, start + total, label=label)
+    return timing
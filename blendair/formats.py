@@ -0,0 +1,127 @@
+"""Interchange formats for moving models to and from Supabase Storage.
+
+OBJ text is large and slow to parse, so models can also travel as binary
+glTF (GLB) or as gzip-compressed OBJ. Plain OBJ stays available for
+tools that only read OBJ. Export and import touch ``bpy`` and must run on
+the main thread. :func:`compress` and :func:`decompress` are plain file
+I/O, so they run on a worker thread next to the transfer.
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+import shutil
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+import bpy
+
+GZIP_LEVEL = 6
+COPY_BUFFER = 1024 * 1024
+BASE_NAME = "model"
+
+
+class Format(NamedTuple):
+    name: str
+    suffix: str  # file name suffix on the wire
+    content_type: str
+    label: str
+
+
+FORMATS = {
+    "glb": Format("glb", ".glb", "model/gltf-binary", "glTF Binary (GLB)"),
+    "obj_gz": Format("obj_gz", ".obj.gz", "application/gzip", "OBJ + gzip"),
+    "obj": Format("obj", ".obj", "text/plain", "OBJ (uncompressed)"),
+}
+# Download preference when the requested format is not on the server.
+NEGOTIATION_ORDER = ("glb", "obj_gz", "obj")
+
+
+def enum_items():
+    """Items for the transfer format ``EnumProperty``."""
+    return [(fmt.name, fmt.label, f"Transfer models as {fmt.label}") for fmt in FORMATS.values()]
+
+
+def filename(name: str, base: str = BASE_NAME) -> str:
+    return base + FORMATS[name].suffix
+
+
+def from_filename(path: str) -> Optional[Format]:
+    """Return the format whose suffix *path* ends with, if any."""
+    lower = path.lower()
+    # Longest suffix first so ``.obj.gz`` is not taken for ``.gz`` alone.
+    for fmt in sorted(FORMATS.values(), key=lambda f: -len(f.suffix)):
+        if lower.endswith(fmt.suffix):
+            return fmt
+    return None
+
+
+def negotiate(available: Iterable[str], preferred: str = "glb",
+              base: str = BASE_NAME) -> Optional[str]:
+    """Pick the object name to download from *available* names.
+
+    The *preferred* format wins if present, then :data:`NEGOTIATION_ORDER`.
+    """
+    names = set(available)
+    order: Sequence[str] = (preferred,) + tuple(n for n in NEGOTIATION_ORDER if n != preferred)
+    for name in order:
+        if name in FORMATS and filename(name, base) in names:
+            return filename(name, base)
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Compression (worker thread)
+# -----------------------------------------------------------------------------
+
+def compress(src: str, dst: str, level: int = GZIP_LEVEL) -> str:
+    """Stream *src* into the gzip file *dst* and delete *src*."""
+    with open(src, "rb") as fin, gzip.open(dst, "wb", compresslevel=level) as fout:
+        shutil.copyfileobj(fin, fout, COPY_BUFFER)
+    os.remove(src)
+    return dst
+
+
+def decompress(src: str, dst: str) -> str:
+    """Stream the gzip file *src* into *dst*."""
+    with gzip.open(src, "rb") as fin, open(dst, "wb") as fout:
+        shutil.copyfileobj(fin, fout, COPY_BUFFER)
+    return dst
+
+
+# -----------------------------------------------------------------------------
+# Export / import (main thread)
+# -----------------------------------------------------------------------------
+
+def _new_obj_ops() -> bool:
+    # The C++ OBJ operators arrived in 3.2; the Python ones were removed in 4.0.
+    return tuple(getattr(bpy.app, "version", (4, 0, 0))) >= (3, 2, 0)
+
+
+def export_scene(path: str, name: str) -> str:
+    """Export the scene for format *name*.
+
+    Returns the file that was written. For ``obj_gz`` that is the
+    uncompressed OBJ, which the caller passes to :func:`compress` off the
+    main thread.
+    """
+    if name == "glb":
+        bpy.ops.export_scene.gltf(filepath=path, export_format='GLB', use_selection=False)
+        return path
+    if name == "obj_gz" and path.endswith(".gz"):
+        path = path[:-3]
+    if _new_obj_ops():
+        bpy.ops.wm.obj_export(filepath=path, export_selected_objects=False)
+    else:
+        bpy.ops.export_scene.obj(filepath=path, use_selection=False)
+    return path
+
+
+def import_file(path: str) -> None:
+    """Import a downloaded model; ``.obj.gz`` must already be decompressed."""
+    if path.lower().endswith(".glb"):
+        bpy.ops.import_scene.gltf(filepath=path)
+    elif _new_obj_ops():
+        bpy.ops.wm.obj_import(filepath=path)
+    else:
+        bpy.ops.import_scene.obj(filepath=path)
@@ -0,0 +1,538 @@
+"""Prompt history: local SQLite store, in-memory index and Supabase sync.
+
+Panels read history from memory only. Entries are loaded once in the
+background, kept in a dict for O(1) lookup by id and indexed by word for
+search; derived lists are cached until the next write. Local changes are
+pushed to, and newer rows pulled from, the remote ``prompt_history`` table
+by a background job. Pulls page through the remote table by
+``(created_at, id)`` from a high-water mark that only pulled rows move,
+so rows pushed from here never make the pull skip remote ones.
+"""
+
+from __future__ import annotations
+
+import bisect
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import logger
+from .cache import DEFAULT_CACHE_DIR
+
+HISTORY_PATH = DEFAULT_CACHE_DIR / "history.sqlite3"
+REMOTE_TABLE = "prompt_history"
+SYNC_PAGE = 500
+PAGE_SIZE = 50
+_FIELDS = ("id", "user_id", "project_id", "prompt", "response", "favorite", "created_at")
+_WORD = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+def _sort_key(entry: Dict[str, Any]) -> Tuple[str, str]:
+    return (entry.get("created_at") or "", entry["id"])
+
+
+def _cursor(entry: Dict[str, Any]) -> str:
+    return "|".join(_sort_key(entry))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class HistoryStore:
+    """Local history with an inverted index; safe to share between threads."""
+
+    def __init__(self, path: Path = HISTORY_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " id TEXT PRIMARY KEY, user_id TEXT, project_id TEXT, prompt TEXT, response TEXT,"
+            " favorite INTEGER DEFAULT 0, created_at TEXT, synced INTEGER DEFAULT 0)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS tombstones (id TEXT PRIMARY KEY)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS sync_marks (name TEXT PRIMARY KEY, cursor TEXT)")
+        self._db.commit()
+        self.version = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._index: Dict[str, Set[str]] = {}
+        self._views: Dict[Tuple[Any, ...], List[Dict[str, Any]]] = {}
+        self._keys: Dict[int, List[Tuple[str, str]]] = {}
+        for row in self._db.execute(f"SELECT {', '.join(_FIELDS)} FROM history"):
+            self._remember(dict(zip(_FIELDS, row)))
+
+    # -- in-memory index ------------------------------------------------------
+
+    def _remember(self, entry: Dict[str, Any]) -> None:
+        entry["favorite"] = bool(entry.get("favorite"))
+        self._forget(entry["id"])
+        self._entries[entry["id"]] = entry
+        for token in _tokens(f"{entry.get('prompt') or ''} {entry.get('response') or ''}"):
+            self._index.setdefault(token, set()).add(entry["id"])
+
+    def _forget(self, entry_id: str) -> None:
+        old = self._entries.pop(entry_id, None)
+        if old is None:
+            return
+        for token in _tokens(f"{old.get('prompt') or ''} {old.get('response') or ''}"):
+            ids = self._index.get(token)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._index[token]
+
+    def _changed(self) -> None:
+        self.version += 1
+        self._views.clear()
+        self._keys.clear()
+
+    # -- reads (memory only) --------------------------------------------------
+
+    def get(self, entry_id: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(str(entry_id))
+
+    def entries(self, user_id: Optional[str] = None, project_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return entries newest first, optionally filtered; cached until the next write."""
+        key = ("all", user_id, project_id)
+        with self._lock:
+            view = self._views.get(key)
+            if view is None:
+                view = sorted(
+                    (e for e in self._entries.values()
+                     if (user_id is None or e.get("user_id") == user_id)
+                     and (project_id is None or e.get("project_id") == project_id)),
+                    key=_sort_key, reverse=True,
+                )
+                self._views[key] = view
+            return view
+
+    def search(self, query: str, user_id: Optional[str] = None,
+               project_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return entries containing every word of *query*.
+
+        The last word matches as a prefix so results update while typing.
+        """
+        words = _WORD.findall(query.lower())
+        if not words:
+            return self.entries(user_id, project_id)
+        key = ("search", " ".join(words), user_id, project_id)
+        with self._lock:
+            view = self._views.get(key)
+            if view is not None:
+                return view
+            matches: Optional[Set[str]] = None
+            for i, word in enumerate(words):
+                if i == len(words) - 1:
+                    ids = set().union(*(ids for token, ids in self._index.items() if token.startswith(word)))
+                else:
+                    ids = self._index.get(word, set())
+                matches = set(ids) if matches is None else matches & ids
+                if not matches:
+                    break
+            view = [e for e in self.entries(user_id, project_id) if e["id"] in (matches or ())]
+            self._views[key] = view
+            return view
+
+    def page(self, user_id: Optional[str] = None, project_id: Optional[str] = None, query: str = "",
+             cursor: Optional[str] = None, limit: int = PAGE_SIZE) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return ``(entries, next_cursor)`` for the *limit* entries older than *cursor*.
+
+        Cursors are ``created_at|id`` keys rather than offsets, so pages stay
+        stable while new entries arrive at the top. *next_cursor* is None on
+        the last page.
+        """
+        view = self.search(query, user_id, project_id)
+        start = 0
+        if cursor:
+            with self._lock:
+                keys = self._keys.get(id(view))
+                if keys is None:
+                    keys = self._keys[id(view)] = [_sort_key(e) for e in reversed(view)]
+            created_at, _, entry_id = cursor.partition("|")
+            start = len(view) - bisect.bisect_left(keys, (created_at, entry_id))
+        items = view[start:start + limit]
+        next_cursor = _cursor(items[-1]) if items and start + limit < len(view) else None
+        return items, next_cursor
+
+    # -- writes ----------------------------------------------------------------
+
+    def add(self, prompt: str, response: str, user_id: str = "local",
+            project_id: str = "demo") -> Dict[str, Any]:
+        entry = {"id": uuid.uuid4().hex, "user_id": user_id, "project_id": project_id,
+                 "prompt": prompt, "response": response, "favorite": False, "created_at": _now()}
+        with self._lock:
+            self._db.execute(
+                f"INSERT INTO history ({', '.join(_FIELDS)}, synced) VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                tuple(entry[f] for f in _FIELDS),
+            )
+            self._db.commit()
+            self._remember(entry)
+            self._changed()
+        return entry
+
+    def set_favorite(self, entry_id: str, favorite: bool) -> bool:
+        with self._lock:
+            entry = self._entries.get(str(entry_id))
+            if entry is None:
+                return False
+            self._db.execute("UPDATE history SET favorite = ?, synced = 0 WHERE id = ?",
+                             (int(favorite), entry["id"]))
+            self._db.commit()
+            entry["favorite"] = favorite
+            self._changed()
+            return True
+
+    def delete(self, entry_id: str) -> bool:
+        entry_id = str(entry_id)
+        with self._lock:
+            if entry_id not in self._entries:
+                return False
+            self._db.execute("DELETE FROM history WHERE id = ?", (entry_id,))
+            self._db.execute("INSERT OR IGNORE INTO tombstones (id) VALUES (?)", (entry_id,))
+            self._db.commit()
+            self._forget(entry_id)
+            self._changed()
+            return True
+
+    # -- sync bookkeeping --------------------------------------------------------
+
+    def unsynced(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_FIELDS)} FROM history WHERE synced = 0").fetchall()
+        return [dict(zip(_FIELDS, row), favorite=bool(row[5])) for row in rows]
+
+    def tombstones(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT id FROM tombstones")]
+
+    def mark_synced(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            self._db.executemany("UPDATE history SET synced = 1 WHERE id = ?", [(i,) for i in ids])
+            self._db.commit()
+
+    def clear_tombstones(self, ids: Iterable[str]) -> None:
+        with self._lock:
+            self._db.executemany("DELETE FROM tombstones WHERE id = ?", [(i,) for i in ids])
+            self._db.commit()
+
+    def sync_mark(self, name: str) -> Optional[str]:
+        """Return the ``created_at|id`` cursor saved as *name*, if any."""
+        with self._lock:
+            row = self._db.execute("SELECT cursor FROM sync_marks WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_sync_mark(self, name: str, cursor: str) -> None:
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO sync_marks (name, cursor) VALUES (?, ?)", (name, cursor))
+            self._db.commit()
+
+    def merge_remote(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Insert or update rows pulled from the remote table; return how many changed."""
+        tombstoned = set(self.tombstones())
+        changed = 0
+        with self._lock:
+            for row in rows:
+                entry = {f: row.get(f) for f in _FIELDS}
+                entry["id"] = str(entry["id"])
+                if entry["id"] in tombstoned:
+                    continue
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO history ({', '.join(_FIELDS)}, synced) VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+                    tuple(int(bool(entry[f])) if f == "favorite" else entry[f] for f in _FIELDS),
+                )
+                self._remember(entry)
+                changed += 1
+            if changed:
+                self._db.commit()
+                self._changed()
+        return changed
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# -----------------------------------------------------------------------------
+# Remote sync
+# -----------------------------------------------------------------------------
+
+def _remote(prefs: Any) -> Optional[Tuple[str, Dict[str, str]]]:
+    url = (getattr(prefs, "supabase_url", "") or "").rstrip("/")
+    key = getattr(prefs, "supabase_key", "")
+    if not url or not key or "YOURPROJECT" in url:
+        return None
+    headers = {"apikey": key, "Authorization": f"Bearer {key}", "Content-Type": "application/json"}
+    return f"{url}/rest/v1/{REMOTE_TABLE}", headers
+
+
+def sync(store: HistoryStore, prefs: Any, limit: int = SYNC_PAGE) -> int:
+    """Push local changes and pull newer remote rows; return rows pulled.
+
+    The first sync pulls the newest page. Later ones page forward from the
+    newest row pulled so far until the remote has nothing newer.
+    """
+    from . import transport
+    remote = _remote(prefs)
+    if remote is None:
+        return 0
+    url, headers = remote
+    session = transport.session_for(prefs, "supabase")
+    timeout = transport.request_timeout(prefs)
+
+    rows = store.unsynced()
+    if rows:
+        resp = session.post(url, json=rows, timeout=timeout,
+                            headers=dict(headers, Prefer="resolution=merge-duplicates"))
+        resp.raise_for_status()
+        store.mark_synced(row["id"] for row in rows)
+    deleted = store.tombstones()
+    for entry_id in deleted:
+        session.delete(url, params={"id": f"eq.{entry_id}"}, headers=headers, timeout=timeout).raise_for_status()
+    store.clear_tombstones(deleted)
+
+    newest = store.sync_mark("newest")
+    if newest is None:
+        return _pull_newest(store, prefs, limit)
+    pulled = 0
+    while True:
+        rows = _pull(store, prefs, "asc", {"or": _after(newest, "gt")}, limit)
+        pulled += len(rows)
+        if rows:
+            newest = _row_cursor(rows[-1])
+            store.set_sync_mark("newest", newest)
+        if len(rows) < limit:
+            return pulled
+
+
+def _pull_newest(store: HistoryStore, prefs: Any, limit: int) -> int:
+    """Pull the newest page and start both marks from it."""
+    rows = _pull(store, prefs, "desc", {}, limit)
+    if rows:
+        store.set_sync_mark("newest", _row_cursor(rows[0]))
+        store.set_sync_mark("oldest", _row_cursor(rows[-1]))
+    return len(rows)
+
+
+def _row_cursor(row: Dict[str, Any]) -> str:
+    return f"{row.get('created_at') or ''}|{row['id']}"
+
+
+def _after(cursor: str, op: str) -> str:
+    """PostgREST filter for rows past *cursor* in ``(created_at, id)`` order (*op* ``gt``/``lt``)."""
+    created_at, _, entry_id = cursor.partition("|")
+    return (f'(created_at.{op}."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.{op}."{entry_id}"))')
+
+
+def _pull(store: HistoryStore, prefs: Any, order: str, filters: Dict[str, str],
+          limit: int = SYNC_PAGE) -> List[Dict[str, Any]]:
+    """Fetch one keyset page of remote rows in ``(created_at, id)`` *order* and merge it."""
+    from . import transport
+    url, headers = _remote(prefs)
+    params = dict(filters, select=",".join(_FIELDS), order=f"created_at.{order},id.{order}",
+                  limit=str(limit))
+    resp = transport.session_for(prefs, "supabase").get(
+        url, params=params, headers=headers, timeout=transport.request_timeout(prefs))
+    resp.raise_for_status()
+    rows = resp.json()
+    store.merge_remote(rows)
+    return rows
+
+
+def fetch_older(store: HistoryStore, prefs: Any, limit: int = SYNC_PAGE) -> Optional[int]:
+    """Pull the page of remote rows older than the oldest one pulled so far.
+
+    Returns the number of rows received, or None without a remote.
+    """
+    if _remote(prefs) is None:
+        return None
+    oldest = store.sync_mark("oldest")
+    if oldest is None:
+        return _pull_newest(store, prefs, limit)
+    rows = _pull(store, prefs, "desc", {"or": _after(oldest, "lt")}, limit)
+    if rows:
+        store.set_sync_mark("oldest", _row_cursor(rows[-1]))
+    return len(rows)
+
+
+# -----------------------------------------------------------------------------
+# Module-level helpers used by panels and operators
+# -----------------------------------------------------------------------------
+_STORE: Optional[HistoryStore] = None
+_LOADING = threading.Lock()
+_SYNC_PENDING = threading.Event()
+_PREFETCH_PENDING = threading.Event()
+_REMOTE_EXHAUSTED = False
+_LISTENERS: List[Callable[[Optional[str]], None]] = []
+_BACK_INDEX = 0
+
+
+def get_store() -> Optional[HistoryStore]:
+    """Return the loaded store, or None while it is still loading."""
+    return _STORE
+
+
+def _load_and_sync() -> None:
+    global _STORE  # noqa: PLW0603
+    with _LOADING:
+        if _STORE is None:
+            _STORE = HistoryStore()
+    _notify()
+    _sync_now()
+
+
+def subscribe(callback: Callable[[Optional[str]], None]) -> None:
+    """Call *callback* (from any thread) whenever the history changes.
+
+    It receives the id of the one entry that changed, or None when any
+    number of entries may have (load, sync, older pages arriving).
+    """
+    if callback not in _LISTENERS:
+        _LISTENERS.append(callback)
+
+
+def unsubscribe(callback: Callable[[Optional[str]], None]) -> None:
+    if callback in _LISTENERS:
+        _LISTENERS.remove(callback)
+
+
+def _notify(entry_id: Optional[str] = None) -> None:
+    for callback in list(_LISTENERS):
+        callback(entry_id)
+
+
+def _sync_now() -> None:
+    from .addon_prefs import get_pref
+    _SYNC_PENDING.clear()
+    try:
+        if sync(_STORE, get_pref()):
+            _notify()
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(f"History sync failed: {exc}")
+
+
+def _prefetch_now() -> None:
+    global _REMOTE_EXHAUSTED  # noqa: PLW0603
+    from .addon_prefs import get_pref
+    try:
+        received = fetch_older(_STORE, get_pref())
+        _REMOTE_EXHAUSTED = received is None or received < SYNC_PAGE
+        if received:
+            _notify()
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(f"History prefetch failed: {exc}")
+    finally:
+        _PREFETCH_PENDING.clear()
+
+
+def load_async() -> None:
+    """Load the local store and sync it on a background worker."""
+    from .utils import enqueue_job
+    enqueue_job({"func": _load_and_sync, "label": "history load"})
+
+
+def schedule_sync() -> None:
+    """Queue one background sync; repeated calls before it runs are merged."""
+    if _STORE is None or _SYNC_PENDING.is_set():
+        return
+    _SYNC_PENDING.set()
+    from .utils import enqueue_job
+    enqueue_job({"func": _sync_now, "label": "history sync"})
+
+
+def prefetch() -> None:
+    """Queue a fetch of the next older remote page unless one is pending."""
+    if _STORE is None or _REMOTE_EXHAUSTED or _PREFETCH_PENDING.is_set():
+        return
+    _PREFETCH_PENDING.set()
+    from .utils import enqueue_job
+    enqueue_job({"func": _prefetch_now, "label": "history prefetch"})
+
+
+def close() -> None:
+    global _STORE, _REMOTE_EXHAUSTED  # noqa: PLW0603
+    if _STORE is not None:
+        _STORE.close()
+    _STORE = None
+    _REMOTE_EXHAUSTED = False
+    _LISTENERS.clear()
+
+
+def record(prompt: str, response: str, user_id: str = "local", project_id: str = "demo") -> None:
+    """Add a prompt/response pair (call from a worker thread)."""
+    if _STORE is None:
+        return
+    entry = _STORE.add(prompt, response, user_id, project_id)
+    _notify(entry["id"])
+    schedule_sync()
+
+
+def get_prompt_history(user_id: str = "local", project_id: str = "demo",
+                       limit: int = 50, query: str = "") -> List[Dict[str, Any]]:
+    """Return up to *limit* entries from memory; empty while loading."""
+    if _STORE is None:
+        return []
+    if query:
+        return _STORE.search(query, user_id, project_id)[:limit]
+    return _STORE.entries(user_id, project_id)[:limit]
+
+
+def next_page(query: str = "", cursor: Optional[str] = None, limit: int = PAGE_SIZE,
+              user_id: str = "local", project_id: str = "demo") -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Return the page after *cursor* from memory.
+
+    When this is the last locally known page the next remote page is fetched
+    in the background, so it is already local by the time it is requested.
+    """
+    if _STORE is None:
+        return [], None
+    items, next_cursor = _STORE.page(user_id, project_id, query, cursor, limit)
+    if next_cursor is None or _STORE.page(user_id, project_id, query, next_cursor, limit)[1] is None:
+        prefetch()
+    return items, next_cursor
+
+
+def get_entry(entry_id: str) -> Optional[Dict[str, Any]]:
+    """O(1) lookup by id."""
+    return _STORE.get(entry_id) if _STORE is not None else None
+
+
+def entry_cursor(entry_id: str) -> Optional[str]:
+    """Cursor of the page that follows *entry_id*, or None if it is unknown."""
+    entry = get_entry(entry_id)
+    return _cursor(entry) if entry is not None else None
+
+
+def update_prompt_favorite(entry_id: str, favorite: bool) -> None:
+    if _STORE is None or not _STORE.set_favorite(entry_id, favorite):
+        raise KeyError(f"History entry {entry_id} not found")
+    _notify(entry_id)
+    schedule_sync()
+
+
+def delete_entry(entry_id: str) -> None:
+    if _STORE is None or not _STORE.delete(entry_id):
+        raise KeyError(f"History entry {entry_id} not found")
+    _notify(entry_id)
+    schedule_sync()
+
+
+def go_back(user_id: str = "local", project_id: str = "demo") -> Optional[Dict[str, Any]]:
+    """Step one entry further back in history on each call."""
+    global _BACK_INDEX  # noqa: PLW0603
+    entries = get_prompt_history(user_id, project_id, limit=_BACK_INDEX + 2)
+    if _BACK_INDEX + 1 >= len(entries):
+        return None
+    _BACK_INDEX += 1
+    return entries[_BACK_INDEX]
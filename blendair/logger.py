@@ -0,0 +1,181 @@
+"""Structured logging that never blocks the calling thread on disk I/O.
+
+Records go onto a queue and a background thread writes them as JSON lines
+(timestamp, level, message, thread, job id and any fields such as
+``provider`` or ``latency``) to a size-rotated file and echoes them to the
+console. Tracebacks are formatted on that thread too. Independently of
+the file, the most recent events are kept in an in-memory ring buffer that
+panels read through :func:`recent`.
+
+Calls before :func:`start` (and after :func:`stop`) only reach the ring
+buffer.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+LOGGER_NAME = "blendair"
+DEFAULT_MAX_BYTES = 1024 * 1024
+DEFAULT_BACKUPS = 3
+RING_SIZE = 200
+CONSOLE_PREFIX = "[BlendAIr] "
+LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+_LOGGER = logging.getLogger(LOGGER_NAME)
+_LOGGER.propagate = False
+_LOGGER.setLevel(logging.INFO)
+_RING: Deque[Dict[str, Any]] = deque(maxlen=RING_SIZE)
+_LOCK = threading.Lock()
+_LISTENER: Optional[logging.handlers.QueueListener] = None
+_QUEUE_HANDLER: Optional[logging.Handler] = None
+
+
+def _event(record: logging.LogRecord) -> Dict[str, Any]:
+    entry = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+        "level": record.levelname,
+        "msg": record.getMessage(),
+        "thread": record.threadName,
+    }
+    entry.update(getattr(record, "fields", {}))
+    return entry
+
+
+class _ContextFilter(logging.Filter):
+    """Tag records with the job running on the calling thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        from .utils import current_job  # lazy: utils logs through this module
+        job = current_job()
+        if job is not None:
+            record.fields = dict(getattr(record, "fields", {}), job=job.id)
+        return True
+
+
+class _RingHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        _RING.append(_event(record))
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records unformatted so tracebacks are rendered on the writer thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = _event(record)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _ConsoleFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = CONSOLE_PREFIX + record.getMessage()
+        if record.levelno >= logging.WARNING:
+            text = f"{CONSOLE_PREFIX}{record.levelname}: {record.getMessage()}"
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+_LOGGER.addFilter(_ContextFilter())
+_LOGGER.addHandler(_RingHandler())
+
+
+# -----------------------------------------------------------------------------
+# Logging calls
+# -----------------------------------------------------------------------------
+
+def log(level: int, message: str, exc: Optional[BaseException] = None, **fields: Any) -> None:
+    """Log *message* with extra JSON *fields*; *exc* adds its traceback."""
+    exc_info = (type(exc), exc, exc.__traceback__) if exc is not None else None
+    _LOGGER.log(level, message, exc_info=exc_info, extra={"fields": fields})
+
+
+def debug(message: str, **fields: Any) -> None:
+    log(logging.DEBUG, message, **fields)
+
+
+def info(message: str, **fields: Any) -> None:
+    log(logging.INFO, message, **fields)
+
+
+def warning(message: str, exc: Optional[BaseException] = None, **fields: Any) -> None:
+    log(logging.WARNING, message, exc, **fields)
+
+
+def error(message: str, exc: Optional[BaseException] = None, **fields: Any) -> None:
+    log(logging.ERROR, message, exc, **fields)
+
+
+def recent(limit: Optional[int] = None, min_level: str = "DEBUG") -> List[Dict[str, Any]]:
+    """Latest events from the ring buffer, oldest first."""
+    threshold = logging.getLevelName(min_level)
+    events = [e for e in list(_RING) if logging.getLevelName(e["level"]) >= threshold]
+    return events[-limit:] if limit else events
+
+
+# -----------------------------------------------------------------------------
+# Writer thread
+# -----------------------------------------------------------------------------
+
+def set_level(level: str) -> None:
+    _LOGGER.setLevel(level if level in LEVELS else "INFO")
+
+
+def start(path: Path, level: str = "INFO", max_bytes: int = DEFAULT_MAX_BYTES,
+          backups: int = DEFAULT_BACKUPS, console: bool = True) -> None:
+    """Start the writer thread for *path* (no-op if already running)."""
+    global _LISTENER, _QUEUE_HANDLER  # noqa: PLW0603
+    set_level(level)
+    with _LOCK:
+        if _LISTENER is not None:
+            return
+        handlers: List[logging.Handler] = []
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+        except OSError as exc:
+            print(f"{CONSOLE_PREFIX}Log file unavailable: {exc}")
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(_ConsoleFormatter())
+            handlers.append(console_handler)
+        records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        _QUEUE_HANDLER = _DeferredQueueHandler(records)
+        _LISTENER = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        _LISTENER.start()
+        _LOGGER.addHandler(_QUEUE_HANDLER)
+
+
+def stop() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _LISTENER, _QUEUE_HANDLER  # noqa: PLW0603
+    with _LOCK:
+        if _LISTENER is None:
+            return
+        _LOGGER.removeHandler(_QUEUE_HANDLER)
+        _LISTENER.stop()
+        for handler in _LISTENER.handlers:
+            handler.close()
+        _LISTENER = _QUEUE_HANDLER = None
@@ -1,7 +1,36 @@
 import bpy
-import threading
-from .prompts import send_prompt
-from .utils import safe_exec, get_supabase, enqueue_job
+import time
+from . import dispatch, history, logger, pipeline, rewrite, scene_context, tracing
+from .addon_prefs import get_pref
+from .prompts import send_prompt, stream_script, StreamStats
+from .utils import safe_exec, enqueue_job, current_job
+
+STATUS_REFRESH_INTERVAL = 0.1
+
+
+def _receive_streamed(prompt, scene, use_cache=True, context=''):
+    """Collect a streamed completion, reporting progress in the status line.
+
+    Each complete statement is checked as it arrives; a rejected one raises
+    :class:`pipeline.ScriptError` and closes the stream.
+    """
+    stats = StreamStats()
+    checker = pipeline.StreamChecker()
+    last_update = 0.0
+    chunks = stream_script(prompt, stats, use_cache=use_cache, context=context)
+    try:
+        for chunk in chunks:
+            checker.feed(chunk)
+            now = time.perf_counter()
+            if now - last_update >= STATUS_REFRESH_INTERVAL:
+                last_update = now
+                dispatch.set_status(scene, f"Receiving... {stats.chars} chars (first token {stats.ttft:.2f}s)")
+    finally:
+        chunks.close()  # drops the connection when a statement was rejected
+    if stats.ttft is not None and not stats.cached:
+        tracing.record("prompt.first_token", stats.ttft, stats.started)
+    return checker.text
+
 
 class BLENDAIR_OT_ExecutePrompt(bpy.types.Operator):
     """Send prompt to LLM and execute the returned Python code."""
@@ -18,63 +47,379 @@ class BLENDAIR_OT_ExecutePrompt(bpy.types.Operator):
             self.report({'WARNING'}, "Prompt is empty.")
             return {'CANCELLED'}
             
+        clicked = time.perf_counter()
         scene.blendair_status = "Sending prompt..."
+        use_cache = not getattr(scene, 'blendair_bypass_cache', False)
+        with tracing.span("prompt.prefs"):
+            prefs = get_pref()
+        # Multi-provider routing goes through send_prompt, which does not stream.
+        stream = (getattr(prefs, 'stream_responses', True)
+                  and getattr(prefs, 'routing_mode', 'single') == 'single')
+        # Built from cached per-object lines, so this stays cheap on big scenes.
+        with tracing.span("prompt.scene_context"):
+            scene_ctx = scene_context.for_prompt(context, prefs, prompt)
+
+        def _on_done(job):
+            """Runs on the main thread once the script has executed."""
+            tracing.record("prompt.total", time.perf_counter() - clicked, clicked,
+                           ok=job.error is None)
+            if job.error is not None:
+                undone = " (changes rolled back)" if getattr(job.error, 'rolled_back', False) else ""
+                scene.blendair_status = f"Error: {job.error}{undone}"
+            else:
+                timing = job.result
+                scene.blendair_status = (f"Success! (script {timing.script * 1000:.0f} ms, "
+                                         f"depsgraph {timing.depsgraph * 1000:.0f} ms, "
+                                         f"undo {timing.undo * 1000:.0f} ms)")
+
+        retries = getattr(prefs, 'script_retries', pipeline.DEFAULT_RETRIES)
+        rewrite_ops = getattr(prefs, 'rewrite_ops_loops', False)
+
+        def _fetch(request, attempt):
+            if attempt:
+                dispatch.set_status(scene, f"Script rejected, retrying ({attempt}/{retries})...")
+            if stream and attempt == 0:
+                return _receive_streamed(request, scene, use_cache, scene_ctx)
+            return send_prompt(request, use_cache=use_cache, context=scene_ctx)
 
         def _run_in_thread():
-            """The actual prompt execution, run in a separate thread to avoid blocking the UI."""
+            """Network I/O and compilation only; bpy is touched on the main thread."""
             try:
-                code = send_prompt(prompt)
-                if code:
-                    exec(code, {'bpy': bpy})
-                    scene.blendair_status = "Success!"
-                else:
-                    scene.blendair_status = "No code returned from AI."
+                with tracing.span("prompt.fetch"):
+                    prepared = pipeline.fetch_prepared(_fetch, prompt, retries, rewrite=rewrite_ops)
+                for warning in prepared.warnings:
+                    logger.warning(warning)
+                if prepared.rewrites:
+                    logger.info(f"Rewrote {prepared.rewrites} bpy.ops loop(s) to the data API")
+                history.record(prompt, prepared.source)
+                dispatch.submit_code(prepared.code, label=prompt[:40], on_done=_on_done,
+                                     namespace=rewrite.namespace() if prepared.rewrites else None)
+                dispatch.set_status(scene, "Queued for execution...")
+            except pipeline.ScriptError as e:
+                dispatch.set_status(scene, f"Rejected: {e}")
+                logger.warning(f"Script rejected: {e}")
             except Exception as e:
-                scene.blendair_status = f"Error: {e}"
-                print(f"BlendAIr Error: {e}")
+                dispatch.set_status(scene, f"Error: {e}")
+                logger.error(f"Prompt failed: {e}", e)
 
-        thread = threading.Thread(target=_run_in_thread, daemon=True)
-        thread.start()
+        enqueue_job({"func": _run_in_thread, "kind": "prompt", "label": prompt[:40]})
         self.report({'INFO'}, "Prompt sent. Running in background.")
         return {'FINISHED'}
 
 
+class BLENDAIR_OT_RunScript(bpy.types.Operator):
+    """Run a queued generated script; the UNDO flag makes it a single undo step."""
+    bl_idname = "blendair.run_script"
+    bl_label = "Run BlendAIr Script"
+    bl_options = {'REGISTER', 'UNDO', 'INTERNAL'}
+
+    token: bpy.props.IntProperty(options={'HIDDEN', 'SKIP_SAVE'})
+    label: bpy.props.StringProperty(options={'HIDDEN', 'SKIP_SAVE'})
+
+    def execute(self, context):
+        from . import execution
+        # A cancelled operator pushes no undo step; execution.run rolls back.
+        return {'FINISHED'} if execution.execute_pending(self.token) else {'CANCELLED'}
+
+
+class BLENDAIR_OT_BatchPrompt(bpy.types.Operator):
+    """Run one prompt per line of a text block or file, applying results in order."""
+    bl_idname = "blendair.batch_prompt"
+    bl_label = "Run Prompt Batch"
+    bl_description = "Fetch completions for many prompts concurrently and execute them in input order"
+
+    source: bpy.props.StringProperty(
+        name="Text Block or File",
+        description="Name of a Blender text block, or path to a file with one prompt per line",
+    )
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    @safe_exec
+    def execute(self, context):
+        from . import batch
+        scene = context.scene
+        prompts = batch.read_prompts(self.source, bpy.data.texts)
+        if not prompts:
+            self.report({'WARNING'}, "No prompts found.")
+            return {'CANCELLED'}
+
+        prefs = get_pref()
+        provider = getattr(prefs, 'llm_provider', 'blendair_cloud')
+        concurrency = getattr(prefs, 'batch_concurrency', batch.DEFAULT_CONCURRENCY)
+        use_cache = not getattr(scene, 'blendair_bypass_cache', False)
+        scene.blendair_status = f"Batch: fetching {len(prompts)} prompts..."
+        # Every prompt sees the scene as it is now, before any result is applied.
+        scene_ctx = scene_context.for_prompt(context, prefs, max(prompts, key=len))
+
+        def _run_batch():
+            report = batch.fetch_all(prompts,
+                                     lambda p: send_prompt(p, use_cache=use_cache, context=scene_ctx),
+                                     provider, concurrency)
+            applied = []
+
+            def _on_done(job):
+                if job.error is None:
+                    applied.append(job)
+
+            # The dispatcher runs jobs FIFO, so scripts apply in input order.
+            for item in report.items:
+                if item.code is not None:
+                    dispatch.submit_code(item.code, label=item.prompt[:40], on_done=_on_done)
+
+            def _finish():
+                for item in report.items:
+                    logger.info(f"Batch #{item.index + 1} {item.latency:.2f}s {item.error or 'ok'}: "
+                                f"{item.prompt[:60]}", latency=round(item.latency, 3))
+                scene.blendair_status = f"Batch: {len(applied)} applied; {report.summary()}"
+            dispatch.submit(_finish, label="batch summary")
+
+        enqueue_job({"func": _run_batch, "kind": "prompt", "label": f"batch of {len(prompts)}"})
+        self.report({'INFO'}, f"Batch of {len(prompts)} prompts queued.")
+        return {'FINISHED'}
+
+
+class BLENDAIR_OT_ClearCache(bpy.types.Operator):
+    bl_idname = "blendair.clear_cache"
+    bl_label = "Clear Response Cache"
+    bl_description = "Delete all cached LLM responses"
+
+    def execute(self, context):
+        from . import cache
+        response_cache = cache.get_cache(get_pref())
+        if response_cache is not None:
+            response_cache.clear()
+        self.report({'INFO'}, "Response cache cleared")
+        return {'FINISHED'}
+
+
+class BLENDAIR_OT_ExportTrace(bpy.types.Operator):
+    """Write the recorded timing spans as a Chrome trace (chrome://tracing, Perfetto)."""
+    bl_idname = "blendair.export_trace"
+    bl_label = "Export Trace"
+
+    filepath: bpy.props.StringProperty(subtype='FILE_PATH', default="blendair_trace.json")
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        try:
+            count = tracing.export_chrome(bpy.path.abspath(self.filepath))
+        except OSError as e:
+            self.report({'ERROR'}, f"Could not write trace: {e}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Exported {count} spans to {self.filepath}")
+        return {'FINISHED'}
+
+
+class BLENDAIR_OT_ResetTrace(bpy.types.Operator):
+    bl_idname = "blendair.reset_trace"
+    bl_label = "Reset Timings"
+    bl_description = "Discard all recorded timing spans"
+
+    def execute(self, context):
+        tracing.reset()
+        return {'FINISHED'}
+
+
+def _transfer_progress(scene, verb):
+    """Status-line progress callback ``(done, total)`` for uploads and downloads."""
+    from .storage import format_size
+    last_update = [0.0]
+
+    def _progress(done, total):
+        now = time.perf_counter()
+        if now - last_update[0] >= STATUS_REFRESH_INTERVAL or done == total:
+            last_update[0] = now
+            dispatch.set_status(scene, f"{verb}... {format_size(done)} / {format_size(total)} "
+                                       f"({done * 100 // max(total, 1)}%)")
+    return _progress
+
+
 class BLENDAIR_OT_UploadModel(bpy.types.Operator):
+    """Export the scene and upload it in resumable chunks on a worker thread."""
     bl_idname = "blendair.upload_model"
     bl_label = "Upload Current Model"
 
+    @safe_exec
     def execute(self, context):
-        supabase = get_supabase()
-        if not supabase:
+        from . import storage
+        prefs = get_pref()
+        if storage.credentials(prefs) is None:
             self.report({'ERROR'}, "Supabase not configured")
             return {'CANCELLED'}
-        temp_path = bpy.path.abspath("//temp_export.obj")
-        bpy.ops.export_scene.obj(filepath=temp_path, use_selection=False)
-        data = open(temp_path, "rb").read()
-        supabase.storage.from_("input_models").upload("model.obj", data, upsert=True)
-        self.report({'INFO'}, "Model uploaded")
+        project = storage.project_name(bpy.data.filepath)
+        if getattr(prefs, 'delta_sync', False):
+            return self._upload_delta(context, prefs, project)
+        return self._upload_full(context, prefs, project)
+
+    def _upload_full(self, context, prefs, project):
+        import os
+        from . import formats, storage
+        scene = context.scene
+        fmt = formats.FORMATS[getattr(prefs, 'transfer_format', 'glb')]
+        key = storage.object_key(project, formats.filename(fmt.name))
+        temp_path = os.path.join(bpy.app.tempdir, key.replace("/", "_"))
+        # Exporting touches bpy, so it stays on the main thread; compression does not.
+        with tracing.span("upload.export", format=fmt.name):
+            exported = formats.export_scene(temp_path, fmt.name)
+        progress = _transfer_progress(scene, "Uploading")
+
+        def _upload():
+            job = current_job()
+            try:
+                if exported != temp_path:
+                    dispatch.set_status(scene, "Compressing...")
+                    with tracing.span("upload.compress"):
+                        formats.compress(exported, temp_path)
+                with tracing.span("upload.transfer", key=key):
+                    return storage.upload_file(prefs, temp_path, key, content_type=fmt.content_type,
+                                               on_progress=progress,
+                                               cancel=lambda: job is not None and job.cancel_requested)
+            finally:
+                for path in {exported, temp_path}:
+                    if os.path.exists(path):
+                        os.remove(path)
+
+        def _on_done(job):
+            if job.error is not None:
+                scene.blendair_status = f"Upload failed: {job.error}"
+            elif job.result is not None:
+                result = job.result
+                scene.blendair_status = (f"Uploaded {result['key']} ({storage.format_size(result['size'])}, "
+                                         f"sha256 {result['sha256'][:12]})")
+
+        scene.blendair_status = "Uploading..."
+        enqueue_job({"func": _upload, "kind": "upload", "label": f"upload {key}", "on_done": _on_done})
+        self.report({'INFO'}, f"Uploading model as {key}")
+        return {'FINISHED'}
+
+    def _upload_delta(self, context, prefs, project):
+        import shutil
+        import tempfile
+        from . import delta, storage
+        scene = context.scene
+        objects = list(scene.objects)
+        with tracing.span("upload.fingerprint", objects=len(objects)):
+            manifest = delta.scene_manifest(objects)
+            pending = delta.pending_uploads(objects, manifest)
+        chunk_dir = tempfile.mkdtemp(prefix="blendair_delta_", dir=bpy.app.tempdir or None)
+        with tracing.span("upload.export", objects=len(pending)):
+            chunks = delta.export_chunks(pending, manifest, chunk_dir)
+        names = [obj.name for obj in pending]
+        progress = _transfer_progress(scene, "Syncing")
+
+        def _upload():
+            job = current_job()
+            try:
+                with tracing.span("upload.transfer", project=project, delta=True):
+                    return delta.upload(prefs, project, manifest, chunks, on_progress=progress,
+                                        cancel=lambda: job is not None and job.cancel_requested)
+            finally:
+                shutil.rmtree(chunk_dir, ignore_errors=True)
+
+        def _on_done(job):
+            if job.error is not None:
+                scene.blendair_status = f"Sync failed: {job.error}"
+            elif job.result is not None:
+                delta.mark_sent(manifest, names)
+                result = job.result
+                scene.blendair_status = (f"Synced {len(manifest)} objects: {result['uploaded']} uploaded "
+                                         f"({storage.format_size(result['bytes'])}), "
+                                         f"{len(manifest) - result['uploaded']} unchanged")
+
+        scene.blendair_status = f"Syncing {len(pending)} changed objects..."
+        enqueue_job({"func": _upload, "kind": "upload", "label": f"sync {project}", "on_done": _on_done})
+        self.report({'INFO'}, f"Syncing {len(pending)} of {len(objects)} objects")
+        return {'FINISHED'}
 
 
 class BLENDAIR_OT_DownloadModel(bpy.types.Operator):
+    """Download the latest model on a worker thread, then import it on the main thread."""
     bl_idname = "blendair.download_model"
     bl_label = "Download Latest Model"
 
+    @safe_exec
     def execute(self, context):
-        supabase = get_supabase()
-        if not supabase:
+        from . import delta, formats, storage
+        prefs = get_pref()
+        if storage.credentials(prefs) is None:
             self.report({'ERROR'}, "Supabase not configured")
             return {'CANCELLED'}
-        try:
-            res = supabase.storage.from_("output_models").download("model.obj")
-            path = bpy.path.abspath("//downloaded.obj")
-            with open(path, "wb") as f:
-                f.write(res)
-            bpy.ops.import_scene.obj(filepath=path)
-            self.report({'INFO'}, "Model downloaded & imported")
-            return {'FINISHED'}
-        except Exception as e:
-            self.report({'ERROR'}, f"Download failed: {e}")
-            return {'CANCELLED'}
+        scene = context.scene
+        project = storage.project_name(bpy.data.filepath)
+        use_delta = getattr(prefs, 'delta_sync', False)
+        # Read on the main thread; the worker only sees plain data.
+        local = delta.local_manifest(scene.objects) if use_delta else {}
+        keep = delta.local_only(scene.objects) if use_delta else frozenset()
+        preferred = getattr(prefs, 'transfer_format', 'glb')
+
+        def _download():
+            job = current_job()
+            cancel = lambda: job is not None and job.cancel_requested  # noqa: E731
+            if use_delta:
+                with tracing.span("download.manifest", project=project):
+                    remote = delta.fetch_manifest(prefs, project)
+                if remote is not None:
+                    changed, removed = delta.diff(local, remote, keep)
+                    with tracing.span("download.transfer", project=project, delta=True):
+                        paths = delta.download_chunks(
+                            prefs, project, [remote[name] for name in changed],
+                            on_progress=lambda done, total: dispatch.set_status(
+                                scene, f"Downloading objects... {done} / {total}"))
+                    return ("delta", remote, changed, removed, paths)
+            return ("full",) + _download_full(prefs, preferred, _transfer_progress(scene, "Downloading"),
+                                              cancel)
+
+        def _on_done(job):
+            """Runs from the dispatcher timer once the bytes are on disk."""
+            if job.error is not None:
+                scene.blendair_status = f"Download failed: {job.error}"
+                return
+            if job.result is None:
+                return
+            from . import execution
+            with tracing.span("download.import"), execution.window_override():
+                if job.result[0] == "delta":
+                    _, remote, changed, removed, paths = job.result
+                    delta.apply(remote, changed, removed, paths)
+                    scene.blendair_status = (f"Synced: {len(changed)} updated, {len(removed)} removed, "
+                                             f"{len(remote) - len(changed)} unchanged")
+                else:
+                    _, name, path, download = job.result
+                    formats.import_file(path)
+                    source = "downloaded" if download.downloaded else "unchanged, from cache"
+                    scene.blendair_status = (f"Imported {name} ({storage.format_size(download.size)}, "
+                                             f"{source})")
+
+        scene.blendair_status = "Downloading..."
+        enqueue_job({"func": _download, "kind": "download", "label": f"download {project}", "on_done": _on_done})
+        self.report({'INFO'}, "Downloading model in background")
+        return {'FINISHED'}
+
+
+def _download_full(prefs, preferred, progress, cancel):
+    """Negotiate, fetch and unpack the whole model (worker thread)."""
+    import os
+    from . import formats, storage
+    # Take the preferred format if the server has it, else the best available.
+    with tracing.span("download.list"):
+        name = formats.negotiate(storage.list_objects(prefs), preferred)
+    if name is None:
+        raise storage.StorageError("No model found on the server")
+    with tracing.span("download.transfer", key=name):
+        download = storage.fetch_cached(prefs, name, on_progress=progress, cancel=cancel)
+    path = download.path
+    if path.endswith(".gz"):
+        unpacked = path[:-3]
+        if download.downloaded or not os.path.exists(unpacked):
+            with tracing.span("download.decompress"):
+                formats.decompress(path, unpacked)
+        path = unpacked
+    return name, path, download
 
 
 class BLENDAIR_OT_Render(bpy.types.Operator):
@@ -82,9 +427,20 @@ class BLENDAIR_OT_Render(bpy.types.Operator):
     bl_label = "Render with LuxCore"
 
     def execute(self, context):
+        from . import deps
+        missing = deps.missing_for('render')
+        if missing:
+            self.report({'ERROR'}, f"Rendering needs: {', '.join(missing)}")
+            return {'CANCELLED'}
+        # Imported on first use so LuxCore never loads at startup.
         from .blendluxcore_integration import render_to_file
         path = bpy.path.abspath("//render.png")
-        enqueue_job({"func": render_to_file, "args": (path,)})
+
+        def _render():
+            with tracing.span("render.total", path=path):
+                return render_to_file(path)
+
+        enqueue_job({"func": _render, "kind": "render", "label": "render"})
         self.report({'INFO'}, "Render queued")
         return {'FINISHED'}
 
@@ -97,7 +453,7 @@ class BLENDAIR_OT_MCPFetch(bpy.types.Operator):
         from .mcp_client import BlenderMCPClient
         client = BlenderMCPClient()
         ctx = client.get_context(project_id="demo")
-        print("Fetched context:", ctx)
+        logger.info(f"Fetched context: {ctx}")
         return {'FINISHED'}
 
 
@@ -118,9 +474,7 @@ class BLENDAIR_OT_RestoreHistory(bpy.types.Operator):
     bl_label = "Restore Prompt State"
     history_id: bpy.props.StringProperty()
     def execute(self, context):
-        from . import history
-        entries = history.get_prompt_history(limit=100)
-        entry = next((e for e in entries if str(e.get('id')) == self.history_id), None)
+        entry = history.get_entry(self.history_id)
         if entry:
             context.scene.blendair_prompt = entry.get('prompt','')
             self.report({'INFO'}, "Prompt restored")
@@ -133,7 +487,6 @@ class BLENDAIR_OT_FavoriteHistory(bpy.types.Operator):
     bl_label = "Favorite Prompt"
     history_id: bpy.props.StringProperty()
     def execute(self, context):
-        from . import history
         try:
             history.update_prompt_favorite(self.history_id, True)
             self.report({'INFO'}, "Favorited!")
@@ -146,9 +499,7 @@ class BLENDAIR_OT_CopyHistory(bpy.types.Operator):
     bl_label = "Copy Prompt/Response"
     history_id: bpy.props.StringProperty()
     def execute(self, context):
-        from . import history
-        entries = history.get_prompt_history(limit=100)
-        entry = next((e for e in entries if str(e.get('id')) == self.history_id), None)
+        entry = history.get_entry(self.history_id)
         if entry:
             text = f"Prompt: {entry.get('prompt','')}\nResponse: {entry.get('response','')}"
             context.window_manager.clipboard = text
@@ -162,20 +513,27 @@ class BLENDAIR_OT_DeleteHistory(bpy.types.Operator):
     bl_label = "Delete Prompt History"
     history_id: bpy.props.StringProperty()
     def execute(self, context):
-        from . import history
         try:
-            history.delete('prompt_history', {'id': f'eq.{self.history_id}'})
+            history.delete_entry(self.history_id)
             self.report({'INFO'}, "Deleted history entry")
         except Exception as e:
             self.report({'ERROR'}, f"Delete failed: {e}")
         return {'FINISHED'}
 
+class BLENDAIR_OT_HistoryMore(bpy.types.Operator):
+    bl_idname = "blendair.history_more"
+    bl_label = "Load More History"
+    bl_description = "Show the next page of older prompts"
+    def execute(self, context):
+        from .panels import load_history_page
+        load_history_page(context.scene)
+        return {'FINISHED'}
+
 class BLENDAIR_OT_GoBackHistory(bpy.types.Operator):
     bl_idname = "blendair.goback_history"
     bl_label = "Go Back to This Point"
     history_id: bpy.props.StringProperty()
     def execute(self, context):
-        from . import history
         from . import ui
         prev = history.go_back()
         if prev:
@@ -1,3 +1,5 @@
+import threading
+
 import bpy
 
 # --- Main Panel --- #
@@ -14,6 +16,10 @@ class BLENDAIR_PT_MainPanel(bpy.types.Panel):
         layout = self.layout
         # The content of the child panels will be drawn automatically as tabs.
         layout.label(text="AI-Powered Workflow")
+        from .utils import job_stats
+        jobs = job_stats()
+        if jobs['running'] or jobs['depth']:
+            layout.label(text=f"Jobs: {jobs['running']} running, {jobs['depth']} queued")
 
 
 # --- Child Panels (Tabs) --- #
@@ -31,8 +37,171 @@ class BLENDAIR_PT_PromptPanel(bpy.types.Panel):
         layout.label(text="Enter your prompt:")
         layout.prop(context.scene, "blendair_prompt", text="")
         layout.operator("execute.prompt", text="Run Prompt")
+        layout.operator("blendair.batch_prompt", text="Run Batch...")
+        layout.prop(context.scene, "blendair_bypass_cache", text="Bypass Cache")
         layout.label(text=f"Status: {context.scene.blendair_status}")
 
+        from . import cache, dispatch
+        queue = dispatch.stats()
+        if queue['depth'] or queue['completed']:
+            layout.label(text=f"Queue: {queue['depth']} pending, wait {queue['last_wait'] * 1000:.0f} ms, "
+                              f"exec {queue['last_exec'] * 1000:.0f} ms")
+        stats = cache.current_stats()
+        if stats:
+            row = layout.row()
+            row.label(text=f"Cache: {stats['hits']} hits / {stats['misses']} misses, {stats['entries']} entries")
+            row.operator("blendair.clear_cache", text="", icon='TRASH')
+
+
+# --- History List --- #
+
+HISTORY_PREFETCH_MARGIN = 10
+_HISTORY_END = object()
+# Scene name -> cursor of the next page, _HISTORY_END once everything is loaded.
+_history_cursors = {}
+_history_refresh_pending = False
+# Entry ids changed since the last refresh; None when any entry may have changed.
+_history_changes = set()
+_history_lock = threading.Lock()
+
+
+class BlendAirHistoryItem(bpy.types.PropertyGroup):
+    entry_id: bpy.props.StringProperty()
+    prompt: bpy.props.StringProperty()
+    favorite: bpy.props.BoolProperty()
+
+
+class BLENDAIR_UL_History(bpy.types.UIList):
+    """History rows; Blender only draws the rows that are visible."""
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        icon_fav = 'FAVORITE' if item.favorite else 'SOLO_OFF'
+        row = layout.row(align=True)
+        row.label(text=item.prompt, icon=icon_fav)
+        op_row = row.row(align=True)
+        op_row.operator('blendair.restore_history', text='', icon='FILE_REFRESH').history_id = item.entry_id
+        op_row.operator('blendair.favorite_history', text='', icon=icon_fav).history_id = item.entry_id
+        op_row.operator('blendair.copy_history', text='', icon='COPYDOWN').history_id = item.entry_id
+        op_row.operator('blendair.delete_history', text='', icon='TRASH').history_id = item.entry_id
+
+
+def load_history_page(scene, reset=False, limit=None):
+    """Append the next page of history to the scene's list (main thread only).
+
+    With *reset* the list is rebuilt from the newest entry, keeping as many
+    rows as were loaded before unless *limit* says otherwise.
+    """
+    from . import history
+    items = scene.blendair_history_items
+    cursor = None
+    if reset:
+        limit = limit or max(len(items), history.PAGE_SIZE)
+        items.clear()
+    else:
+        cursor = _history_cursors.get(scene.name)
+        if cursor is _HISTORY_END:
+            return
+    entries, cursor = history.next_page(scene.blendair_search_query, cursor,
+                                        limit or history.PAGE_SIZE)
+    for entry in entries:
+        _fill_history_item(items.add(), entry)
+    _history_cursors[scene.name] = _HISTORY_END if cursor is None else cursor
+
+
+def _fill_history_item(item, entry):
+    item.entry_id = entry['id']
+    item.prompt = (entry.get('prompt') or 'No Prompt')[:80]
+    item.favorite = bool(entry.get('favorite'))
+
+
+def _history_row(items, entry_id):
+    for index, item in enumerate(items):
+        if item.entry_id == entry_id:
+            return index
+    return -1
+
+
+def _merge_first_page(scene):
+    """Insert entries newer than the top row and refresh the first page in place.
+
+    Older loaded rows are left alone; if the head changed in any other way
+    (say, a remote deletion) only the first page is reloaded.
+    """
+    from . import history
+    items = scene.blendair_history_items
+    entries, cursor = history.next_page(scene.blendair_search_query, None, history.PAGE_SIZE)
+    ids = [entry['id'] for entry in entries]
+    top = items[0].entry_id if len(items) else None
+    if top not in ids:
+        load_history_page(scene, reset=True, limit=history.PAGE_SIZE)
+        return
+    added = ids.index(top)
+    for offset, entry in enumerate(entries[:added]):
+        _fill_history_item(items.add(), entry)
+        items.move(len(items) - 1, offset)
+    for index, entry in enumerate(entries):
+        if index == len(items):
+            _fill_history_item(items.add(), entry)
+        elif items[index].entry_id != entry['id']:
+            load_history_page(scene, reset=True, limit=history.PAGE_SIZE)
+            return
+        elif items[index].favorite != bool(entry.get('favorite')):
+            items[index].favorite = bool(entry.get('favorite'))
+    if len(items) == len(entries):
+        _history_cursors[scene.name] = _HISTORY_END if cursor is None else cursor
+    elif _history_cursors.get(scene.name) is _HISTORY_END:
+        # Older rows may have arrived from the remote; resume paging after the last row.
+        _history_cursors[scene.name] = history.entry_cursor(items[-1].entry_id) or _HISTORY_END
+
+
+def _refresh_history_list(scene, changes):
+    """Apply *changes* (see ``_history_changes``) to one scene's list."""
+    from . import history
+    items = scene.blendair_history_items
+    merge = None in changes
+    for entry_id in changes - {None}:
+        index = _history_row(items, entry_id)
+        entry = history.get_entry(entry_id)
+        if index < 0:
+            merge = True  # a new entry, or one not loaded yet
+        elif entry is None:
+            items.remove(index)
+        else:
+            _fill_history_item(items[index], entry)
+    if merge:
+        _merge_first_page(scene)
+
+
+def _refresh_history_lists():
+    global _history_refresh_pending, _history_changes
+    with _history_lock:
+        _history_refresh_pending = False
+        changes, _history_changes = _history_changes, set()
+    for scene in bpy.data.scenes:
+        _refresh_history_list(scene, changes)
+
+
+def on_history_changed(entry_id=None):
+    """History listener: update the lists on the main thread, once per burst of changes."""
+    global _history_refresh_pending
+    with _history_lock:
+        _history_changes.add(entry_id)
+        if _history_refresh_pending:
+            return
+        _history_refresh_pending = True
+    from . import dispatch
+    dispatch.submit(_refresh_history_lists, label="history list")
+
+
+def on_history_index(scene, context):
+    """Load the next page as the selection nears the end of the loaded rows."""
+    if scene.blendair_history_index >= len(scene.blendair_history_items) - HISTORY_PREFETCH_MARGIN:
+        load_history_page(scene)
+
+
+def on_history_query(scene, context):
+    from . import history
+    load_history_page(scene, reset=True, limit=history.PAGE_SIZE)
+
 
 class BLENDAIR_PT_PromptHistory(bpy.types.Panel):
     """Panel for displaying prompt history."""
@@ -45,36 +214,72 @@ class BLENDAIR_PT_PromptHistory(bpy.types.Panel):
     def draw(self, context):
         layout = self.layout
         from . import history # Local import to avoid circular dependency issues
+        scene = context.scene
 
         # UI for searching history
         row = layout.row()
-        row.prop(context.scene, 'blendair_search_query', text="Search", icon='VIEWZOOM')
-        search_query = context.scene.get("blendair_search_query", "")
-
-        # Fetch and filter history
-        entries = history.get_prompt_history(user_id='local', project_id='demo', limit=50)
-        if search_query:
-            filtered = [e for e in entries if search_query.lower() in (e.get('prompt','') + e.get('response','')).lower()]
-        else:
-            filtered = entries
+        row.prop(scene, 'blendair_search_query', text="Search", icon='VIEWZOOM')
 
-        # Display history entries
-        if not filtered:
+        # Rows are filled page by page outside draw; drawing never does I/O.
+        if history.get_store() is None:
+            layout.label(text="Loading history...")
+            return
+        if not scene.blendair_history_items:
             layout.label(text="No history found.")
             return
+        layout.template_list("BLENDAIR_UL_History", "", scene, "blendair_history_items",
+                             scene, "blendair_history_index", rows=8)
+        if _history_cursors.get(scene.name) is not _HISTORY_END:
+            layout.operator('blendair.history_more', text="Load More", icon='DOWNARROW_HLT')
+
+
+class BLENDAIR_PT_Log(bpy.types.Panel):
+    """Panel showing the latest log events."""
+    bl_label = "Log"
+    bl_idname = "BLENDAIR_PT_Log"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_parent_id = 'BLENDAIR_PT_MainPanel'
+    bl_options = {'DEFAULT_CLOSED'}
 
-        for entry in filtered[:20]:
-            box = layout.box()
-            row = box.row(align=True)
-
-            # Display prompt info
-            is_fav = entry.get('favorite', False)
-            icon_fav = 'FAVORITE' if is_fav else 'SOLO_OFF'
-            row.label(text=entry.get('prompt', 'No Prompt')[:50], icon=icon_fav)
-
-            # Operator buttons
-            op_row = row.row(align=True)
-            op_row.operator('blendair.restore_history', text='', icon='FILE_REFRESH').history_id = str(entry.get('id',''))
-            op_row.operator('blendair.favorite_history', text='', icon=icon_fav).history_id = str(entry.get('id',''))
-            op_row.operator('blendair.copy_history', text='', icon='COPYDOWN').history_id = str(entry.get('id',''))
-            op_row.operator('blendair.delete_history', text='', icon='TRASH').history_id = str(entry.get('id',''))
+    def draw(self, context):
+        from . import logger
+        layout = self.layout
+        # Read from the in-memory ring buffer; the log file is never touched here.
+        events = logger.recent(10, "INFO")
+        if not events:
+            layout.label(text="No events yet.")
+            return
+        col = layout.column(align=True)
+        for event in reversed(events):
+            icon = {'ERROR': 'ERROR', 'WARNING': 'INFO'}.get(event['level'], 'DOT')
+            col.label(text=f"{event['ts'][11:19]}  {event['msg'][:80]}", icon=icon)
+
+
+class BLENDAIR_PT_Performance(bpy.types.Panel):
+    """Panel showing timing percentiles per traced stage."""
+    bl_label = "Performance"
+    bl_idname = "BLENDAIR_PT_Performance"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_parent_id = 'BLENDAIR_PT_MainPanel'
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        from . import tracing
+        layout = self.layout
+        if not tracing.enabled():
+            layout.label(text="Enable 'Record Timing Spans' in preferences.", icon='INFO')
+            return
+        rows = tracing.summary()
+        if not rows:
+            layout.label(text="No spans recorded yet.")
+        else:
+            col = layout.column(align=True)
+            col.label(text="Stage: p50 / p95 / p99 ms (count)")
+            for name, row in rows.items():
+                col.label(text=f"{name}: {row['p50'] * 1000:.1f} / {row['p95'] * 1000:.1f} / "
+                               f"{row['p99'] * 1000:.1f} ({row['count']})")
+        row = layout.row(align=True)
+        row.operator('blendair.export_trace', icon='EXPORT')
+        row.operator('blendair.reset_trace', icon='TRASH')
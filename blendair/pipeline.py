@@ -0,0 +1,283 @@
+"""Turn LLM responses into validated, compiled scripts before execution.
+
+Responses often wrap the script in markdown fences or prose, and sometimes
+contain code that cannot or should not run. :func:`prepare` extracts the
+code, compiles it once and walks the AST for forbidden imports and calls,
+so bad scripts are rejected on the worker thread instead of failing on the
+main thread after a full round trip. Compiled code objects are kept in a
+small LRU keyed by the source hash, so cache hits skip compilation.
+:class:`StreamChecker` runs the same checks on each complete top-level
+statement while a response streams in, so a forbidden import or a syntax
+error inside a fenced block stops the stream early instead of after the
+last token. :func:`fetch_prepared` re-asks the provider with the error
+appended when a script is rejected.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import io
+import re
+import threading
+import time
+import tokenize
+from collections import OrderedDict
+from types import CodeType
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from . import logger, tracing
+
+FORBIDDEN_MODULES = frozenset({
+    "ctypes", "http", "importlib", "multiprocessing", "os", "requests", "shutil",
+    "socket", "subprocess", "sys", "urllib",
+})
+FORBIDDEN_CALLS = frozenset({"__import__", "compile", "eval", "exec"})
+# Operator categories that only work from a specific editor or window context.
+CONTEXT_OPS = frozenset({
+    "file", "image", "node", "outliner", "paint", "screen", "sculpt", "sequencer",
+    "text", "uv", "view3d", "wm",
+})
+CODE_CACHE_SIZE = 128
+DEFAULT_RETRIES = 1
+
+_FENCE = re.compile(r"```[ \t]*(?:python|py)?[ \t]*\n(.*?)```", re.S | re.I)
+_FENCE_OPEN = re.compile(r"```[ \t]*(?:python|py)?[ \t]*\n", re.I)
+# Lines that continue the previous top-level statement rather than start one.
+_CONTINUATIONS = ("else", "elif", "except", "finally", "case")
+
+
+class ScriptError(ValueError):
+    """A generated script was rejected before execution."""
+
+
+class Prepared(NamedTuple):
+    code: CodeType
+    source: str
+    warnings: List[str]
+    rewrites: int = 0  # loops changed by :mod:`rewrite`
+
+
+def extract_code(text: str) -> str:
+    """Return the Python code in *text*: its fenced blocks, or all of it."""
+    blocks = _FENCE.findall(text)
+    if blocks:
+        return "\n\n".join(block.strip("\n") for block in blocks)
+    return text.strip().strip("`")
+
+
+def _dotted(node: ast.AST) -> str:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def check(tree: ast.AST) -> Tuple[List[str], List[str]]:
+    """Return ``(errors, warnings)`` found in *tree*."""
+    errors: List[str] = []
+    warnings: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            names = [alias.name for alias in node.names] if isinstance(node, ast.Import) else [node.module or ""]
+            for name in names:
+                if name.split(".")[0] in FORBIDDEN_MODULES:
+                    errors.append(f"line {node.lineno}: import of '{name}' is not allowed")
+        elif isinstance(node, ast.Call):
+            name = _dotted(node.func)
+            if name in FORBIDDEN_CALLS:
+                errors.append(f"line {node.lineno}: call to {name}() is not allowed")
+            elif name.startswith("bpy.ops."):
+                category = name.split(".")[2] if name.count(".") >= 3 else ""
+                if category in CONTEXT_OPS:
+                    warnings.append(f"line {node.lineno}: {name} needs a specific editor context")
+                elif category == "mesh" and not name.startswith("bpy.ops.mesh.primitive_"):
+                    warnings.append(f"line {node.lineno}: {name} only works in Edit Mode")
+    return errors, warnings
+
+
+def _complete_statements(code: str) -> int:
+    """Length of the prefix of *code* made of complete top-level statements."""
+    end = 0
+    pending = None  # offset just past the last logical line at depth 0
+    starts = [0]
+    for line in code.splitlines(keepends=True):
+        starts.append(starts[-1] + len(line))
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type == tokenize.ENDMARKER:
+                break  # the last statement may still grow
+            if tok.type == tokenize.NEWLINE:
+                pending = starts[tok.end[0] - 1] + tok.end[1]
+            elif tok.type in (tokenize.NL, tokenize.COMMENT, tokenize.INDENT, tokenize.DEDENT):
+                continue
+            elif pending is not None:
+                if not code[starts[tok.start[0] - 1]:starts[tok.start[0]]].endswith("\n"):
+                    break  # the next line is still arriving; it may be "else:" yet
+                # The statement before is complete once the next one starts at column 0.
+                if tok.start[1] == 0 and tok.string not in _CONTINUATIONS:
+                    end = pending
+                pending = None
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        pass
+    return end
+
+
+class StreamChecker:
+    """Validate a streamed response statement by statement.
+
+    :meth:`feed` raises :class:`ScriptError` as soon as a complete statement
+    imports or calls something forbidden, or, inside a fenced block, does
+    not parse. Unfenced text may still turn out to be prose before a fence,
+    so syntax errors there are left for :func:`prepare`.
+    """
+
+    def __init__(self) -> None:
+        self.text = ""
+        self._fence_pos = 0  # where to look for the next fence opener
+        self._origin = 0  # start of the code being checked (block or whole text)
+        self._block: Optional[int] = None  # unchecked code in the open block starts here
+        self._unfenced = 0  # unchecked code while no fence has been seen starts here
+        self._fenced = False
+
+    def feed(self, chunk: str) -> None:
+        self.text += chunk
+        if "\n" not in chunk and "`" not in chunk:
+            return  # no statement or fence can have ended
+        while True:
+            if self._block is None:
+                opener = _FENCE_OPEN.search(self.text, self._fence_pos)
+                if opener is None:
+                    break
+                self._block = self._origin = self._fence_pos = opener.end()
+                self._fenced = True
+            close = self.text.find("```", self._block)
+            if close < 0:
+                self._block = self._check(self._block, None, strict=True)
+                return
+            self._check(self._block, close, strict=True)
+            self._block, self._fence_pos = None, close + 3
+        if not self._fenced:
+            self._unfenced = self._check(self._unfenced, None, strict=False)
+
+    def _check(self, start: int, stop: Optional[int], strict: bool) -> int:
+        """Check the complete statements from *start* (to *stop* if the code ends there).
+
+        Returns the offset up to which the text has been checked.
+        """
+        code = self.text[start:] if stop is None else self.text[start:stop]
+        end = len(code) if stop is not None else _complete_statements(code)
+        if not code[:end].strip():
+            return start + end
+        offset = self.text.count("\n", self._origin, start)
+        try:
+            tree = ast.parse(code[:end])
+        except SyntaxError as exc:
+            if strict:
+                raise ScriptError(f"Syntax error on line {(exc.lineno or 1) + offset}: {exc.msg}") from exc
+            return start + end
+        ast.increment_lineno(tree, offset)
+        errors, _ = check(tree)
+        if errors:
+            raise ScriptError("; ".join(errors))
+        return start + end
+
+
+_LOCK = threading.Lock()
+_CODE_CACHE: "OrderedDict[str, Prepared]" = OrderedDict()
+_STATS: Dict[str, float] = {"prepared": 0, "cache_hits": 0, "rejected": 0, "retries": 0,
+                            "check_time": 0.0}
+
+
+def prepare(text: str, filename: str = "<BlendAIr prompt>", rewrite: bool = False) -> Prepared:
+    """Extract, compile and check *text*; raise :class:`ScriptError` if it cannot run.
+
+    With *rewrite*, per-object ``bpy.ops`` loops are turned into data API
+    calls (see :mod:`.rewrite`) before compiling.
+    """
+    source = extract_code(text or "")
+    if not source:
+        raise ScriptError("No code returned from AI.")
+    digest = hashlib.sha256(f"{filename}\0{rewrite}\0{source}".encode("utf-8")).hexdigest()
+    with _LOCK:
+        cached = _CODE_CACHE.get(digest)
+        if cached is not None:
+            _CODE_CACHE.move_to_end(digest)
+            _STATS["cache_hits"] += 1
+            return cached
+    start = time.perf_counter()
+    try:
+        tree = ast.parse(source, filename)
+        errors, warnings = check(tree)
+        if errors:
+            raise ScriptError("; ".join(errors))
+        rewrites = 0
+        if rewrite:
+            from .rewrite import rewrite_tree
+            tree, rewrites = rewrite_tree(tree)
+        prepared = Prepared(compile(tree, filename, "exec"), source, warnings, rewrites)
+    except SyntaxError as exc:
+        raise ScriptError(f"Syntax error on line {exc.lineno}: {exc.msg}") from exc
+    except ValueError as exc:
+        if isinstance(exc, ScriptError):
+            raise
+        raise ScriptError(str(exc)) from exc
+    finally:
+        with _LOCK:
+            _STATS["check_time"] += time.perf_counter() - start
+    with _LOCK:
+        _STATS["prepared"] += 1
+        _CODE_CACHE[digest] = prepared
+        while len(_CODE_CACHE) > CODE_CACHE_SIZE:
+            _CODE_CACHE.popitem(last=False)
+    return prepared
+
+
+def is_valid(text: Optional[str]) -> bool:
+    """Return True if *text* holds a script that :func:`prepare` accepts."""
+    try:
+        prepare(text or "")
+    except ScriptError:
+        return False
+    return True
+
+
+def fetch_prepared(fetch: Callable[[str, int], Optional[str]], prompt: str,
+                   retries: int = DEFAULT_RETRIES, rewrite: bool = False) -> Prepared:
+    """Fetch and prepare a script for *prompt*, re-asking on rejection.
+
+    ``fetch(prompt, attempt)`` returns the raw response. Each retry appends
+    the rejection reason to the prompt.
+    """
+    request = prompt
+    for attempt in range(retries + 1):
+        aborted = None
+        try:
+            text = fetch(request, attempt)
+        except ScriptError as exc:
+            # Rejected mid-stream by a StreamChecker; the rest was never read.
+            text, aborted = None, exc
+        try:
+            if aborted is not None:
+                raise aborted
+            with tracing.span("prompt.compile", attempt=attempt):
+                return prepare(text or "", rewrite=rewrite)
+        except ScriptError as exc:
+            with _LOCK:
+                _STATS["rejected"] += 1
+            if attempt == retries or not (text or aborted):
+                raise
+            with _LOCK:
+                _STATS["retries"] += 1
+            logger.warning(f"Script rejected ({exc}); retrying.", attempt=attempt + 1)
+            request = (f"{prompt}\n\nYour previous script was rejected: {exc}\n"
+                       f"Return only corrected Python code for Blender.")
+    raise ScriptError("No code returned from AI.")
+
+
+def stats() -> Dict[str, float]:
+    with _LOCK:
+        return dict(_STATS, cached=len(_CODE_CACHE))
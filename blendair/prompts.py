@@ -1,161 +1,291 @@
 """Helpers for communicating with the LLM service."""
-import requests
-from typing import Optional
+import json
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
 from .addon_prefs import get_pref
+from . import cache, logger, pipeline, provider_stats, providers, racing, routing, scene_context, tokens, tracing, transport
+from .cache import ResponseCache
 
 
-def fetch_script(prompt: str) -> Optional[str]:
-    prefs = get_pref()
-    provider = getattr(prefs, 'llm_provider', 'blendair_cloud')
-    headers = {}
-    url = ''
-    data = {}
-
-    # Only use local_llm_endpoint for 'local' provider
-    if provider == 'local':
-        url = getattr(prefs, 'local_llm_endpoint', 'http://localhost:8000/generate')
-        data = {"prompt": prompt}
-    elif provider == 'blendair_cloud':
-        url = 'https://api.your-blendair-cloud.com/generate'  # Replace with your real endpoint
-        key = getattr(prefs, 'blendair_api_key', None)
-        if not key:
-            print("[BlendAIr] Missing BlendAIr Cloud API key.")
-            return None
-        headers['Authorization'] = f'Bearer {key}'
-        data = {"prompt": prompt}
-    elif provider == 'openai':
-        url = 'https://api.openai.com/v1/chat/completions'
-        key = getattr(prefs, 'openai_api_key', None)
-        if not key:
-            print("[BlendAIr] Missing OpenAI API key.")
-            return None
-        headers['Authorization'] = f'Bearer {key}'
-        headers['Content-Type'] = 'application/json'
-        data = {
-            "model": "gpt-4o",  # Or allow user to configure
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 512,
-            "temperature": 0.7
-        }
-    elif provider == 'gemini':
-        url = f'https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={getattr(prefs, "gemini_api_key", "")}'
-        data = {"contents": [{"parts": [{"text": prompt}]}]}
-    elif provider == 'huggingface':
-        # Auto-select best HuggingFace model for code vs general prompt
-        # StarCoder2-15B for code, Mixtral-8x7B or Llama-3 for general
-        import re
-        if re.search(r'(python|script|code|function|def |class )', prompt, re.I):
-            model = 'bigcode/starcoder2-15b'
-        else:
-            # Prefer Llama-3 if available, else Mixtral
-            model = 'meta-llama/Meta-Llama-3-8B-Instruct'  # fallback to Mixtral if needed
-        url = f'https://api-inference.huggingface.co/models/{model}'
-        key = getattr(prefs, 'huggingface_api_key', None)
-        if not key:
-            print("[BlendAIr] Missing HuggingFace API key.")
-            return None
-        headers['Authorization'] = f'Bearer {key}'
-        data = {"inputs": prompt}
-    elif provider == 'anthropic':
-        url = 'https://api.anthropic.com/v1/messages'
-        key = getattr(prefs, 'anthropic_api_key', None)
-        if not key:
-            print("[BlendAIr] Missing Anthropic API key.")
-            return None
-        headers['x-api-key'] = key
-        headers['anthropic-version'] = '2023-06-01'
-        data = {
-            "model": "claude-3-opus-20240229",  # Or allow user to configure
-            "max_tokens": 512,
-            "messages": [{"role": "user", "content": prompt}]
-        }
-    elif provider == 'pplx':
-        url = 'https://api.perplexity.ai/chat/completions'
-        key = getattr(prefs, 'pplx_api_key', None)
-        if not key:
-            print("[BlendAIr] Missing Perplexity API key.")
-            return None
-        headers['Authorization'] = f'Bearer {key}'
-        headers['Content-Type'] = 'application/json'
-        data = {
-            "model": "pplx-70b-chat",  # Or allow user to configure
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 512,
-            "temperature": 0.7
-        }
-    elif provider == 'replicate':
-        url = 'https://api.replicate.com/v1/predictions'
-        key = getattr(prefs, 'replicate_api_token', None)
-        if not key:
-            print("[BlendAIr] Missing Replicate API token.")
-            return None
-        headers['Authorization'] = f'Bearer {key}'
-        data = {"input": {"prompt": prompt}}
-    elif provider == 'grok':
-        url = 'https://api.grok.x.ai/v1/chat/completions'
-        key = getattr(prefs, 'grok_api_key', None)
-        if not key:
-            print("[BlendAIr] Missing Grok API key.")
-            return None
-        headers['Authorization'] = f'Bearer {key}'
-        headers['Content-Type'] = 'application/json'
-        data = {
-            "model": "grok-1",  # Or allow user to configure
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 512,
-            "temperature": 0.7
-        }
-    elif provider == 'deepseek':
-        url = 'https://api.deepseek.com/v1/chat/completions'
-        key = getattr(prefs, 'deepseek_api_key', None)
-        if not key:
-            print("[BlendAIr] Missing DeepSeek API key.")
+def _cache_slot(prefs, provider: str, url: str, data: dict, prompt: str,
+                context: str, use_cache: bool) -> Tuple[Optional[ResponseCache], str]:
+    """Return the response cache (None when bypassed) and the key for this request."""
+    if not use_cache:
+        return None, ''
+    response_cache = cache.get_cache(prefs)
+    if response_cache is None:
+        return None, ''
+    # The model is part of the payload for chat APIs and of the URL otherwise;
+    # drop the query string so API keys never influence the key.
+    model = data.get('model') or url.split('?', 1)[0]
+    return response_cache, cache.cache_key(provider, model, prompt, scene_context.fingerprint(context))
+
+
+def compose_prompt(prompt: str, context: str = '') -> str:
+    """Prefix *prompt* with the scene summary, if there is one."""
+    if not context:
+        return prompt
+    return f"Current Blender scene:\n{context}\n\nRequest: {prompt}"
+
+
+def _resolve(prefs, prompt: str, context: str = '', provider: Optional[str] = None):
+    """Return ``(adapter, plan, url, headers, payload)`` for *provider* (default: configured).
+
+    The token plan compacts *context* to fit the provider's context window
+    and sizes ``max_tokens`` from the kind of prompt.
+    """
+    provider = provider or getattr(prefs, 'llm_provider', 'blendair_cloud')
+    adapter = providers.get_provider(provider)
+    if adapter is None:
+        logger.error(f"Unknown LLM provider: {provider}", provider=provider)
+        return None
+    plan = tokens.plan(adapter, prefs, prompt, context)
+    request = adapter.request(prefs, compose_prompt(prompt, plan.context), plan.max_tokens)
+    if request is None:
+        return None
+    return (adapter, plan) + request
+
+
+def _log_usage(adapter, plan: tokens.Plan, payload, script: Optional[str], latency: float) -> float:
+    """Log tokens in/out for one request and return its estimated cost."""
+    reported = providers.extract_usage(payload) if payload is not None else None
+    usage = reported or (plan.prompt_tokens, tokens.count_tokens(script or '', adapter.token_family))
+    cost = adapter.cost(*usage)
+    tokens.log_usage(adapter.name, usage[0], usage[1], plan.max_tokens, plan.prompt_class,
+                     latency, cost, reported is not None)
+    return cost
+
+
+def _read_body(resp, cancel: threading.Event) -> Optional[bytes]:
+    """Read a streamed response body, dropping the connection if *cancel* is set."""
+    chunks = []
+    for chunk in resp.iter_content(chunk_size=8192):
+        if cancel.is_set():
+            resp.close()
             return None
-        headers['Authorization'] = f'Bearer {key}'
-        headers['Content-Type'] = 'application/json'
-        data = {
-            "model": "deepseek-coder",  # Or allow user to configure
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 512,
-            "temperature": 0.7
-        }
-    else:
-        print(f"[BlendAIr] Unknown LLM provider: {provider}")
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def _record_ttfb(resp, provider: str) -> None:
+    """Trace the time until the response headers arrived, as measured by requests."""
+    elapsed = getattr(resp, 'elapsed', None)
+    if elapsed is not None and hasattr(elapsed, 'total_seconds'):
+        tracing.record("prompt.ttfb", elapsed.total_seconds(), provider=provider)
+
+
+def fetch_script(prompt: str, use_cache: bool = True, context: str = '',
+                 provider: Optional[str] = None,
+                 cancel: Optional[threading.Event] = None) -> Optional[str]:
+    """Return the script for *prompt* from *provider* (default: the configured one).
+
+    When *cancel* is given the request is abandoned as soon as it is set, and
+    nothing is cached or recorded for it.
+    """
+    with tracing.span("prompt.prefs"):
+        prefs = get_pref()
+    with tracing.span("prompt.request_build", provider=provider or ''):
+        resolved = _resolve(prefs, prompt, context, provider)
+    if resolved is None:
+        return None
+    adapter, plan, url, headers, data = resolved
+    with tracing.span("prompt.cache_lookup"):
+        response_cache, key = _cache_slot(prefs, adapter.name, url, data, prompt, context, use_cache)
+        cached = response_cache.get(key) if response_cache is not None else None
+    if cached is not None:
+        return cached
+    if cancel is not None and cancel.is_set():
+        return None
+    # Routed requests respect the circuit breaker: a half-open provider gets
+    # one trial request, and the others skip it until that one reports back.
+    breaker = provider_stats.get(adapter.name).breaker
+    trial = provider is not None and breaker.state == "half-open"
+    if provider is not None and not breaker.allow():
         return None
 
+    start = time.perf_counter()
     try:
-        resp = requests.post(url, json=data, headers=headers, timeout=60)
-        resp.raise_for_status()
-        # Parse response for script depending on provider
-        if provider == 'openai':
-            return resp.json()['choices'][0]['message']['content']
-        elif provider == 'gemini':
-            return resp.json()['candidates'][0]['content']['parts'][0]['text']
-        elif provider == 'huggingface':
-            return resp.json()[0]['generated_text'] if isinstance(resp.json(), list) else resp.json().get('generated_text')
-        elif provider == 'anthropic':
-            return resp.json()['content'][0]['text']
-        elif provider == 'pplx':
-            return resp.json()['choices'][0]['message']['content']
-        elif provider == 'replicate':
-            return resp.json()['output']
-        elif provider == 'grok':
-            return resp.json()['choices'][0]['message']['content']
-        elif provider == 'deepseek':
-            return resp.json()['choices'][0]['message']['content']
-        else:
-            # BlendAIr Cloud, local, fallback
-            return resp.json().get('script')
+        session = transport.session_for(prefs, adapter.name)
+        with tracing.span("prompt.network", provider=adapter.name):
+            resp = session.post(url, json=data, headers=headers, timeout=transport.request_timeout(prefs),
+                                stream=cancel is not None)
+            _record_ttfb(resp, adapter.name)
+            resp.raise_for_status()
+            # Without stream=True, requests has read the body before returning.
+            if cancel is not None:
+                body = _read_body(resp, cancel)
+                if body is None:
+                    if trial:
+                        breaker.release()
+                    return None
+        with tracing.span("prompt.parse", provider=adapter.name):
+            payload = resp.json() if cancel is None else json.loads(body)
+            script = adapter.parse_response(payload)
     except Exception as e:
-        print(f"[BlendAIr] Failed to fetch script: {e}")
+        if cancel is None or not cancel.is_set():
+            provider_stats.record(adapter.name, time.perf_counter() - start, ok=False)
+        elif trial:
+            breaker.release()
+        logger.error(f"Failed to fetch script: {e}", provider=adapter.name,
+                     latency=round(time.perf_counter() - start, 3))
         return None
+    latency = time.perf_counter() - start
+    provider_stats.record(adapter.name, latency, ok=bool(script),
+                          cost=_log_usage(adapter, plan, payload, script, latency))
+    # Only scripts that would run are cached; rejected ones are re-asked.
+    if script and response_cache is not None and pipeline.is_valid(script):
+        response_cache.put(key, script)
+    return script
+
+
+# -----------------------------------------------------------------------------
+# Streaming
+# -----------------------------------------------------------------------------
+
+class StreamStats:
+    """Progress of one streamed completion (chunk count, size, time to first token)."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.chunks = 0
+        self.chars = 0
+        self.streamed = False
+        self.cached = False
+
+    def record(self, chunk: str) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.chunks += 1
+        self.chars += len(chunk)
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from request start to the first received chunk."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def stream_script(prompt: str, stats: Optional[StreamStats] = None,
+                  use_cache: bool = True, context: str = '') -> Iterator[str]:
+    """Yield the generated script in chunks as the provider produces them.
+
+    Providers without a streaming API, and cache hits, produce a single chunk
+    holding the whole response, so callers can always iterate. *stats* is
+    updated in place with chunk counts and time-to-first-token.
+    """
+    stats = stats if stats is not None else StreamStats()
+    with tracing.span("prompt.prefs"):
+        prefs = get_pref()
+    with tracing.span("prompt.request_build"):
+        resolved = _resolve(prefs, prompt, context)
+        if resolved is not None:
+            adapter, plan, url, headers, data = resolved
+            streaming = adapter.stream(prefs, url, data, compose_prompt(prompt, plan.context),
+                                       plan.max_tokens)
+    if resolved is None:
+        return
+    with tracing.span("prompt.cache_lookup"):
+        response_cache, key = _cache_slot(prefs, adapter.name, url, data, prompt, context, use_cache)
+        cached = response_cache.get(key) if response_cache is not None else None
+    if cached is not None:
+        stats.cached = True
+        stats.record(cached)
+        yield cached
+        return
+
+    parts = []
+    start = time.perf_counter()
+    try:
+        session = transport.session_for(prefs, adapter.name)
+        timeout = transport.request_timeout(prefs)
+        if streaming is None:
+            with tracing.span("prompt.network", provider=adapter.name):
+                resp = session.post(url, json=data, headers=headers, timeout=timeout)
+                _record_ttfb(resp, adapter.name)
+                resp.raise_for_status()
+            with tracing.span("prompt.parse", provider=adapter.name):
+                script = adapter.parse_response(resp.json())
+            if script:
+                parts.append(script)
+                stats.record(script)
+                yield script
+        else:
+            url, data, parse_stream = streaming
+            stats.streamed = True
+            with session.post(url, json=data, headers=headers, timeout=timeout, stream=True) as resp:
+                _record_ttfb(resp, adapter.name)
+                resp.raise_for_status()
+                for chunk in parse_stream(resp.iter_lines(decode_unicode=True)):
+                    parts.append(chunk)
+                    stats.record(chunk)
+                    yield chunk
+            # The body arrives as the caller consumes it, so this spans the whole stream.
+            tracing.record("prompt.network", stats.elapsed, stats.started, provider=adapter.name,
+                           streamed=True)
+    except Exception as e:
+        provider_stats.record(adapter.name, time.perf_counter() - start, ok=False)
+        logger.error(f"Failed to stream script: {e}", provider=adapter.name,
+                     latency=round(time.perf_counter() - start, 3))
+        return
+    latency = time.perf_counter() - start
+    provider_stats.record(adapter.name, latency, ok=bool(parts),
+                          cost=_log_usage(adapter, plan, None, ''.join(parts), latency))
+    if parts and response_cache is not None and pipeline.is_valid(''.join(parts)):
+        response_cache.put(key, ''.join(parts))
 
 
 # -----------------------------------------------------------------------------
 # Public helper used by operators and tests
 # -----------------------------------------------------------------------------
 
-def send_prompt(prompt: str):
-    """Thin wrapper around fetch_script for external callers."""
-    return fetch_script(prompt)
+def _race_candidates(prefs) -> List[str]:
+    """Configured provider first, then the extra candidate providers."""
+    names = [getattr(prefs, 'llm_provider', 'blendair_cloud')]
+    for name in getattr(prefs, 'race_providers', '').split(','):
+        name = name.strip()
+        if name and name not in names and providers.get_provider(name) is not None:
+            names.append(name)
+    return names
+
 
+def send_prompt(prompt: str, use_cache: bool = True, context: str = ''):
+    """Return a script for *prompt* (with scene *context*) using the configured routing mode.
+
+    ``single`` asks the selected provider, ``race`` asks every candidate at
+    once, ``hedge`` only asks the runner-up once the fastest provider exceeds
+    its p90 latency and ``adaptive`` picks the cheapest provider meeting the
+    latency SLO. All but ``single`` skip providers with an open circuit.
+    """
+    prefs = get_pref()
+    mode = getattr(prefs, 'routing_mode', 'single')
+    if mode == 'single':
+        return fetch_script(prompt, use_cache=use_cache, context=context)
+    candidates = routing.available(_race_candidates(prefs))
+    if not candidates:
+        logger.warning("Every candidate provider is failing; retry later.")
+        return None
+    if mode == 'adaptive' or len(candidates) < 2:
+        name = routing.choose(candidates, prompt, getattr(prefs, 'latency_slo', 5.0))
+        return fetch_script(prompt, use_cache=use_cache, context=context, provider=name)
+
+    def _fetch(p, name, cancel):
+        return fetch_script(p, use_cache=use_cache, context=context, provider=name, cancel=cancel)
+
+    if mode == 'race':
+        result = racing.race(prompt, candidates, _fetch)
+    else:
+        primary, backup = provider_stats.rank(candidates)[:2]
+        fallback = getattr(prefs, 'hedge_delay', racing.DEFAULT_HEDGE_DELAY)
+        result = racing.hedge(prompt, primary, backup, _fetch,
+                              delay=racing.hedge_delay(primary, fallback))
+    if result.provider:
+        logger.info(f"{mode} won by {result.provider} in {result.latency:.2f}s",
+                    provider=result.provider, latency=round(result.latency, 3))
+    return result.script
@@ -0,0 +1,241 @@
+"""Rolling per-provider latency, error and cost statistics.
+
+Every real provider round trip is recorded here. The racing, hedging and
+adaptive routing modes use the percentiles and costs to pick providers, and
+a circuit breaker per provider stops routing to one that keeps failing.
+Samples are persisted next to the response cache so routing decisions
+survive Blender restarts.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from . import logger
+from .cache import DEFAULT_CACHE_DIR
+
+WINDOW = 200
+MIN_SAMPLES = 5
+# Upper bucket bounds in seconds for the latency histogram.
+HISTOGRAM_BOUNDS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, float("inf"))
+FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN = 30.0
+BREAKER_MAX_COOLDOWN = 600.0
+# A half-open trial that never reports back frees the slot after this long.
+TRIAL_TIMEOUT = 120.0
+STATS_PATH = DEFAULT_CACHE_DIR / "provider_stats.json"
+SAVE_EVERY = 20
+
+
+class CircuitBreaker:
+    """Stops routing to a provider after consecutive failures.
+
+    After :data:`FAILURE_THRESHOLD` failures in a row the breaker opens for a
+    cooldown; after it, :meth:`allow` lets exactly one trial request through
+    (half-open) and rejects everyone else until :meth:`record` resolves it.
+    A failed trial doubles the cooldown, a success closes the breaker.
+    """
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, cooldown: float = BREAKER_COOLDOWN) -> None:
+        self._lock = threading.Lock()
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_started: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def _trial_in_flight(self) -> bool:
+        started = self._trial_started
+        return started is not None and time.monotonic() - started < TRIAL_TIMEOUT
+
+    def ready(self) -> bool:
+        """True if :meth:`allow` would let a request through; claims nothing."""
+        state = self.state
+        return state == "closed" or (state == "half-open" and not self._trial_in_flight())
+
+    def allow(self) -> bool:
+        """Admit one request; in half-open state only the first caller gets the trial."""
+        with self._lock:
+            state = self.state
+            if state != "half-open":
+                return state == "closed"
+            if self._trial_in_flight():
+                return False
+            self._trial_started = time.monotonic()
+            return True
+
+    def release(self) -> None:
+        """Give up a trial that ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            self._trial_started = None
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._trial_started = None
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                self.cooldown = self.base_cooldown
+                return
+            self.failures += 1
+            if self.opened_at is not None:
+                # A half-open trial failed: back off further.
+                self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+                self.opened_at = time.monotonic()
+            elif self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class ProviderStats:
+    """Latency/error/cost samples of the last :data:`WINDOW` requests."""
+
+    def __init__(self, window: int = WINDOW) -> None:
+        self._lock = threading.Lock()
+        self.samples: Deque[Tuple[float, bool, float]] = deque(maxlen=window)
+        self.breaker = CircuitBreaker()
+
+    def record(self, latency: float, ok: bool, cost: float = 0.0) -> None:
+        with self._lock:
+            self.samples.append((latency, ok, cost))
+            self.breaker.record(ok)
+
+    def _latencies(self) -> List[float]:
+        with self._lock:
+            return sorted(lat for lat, ok, _ in self.samples if ok)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the *q*-th percentile (0-100) of successful latencies."""
+        latencies = self._latencies()
+        if not latencies:
+            return None
+        index = min(len(latencies) - 1, int(round(q / 100.0 * (len(latencies) - 1))))
+        return latencies[index]
+
+    @property
+    def count(self) -> int:
+        return len(self.samples)
+
+    @property
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.samples:
+                return 0.0
+            return sum(1 for _, ok, _ in self.samples if not ok) / len(self.samples)
+
+    @property
+    def mean_cost(self) -> Optional[float]:
+        """Average cost in USD of successful requests, or None without data."""
+        with self._lock:
+            costs = [cost for _, ok, cost in self.samples if ok]
+        return sum(costs) / len(costs) if costs else None
+
+    def histogram(self) -> List[int]:
+        """Return request counts per :data:`HISTOGRAM_BOUNDS` bucket."""
+        counts = [0] * len(HISTOGRAM_BOUNDS)
+        for latency in self._latencies():
+            for i, bound in enumerate(HISTOGRAM_BOUNDS):
+                if latency <= bound:
+                    counts[i] += 1
+                    break
+        return counts
+
+
+_LOCK = threading.Lock()
+_STATS: Dict[str, ProviderStats] = {}
+_UNSAVED = 0
+
+
+def get(provider: str) -> ProviderStats:
+    with _LOCK:
+        return _STATS.setdefault(provider, ProviderStats())
+
+
+def record(provider: str, latency: float, ok: bool, cost: float = 0.0) -> None:
+    """Record one request outcome for *provider*; autosaves periodically."""
+    global _UNSAVED  # noqa: PLW0603
+    get(provider).record(latency, ok, cost)
+    with _LOCK:
+        _UNSAVED += 1
+        due = _UNSAVED >= SAVE_EVERY
+        if due:
+            _UNSAVED = 0
+    if due:
+        save()
+
+
+def rank(providers: List[str]) -> List[str]:
+    """Order *providers* fastest first by median latency.
+
+    Providers without enough samples keep their configured order ahead of
+    measured ones, so new providers get explored.
+    """
+    def key(item: Tuple[int, str]):
+        index, name = item
+        stats = get(name)
+        p50 = stats.percentile(50) if stats.count >= MIN_SAMPLES else None
+        return (p50 is not None, p50 or 0.0, index)
+    return [name for _, name in sorted(enumerate(providers), key=key)]
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Return latency, error, cost and breaker state per provider for display."""
+    with _LOCK:
+        items = list(_STATS.items())
+    return {
+        name: {
+            "count": stats.count,
+            "p50": stats.percentile(50) or 0.0,
+            "p90": stats.percentile(90) or 0.0,
+            "error_rate": stats.error_rate,
+            "mean_cost": stats.mean_cost or 0.0,
+            "breaker": stats.breaker.state,
+        }
+        for name, stats in items
+    }
+
+
+def save(path: Optional[Path] = None) -> None:
+    """Write all samples to *path* (default :data:`STATS_PATH`) as JSON."""
+    path = path or STATS_PATH
+    with _LOCK:
+        items = list(_STATS.items())
+    data = {}
+    for name, stats in items:
+        with stats._lock:
+            data[name] = [list(sample) for sample in stats.samples]
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        tmp.replace(path)
+    except OSError as exc:
+        logger.warning(f"Could not save provider stats: {exc}")
+
+
+def load(path: Optional[Path] = None) -> None:
+    """Replace in-memory samples with those saved at *path* (default :data:`STATS_PATH`), if any."""
+    path = path or STATS_PATH
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return
+    with _LOCK:
+        for name, samples in data.items():
+            stats = ProviderStats()
+            for latency, ok, cost in samples:
+                stats.samples.append((float(latency), bool(ok), float(cost)))
+            _STATS[name] = stats
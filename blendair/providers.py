@@ -0,0 +1,383 @@
+"""Table-driven LLM provider adapters.
+
+Each provider is described by a :class:`ProviderAdapter` holding its request
+builder, response parser, optional streaming support and capability flags.
+``prompts.fetch_script`` dispatches through :data:`PROVIDERS` with a single
+dict lookup, so adding a provider means registering one adapter here.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import logger
+
+Request = Tuple[str, Dict[str, str], Dict[str, Any]]
+RequestBuilder = Callable[[Any, str, str, int], Request]
+ResponseParser = Callable[[Any], Optional[str]]
+StreamParser = Callable[[Iterable[str]], Iterator[str]]
+StreamBuilder = Callable[[Any, str, Dict[str, Any], str, int], Optional[Tuple[str, Dict[str, Any], StreamParser]]]
+
+DEFAULT_MAX_TOKENS = 512
+
+
+@dataclass(frozen=True)
+class ProviderAdapter:
+    """Everything ``fetch_script`` needs to talk to one provider."""
+
+    name: str
+    label: str
+    description: str
+    build_request: RequestBuilder
+    parse_response: ResponseParser
+    key_pref: Optional[str] = None
+    key_label: str = ""
+    key_required: bool = True
+    stream_request: Optional[StreamBuilder] = None
+    max_context: int = 4096
+    context_pref: Optional[str] = None
+    input_cost: float = 0.0  # USD per 1K prompt tokens (list price estimate)
+    output_cost: float = 0.0  # USD per 1K completion tokens
+    token_family: str = "default"  # see tokens.FAMILY_RATIOS
+
+    @property
+    def supports_streaming(self) -> bool:
+        return self.stream_request is not None
+
+    def cost(self, tokens_in: int, tokens_out: int) -> float:
+        """Return the estimated USD cost of one request."""
+        return tokens_in / 1000.0 * self.input_cost + tokens_out / 1000.0 * self.output_cost
+
+    def context_window(self, prefs: Any) -> int:
+        """Return the usable context window in tokens."""
+        if self.context_pref:
+            return int(getattr(prefs, self.context_pref, self.max_context) or self.max_context)
+        return self.max_context
+
+    def request(self, prefs: Any, prompt: str,
+                max_tokens: int = DEFAULT_MAX_TOKENS) -> Optional[Request]:
+        """Return ``(url, headers, payload)`` or None if the API key is missing."""
+        key = getattr(prefs, self.key_pref, None) if self.key_pref else None
+        if self.key_pref and self.key_required and not key:
+            logger.warning(f"Missing {self.key_label}.", provider=self.name)
+            return None
+        return self.build_request(prefs, key or "", prompt, max_tokens)
+
+    def stream(self, prefs: Any, url: str, data: Dict[str, Any], prompt: str,
+               max_tokens: int = DEFAULT_MAX_TOKENS) -> Optional[Tuple[str, Dict[str, Any], StreamParser]]:
+        """Return the streaming variant of a request, or None to fall back."""
+        if self.stream_request is None:
+            return None
+        return self.stream_request(prefs, url, data, prompt, max_tokens)
+
+
+# -----------------------------------------------------------------------------
+# Stream parsers
+# -----------------------------------------------------------------------------
+
+def _sse_data(lines: Iterable[str]) -> Iterator[dict]:
+    """Yield decoded JSON payloads from Server-Sent Event ``data:`` lines."""
+    for line in lines:
+        if not line or not line.startswith('data:'):
+            continue
+        payload = line[5:].strip()
+        if payload == '[DONE]':
+            return
+        try:
+            yield json.loads(payload)
+        except ValueError:
+            continue
+
+
+def parse_openai_stream(lines: Iterable[str]) -> Iterator[str]:
+    for event in _sse_data(lines):
+        choices = event.get('choices') or [{}]
+        text = (choices[0].get('delta') or {}).get('content')
+        if text:
+            yield text
+
+
+def parse_anthropic_stream(lines: Iterable[str]) -> Iterator[str]:
+    for event in _sse_data(lines):
+        kind = event.get('type')
+        if kind == 'content_block_delta':
+            text = (event.get('delta') or {}).get('text')
+            if text:
+                yield text
+        elif kind == 'message_stop':
+            return
+
+
+def parse_gemini_stream(lines: Iterable[str]) -> Iterator[str]:
+    for event in _sse_data(lines):
+        for candidate in event.get('candidates', []):
+            for part in (candidate.get('content') or {}).get('parts', []):
+                if part.get('text'):
+                    yield part['text']
+
+
+def parse_ollama_stream(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        if not line:
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        text = event.get('response') or (event.get('message') or {}).get('content')
+        if text:
+            yield text
+        if event.get('done'):
+            return
+
+
+# -----------------------------------------------------------------------------
+# Shared builders and parsers
+# -----------------------------------------------------------------------------
+
+def _chat_completions(url: str, model: str) -> RequestBuilder:
+    """Builder for OpenAI-compatible ``/chat/completions`` endpoints."""
+    def build(prefs: Any, key: str, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Request:
+        headers = {'Authorization': f'Bearer {key}', 'Content-Type': 'application/json'}
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": 0.7
+        }
+        return url, headers, data
+    return build
+
+
+def _parse_chat_completion(payload: Any) -> Optional[str]:
+    return payload['choices'][0]['message']['content']
+
+
+def _parse_script_field(payload: Any) -> Optional[str]:
+    return payload.get('script')
+
+
+def _stream_flag(parser: StreamParser) -> StreamBuilder:
+    """Stream builder for APIs that only need ``"stream": true`` in the body."""
+    def build(prefs: Any, url: str, data: Dict[str, Any], prompt: str, max_tokens: int):
+        return url, dict(data, stream=True), parser
+    return build
+
+
+# -----------------------------------------------------------------------------
+# Provider-specific pieces
+# -----------------------------------------------------------------------------
+
+def _build_cloud(prefs: Any, key: str, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Request:
+    url = 'https://api.your-blendair-cloud.com/generate'  # Replace with your real endpoint
+    return url, {'Authorization': f'Bearer {key}'}, {"prompt": prompt}
+
+
+def _build_local(prefs: Any, key: str, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Request:
+    url = getattr(prefs, 'local_llm_endpoint', 'http://localhost:8000/generate')
+    return url, {}, {"prompt": prompt}
+
+
+def _stream_local(prefs: Any, url: str, data: Dict[str, Any], prompt: str,
+                  max_tokens: int = DEFAULT_MAX_TOKENS):
+    # LM Studio and recent Ollama expose an OpenAI-compatible endpoint;
+    # Ollama's native API streams newline-delimited JSON.
+    model = getattr(prefs, 'local_llm_model', 'llama3')
+    path = url.rstrip('/')
+    if path.endswith('/chat/completions'):
+        body = {"model": model, "messages": [{"role": "user", "content": prompt}], "stream": True,
+                "max_tokens": max_tokens}
+        return url, body, parse_openai_stream
+    options = {"num_predict": max_tokens}
+    if path.endswith('/api/chat'):
+        body = {"model": model, "messages": [{"role": "user", "content": prompt}], "stream": True,
+                "options": options}
+        return url, body, parse_ollama_stream
+    if path.endswith('/api/generate'):
+        return url, {"model": model, "prompt": prompt, "stream": True, "options": options}, parse_ollama_stream
+    return None
+
+
+def _build_gemini(prefs: Any, key: str, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Request:
+    url = f'https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={key}'
+    return url, {}, {"contents": [{"parts": [{"text": prompt}]}],
+                     "generationConfig": {"maxOutputTokens": max_tokens}}
+
+
+def _parse_gemini(payload: Any) -> Optional[str]:
+    return payload['candidates'][0]['content']['parts'][0]['text']
+
+
+def _stream_gemini(prefs: Any, url: str, data: Dict[str, Any], prompt: str, max_tokens: int):
+    base, _, query = url.partition('?')
+    url = base.replace(':generateContent', ':streamGenerateContent') + '?alt=sse'
+    if query:
+        url += '&' + query
+    return url, data, parse_gemini_stream
+
+
+_CODE_PROMPT = re.compile(r'(python|script|code|function|def |class )', re.I)
+
+
+def _build_huggingface(prefs: Any, key: str, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Request:
+    # Auto-select best HuggingFace model for code vs general prompt
+    # StarCoder2-15B for code, Llama-3 for general
+    if _CODE_PROMPT.search(prompt):
+        model = 'bigcode/starcoder2-15b'
+    else:
+        model = 'meta-llama/Meta-Llama-3-8B-Instruct'
+    url = f'https://api-inference.huggingface.co/models/{model}'
+    return url, {'Authorization': f'Bearer {key}'}, {"inputs": prompt,
+                                                     "parameters": {"max_new_tokens": max_tokens}}
+
+
+def _parse_huggingface(payload: Any) -> Optional[str]:
+    if isinstance(payload, list):
+        return payload[0]['generated_text']
+    return payload.get('generated_text')
+
+
+def _build_anthropic(prefs: Any, key: str, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Request:
+    headers = {'x-api-key': key, 'anthropic-version': '2023-06-01'}
+    data = {
+        "model": "claude-3-opus-20240229",
+        "max_tokens": max_tokens,
+        "messages": [{"role": "user", "content": prompt}]
+    }
+    return 'https://api.anthropic.com/v1/messages', headers, data
+
+
+def _parse_anthropic(payload: Any) -> Optional[str]:
+    return payload['content'][0]['text']
+
+
+def _build_replicate(prefs: Any, key: str, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Request:
+    headers = {'Authorization': f'Bearer {key}'}
+    data = {"input": {"prompt": prompt, "max_new_tokens": max_tokens}}
+    return 'https://api.replicate.com/v1/predictions', headers, data
+
+
+def _parse_replicate(payload: Any) -> Optional[str]:
+    return payload['output']
+
+
+def extract_usage(payload: Any) -> Optional[Tuple[int, int]]:
+    """Return ``(prompt_tokens, completion_tokens)`` reported by the provider."""
+    if not isinstance(payload, dict):
+        return None
+    usage = payload.get('usage')
+    if isinstance(usage, dict):
+        if 'prompt_tokens' in usage:
+            return int(usage['prompt_tokens']), int(usage.get('completion_tokens', 0))
+        if 'input_tokens' in usage:
+            return int(usage['input_tokens']), int(usage.get('output_tokens', 0))
+    meta = payload.get('usageMetadata')
+    if isinstance(meta, dict):
+        return int(meta.get('promptTokenCount', 0)), int(meta.get('candidatesTokenCount', 0))
+    return None
+
+
+# -----------------------------------------------------------------------------
+# Registry
+# -----------------------------------------------------------------------------
+
+PROVIDERS: Dict[str, ProviderAdapter] = {}
+
+
+def register_provider(adapter: ProviderAdapter) -> None:
+    """Add or replace the adapter for ``adapter.name``."""
+    PROVIDERS[adapter.name] = adapter
+
+
+def get_provider(name: str) -> Optional[ProviderAdapter]:
+    return PROVIDERS.get(name)
+
+
+def enum_items() -> List[Tuple[str, str, str]]:
+    """Return ``EnumProperty`` items for every registered provider."""
+    return [(a.name, a.label, a.description) for a in PROVIDERS.values()]
+
+
+for _adapter in (
+    ProviderAdapter(
+        'blendair_cloud', 'Blend(AI)r Cloud', 'Use Blend(AI)r paid cloud service',
+        _build_cloud, _parse_script_field,
+        key_pref='blendair_api_key', key_label='BlendAIr Cloud API key', max_context=8192,
+        input_cost=0.002, output_cost=0.002,
+    ),
+    ProviderAdapter(
+        'openai', 'OpenAI', 'Use your own OpenAI API key',
+        _chat_completions('https://api.openai.com/v1/chat/completions', 'gpt-4o'),
+        _parse_chat_completion,
+        key_pref='openai_api_key', key_label='OpenAI API key',
+        stream_request=_stream_flag(parse_openai_stream), max_context=128000,
+        input_cost=0.005, output_cost=0.015,
+        token_family='gpt',
+    ),
+    ProviderAdapter(
+        'gemini', 'Gemini', 'Use your own Gemini API key',
+        _build_gemini, _parse_gemini,
+        key_pref='gemini_api_key', key_label='Gemini API key', key_required=False,
+        stream_request=_stream_gemini, max_context=30720,
+        input_cost=0.0005, output_cost=0.0015,
+        token_family='gemini',
+    ),
+    ProviderAdapter(
+        'huggingface', 'HuggingFace', 'Use your own HuggingFace Inference API key',
+        _build_huggingface, _parse_huggingface,
+        key_pref='huggingface_api_key', key_label='HuggingFace API key', max_context=8192,
+        input_cost=0.0002, output_cost=0.0002,
+        token_family='llama',
+    ),
+    ProviderAdapter(
+        'grok', 'Grok', 'Use your own Grok API key',
+        _chat_completions('https://api.grok.x.ai/v1/chat/completions', 'grok-1'),
+        _parse_chat_completion,
+        key_pref='grok_api_key', key_label='Grok API key',
+        stream_request=_stream_flag(parse_openai_stream), max_context=8192,
+        input_cost=0.005, output_cost=0.015,
+        token_family='gpt',
+    ),
+    ProviderAdapter(
+        'deepseek', 'DeepSeek', 'Use your own DeepSeek API key',
+        _chat_completions('https://api.deepseek.com/v1/chat/completions', 'deepseek-coder'),
+        _parse_chat_completion,
+        key_pref='deepseek_api_key', key_label='DeepSeek API key',
+        stream_request=_stream_flag(parse_openai_stream), max_context=16384,
+        input_cost=0.00014, output_cost=0.00028,
+    ),
+    ProviderAdapter(
+        'anthropic', 'Anthropic', 'Use your own Anthropic API key',
+        _build_anthropic, _parse_anthropic,
+        key_pref='anthropic_api_key', key_label='Anthropic API key',
+        stream_request=_stream_flag(parse_anthropic_stream), max_context=200000,
+        input_cost=0.015, output_cost=0.075,
+        token_family='claude',
+    ),
+    ProviderAdapter(
+        'pplx', 'Perplexity', 'Use your own Perplexity API key',
+        _chat_completions('https://api.perplexity.ai/chat/completions', 'pplx-70b-chat'),
+        _parse_chat_completion,
+        key_pref='pplx_api_key', key_label='Perplexity API key',
+        stream_request=_stream_flag(parse_openai_stream), max_context=4096,
+        input_cost=0.001, output_cost=0.001,
+        token_family='llama',
+    ),
+    ProviderAdapter(
+        'replicate', 'Replicate', 'Use your own Replicate API token',
+        _build_replicate, _parse_replicate,
+        key_pref='replicate_api_token', key_label='Replicate API token',
+        input_cost=0.00065, output_cost=0.00275,
+        token_family='llama',
+    ),
+    ProviderAdapter(
+        'local', 'Local (Ollama/LM Studio)', 'Use a local LLM server',
+        _build_local, _parse_script_field,
+        stream_request=_stream_local, context_pref='local_llm_context',
+        token_family='llama',
+    ),
+):
+    register_provider(_adapter)
@@ -0,0 +1,104 @@
+"""Speculative multi-provider requests.
+
+``race`` sends one prompt to several providers at once and keeps the first
+syntactically valid script. ``hedge`` only fires the backup once the
+primary has been slower than its observed p90. Losing requests are
+cancelled: pending ones never start and in-flight ones stop reading their
+response and drop the connection.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+from . import pipeline, provider_stats
+
+# fetch(prompt, provider, cancel_event) -> script or None
+Fetcher = Callable[[str, str, threading.Event], Optional[str]]
+
+DEFAULT_HEDGE_DELAY = 2.0
+
+
+class RaceResult:
+    """Winning script and the provider that produced it."""
+
+    def __init__(self, script: Optional[str], provider: Optional[str], latency: float) -> None:
+        self.script = script
+        self.provider = provider
+        self.latency = latency
+
+
+def is_valid_script(script: Optional[str]) -> bool:
+    """Return True if *script* passes the pre-execution checks."""
+    return pipeline.is_valid(script)
+
+
+def _first_valid(futures: Dict[Future, str], validate: Callable[[Optional[str]], bool],
+                 timeout: Optional[float] = None) -> Optional[Future]:
+    """Wait for futures to finish; return the first one with a valid result.
+
+    Returns None if all finished without a valid script or *timeout* expired.
+    """
+    pending = set(futures)
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    while pending:
+        remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        if not done:
+            return None
+        for future in done:
+            if future.exception() is None and validate(future.result()):
+                return future
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+    return None
+
+
+def race(prompt: str, providers: List[str], fetch: Fetcher,
+         validate: Callable[[Optional[str]], bool] = is_valid_script) -> RaceResult:
+    """Query every provider in parallel and return the first valid script."""
+    start = time.perf_counter()
+    cancel = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=max(1, len(providers)), thread_name_prefix='BlendAIrRace')
+    try:
+        futures = {pool.submit(fetch, prompt, name, cancel): name for name in providers}
+        winner = _first_valid(futures, validate)
+    finally:
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    if winner is None:
+        return RaceResult(None, None, time.perf_counter() - start)
+    return RaceResult(winner.result(), futures[winner], time.perf_counter() - start)
+
+
+def hedge_delay(provider: str, fallback: float = DEFAULT_HEDGE_DELAY) -> float:
+    """Return how long to wait for *provider* before firing a backup (its p90)."""
+    stats = provider_stats.get(provider)
+    if stats.count < provider_stats.MIN_SAMPLES:
+        return fallback
+    return stats.percentile(90) or fallback
+
+
+def hedge(prompt: str, primary: str, backup: str, fetch: Fetcher,
+          delay: Optional[float] = None,
+          validate: Callable[[Optional[str]], bool] = is_valid_script) -> RaceResult:
+    """Ask *primary*; if it is slower than *delay*, also ask *backup*."""
+    start = time.perf_counter()
+    delay = hedge_delay(primary) if delay is None else delay
+    cancel = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='BlendAIrHedge')
+    try:
+        futures = {pool.submit(fetch, prompt, primary, cancel): primary}
+        winner = _first_valid(futures, validate, timeout=delay)
+        if winner is None:
+            futures[pool.submit(fetch, prompt, backup, cancel)] = backup
+            winner = _first_valid(futures, validate)
+    finally:
+        cancel.set()
+        pool.shutdown(wait=False, cancel_futures=True)
+    if winner is None:
+        return RaceResult(None, None, time.perf_counter() - start)
+    return RaceResult(winner.result(), futures[winner], time.perf_counter() - start)
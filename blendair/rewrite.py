@@ -0,0 +1,371 @@
+"""Optional AST pass turning per-object ``bpy.ops`` loops into data API calls.
+
+Generated scripts often select each object in a loop and call an operator
+on it. Every operator call re-evaluates the scene and may push undo state,
+so on big scenes such loops are orders of magnitude slower than writing
+the data directly. :class:`OpsLoopRewriter` recognises these patterns in
+``for`` loops over objects:
+
+* ``bpy.ops.transform.translate`` / ``resize`` and constant assignments to
+  ``location`` / ``rotation_euler`` / ``scale``,
+* ``bpy.ops.object.modifier_add(type=...)``,
+* ``bpy.ops.object.material_slot_add()``.
+
+A loop whose body is only transforms (plus select/activate boilerplate)
+becomes one batched :mod:`foreach_set <bpy.types.bpy_prop_collection>` call
+per statement. Other loops keep their structure, but their operator calls
+are replaced with the equivalent data API call on the loop variable.
+Transform operators only count as applying to the loop variable when the
+body deselects everything and selects it; object operators when the body
+makes it active. The select/activate boilerplate is dropped from the
+loop body and run once afterwards for the last object, so the selection and
+active object end up as the original loop left them. Loops whose body reads
+the active or selected objects through the context are left alone, as are
+loops with ``break``/``continue``. Loops whose variable is read after the
+loop are never batched.
+"""
+
+from __future__ import annotations
+
+import ast
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+RUNTIME = "_blendair_rt"
+# Context reads that depend on the selection/active object the loop sets up.
+CONTEXT_READS = ("context.object", "context.active_object", "context.selected_objects",
+                 "context.selected_editable_objects", "view_layer.objects.active")
+VECTOR_ATTRS = ("location", "rotation_euler", "scale")
+# Names Blender gives new modifiers, by type; other types keep the operator.
+MODIFIER_NAMES = {
+    "ARRAY": "Array",
+    "BEVEL": "Bevel",
+    "BOOLEAN": "Boolean",
+    "CAST": "Cast",
+    "CURVE": "Curve",
+    "DECIMATE": "Decimate",
+    "DISPLACE": "Displace",
+    "EDGE_SPLIT": "EdgeSplit",
+    "MIRROR": "Mirror",
+    "REMESH": "Remesh",
+    "SCREW": "Screw",
+    "SHRINKWRAP": "Shrinkwrap",
+    "SIMPLE_DEFORM": "SimpleDeform",
+    "SMOOTH": "Smooth",
+    "SOLIDIFY": "Solidify",
+    "SUBSURF": "Subdivision",
+    "TRIANGULATE": "Triangulate",
+    "WAVE": "Wave",
+    "WEIGHTED_NORMAL": "WeightedNormal",
+    "WELD": "Weld",
+    "WIREFRAME": "Wireframe",
+}
+
+
+# -----------------------------------------------------------------------------
+# Runtime helpers the rewritten code calls (exposed as ``_blendair_rt``)
+# -----------------------------------------------------------------------------
+
+class Runtime:
+    """Batched data-API operations on a collection or list of objects."""
+
+    @staticmethod
+    def items(iterable: Any) -> Any:
+        """Return *iterable* itself if it supports ``foreach_get``, else a list."""
+        return iterable if hasattr(iterable, "foreach_get") else list(iterable)
+
+    @staticmethod
+    def last(items: Any) -> Any:
+        """The last of *items* as a one-element list (empty if there are none)."""
+        return [items[len(items) - 1]] if len(items) else []
+
+    @staticmethod
+    def _apply(items: Any, attr: str, func) -> None:
+        if hasattr(items, "foreach_get"):
+            flat = [0.0] * (3 * len(items))
+            items.foreach_get(attr, flat)
+            items.foreach_set(attr, [func(i % 3, value) for i, value in enumerate(flat)])
+            for obj in items:
+                obj.update_tag()
+            return
+        for obj in items:
+            vector = getattr(obj, attr)
+            for axis in range(3):
+                vector[axis] = func(axis, vector[axis])
+
+    @staticmethod
+    def parent_space(obj: Any, delta: Sequence[float]) -> Sequence[float]:
+        """World-space *delta* (as ``transform.translate`` moves) in *obj*'s location space."""
+        parent = getattr(obj, "parent", None)
+        if parent is None:
+            return delta
+        world, inverse = parent.matrix_world, obj.matrix_parent_inverse
+        m = [[sum(world[i][k] * inverse[k][j] for k in range(3)) for j in range(3)] for i in range(3)]
+        det = (m[0][0] * (m[1][1] * m[2][2] - m[1][2] * m[2][1])
+               - m[0][1] * (m[1][0] * m[2][2] - m[1][2] * m[2][0])
+               + m[0][2] * (m[1][0] * m[2][1] - m[1][1] * m[2][0]))
+        if not det:
+            return delta
+        # Inverse of m (adjugate / det) applied to delta.
+        adj = [[m[(j + 1) % 3][(i + 1) % 3] * m[(j + 2) % 3][(i + 2) % 3]
+                - m[(j + 1) % 3][(i + 2) % 3] * m[(j + 2) % 3][(i + 1) % 3] for j in range(3)]
+               for i in range(3)]
+        return [sum(adj[i][j] * delta[j] for j in range(3)) / det for i in range(3)]
+
+    @classmethod
+    def add(cls, items: Any, attr: str, delta: Sequence[float]) -> None:
+        if attr == "location" and any(getattr(obj, "parent", None) is not None for obj in items):
+            for obj in items:
+                cls.add_one(obj, attr, delta)
+            return
+        cls._apply(items, attr, lambda axis, value: value + delta[axis])
+
+    @classmethod
+    def mul(cls, items: Any, attr: str, factor: Sequence[float]) -> None:
+        cls._apply(items, attr, lambda axis, value: value * factor[axis])
+
+    @classmethod
+    def set(cls, items: Any, attr: str, value: Sequence[float]) -> None:
+        cls._apply(items, attr, lambda axis, _: value[axis])
+
+    @classmethod
+    def add_one(cls, obj: Any, attr: str, delta: Sequence[float]) -> None:
+        if attr == "location":
+            delta = cls.parent_space(obj, delta)
+        vector = getattr(obj, attr)
+        for axis in range(3):
+            vector[axis] += delta[axis]
+
+    @staticmethod
+    def mul_one(obj: Any, attr: str, factor: Sequence[float]) -> None:
+        vector = getattr(obj, attr)
+        for axis in range(3):
+            vector[axis] *= factor[axis]
+
+
+def namespace() -> Dict[str, Any]:
+    """Extra globals needed by rewritten scripts."""
+    return {RUNTIME: Runtime}
+
+
+# -----------------------------------------------------------------------------
+# Pattern matching
+# -----------------------------------------------------------------------------
+
+def _dotted(node: ast.AST) -> str:
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name):
+        parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+def _call(stmt: ast.stmt) -> Optional[ast.Call]:
+    if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call):
+        return stmt.value
+    return None
+
+
+def _kwarg(call: ast.Call, name: str) -> Optional[ast.expr]:
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    return None
+
+
+def _uses(node: ast.AST, name: str) -> bool:
+    return any(isinstance(n, ast.Name) and n.id == name for n in ast.walk(node))
+
+
+def _loop_invariant(node: ast.AST, var: str) -> bool:
+    """True if *node* can be evaluated once for all objects (no calls, no *var*)."""
+    return not _uses(node, var) and not any(isinstance(n, ast.Call) for n in ast.walk(node))
+
+
+def _boilerplate(stmt: ast.stmt, var: str) -> Optional[str]:
+    """Classify deselect-all, ``var.select_set(True)`` and making *var* active."""
+    call = _call(stmt)
+    if call is not None:
+        name = _dotted(call.func)
+        action = _kwarg(call, "action")
+        if (name == "bpy.ops.object.select_all" and isinstance(action, ast.Constant)
+                and action.value == "DESELECT"):
+            return "deselect"
+        if (name == f"{var}.select_set" and len(call.args) == 1
+                and isinstance(call.args[0], ast.Constant) and call.args[0].value is True):
+            return "select"
+        return None
+    if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+        target = _dotted(stmt.targets[0])
+        if (target.endswith("view_layer.objects.active")
+                and isinstance(stmt.value, ast.Name) and stmt.value.id == var):
+            return "activate"
+    return None
+
+
+def _reads_context(stmts: List[ast.stmt]) -> bool:
+    """True if *stmts* read the active or selected objects through the context."""
+    return any(isinstance(n, ast.Attribute) and isinstance(n.ctx, ast.Load)
+               and _dotted(n).endswith(CONTEXT_READS)
+               for stmt in stmts for n in ast.walk(stmt))
+
+
+def _jumps(stmts: List[ast.stmt]) -> bool:
+    return any(isinstance(n, (ast.Break, ast.Continue)) for stmt in stmts for n in ast.walk(stmt))
+
+
+def _rt(method: str, *args: ast.expr) -> ast.Expr:
+    func = ast.Attribute(ast.Name(RUNTIME, ast.Load()), method, ast.Load())
+    return ast.Expr(ast.Call(func, list(args), []))
+
+
+def _transform(stmt: ast.stmt, var: str) -> Optional[Tuple[str, str, ast.expr]]:
+    """Return ``(op, attr, value)`` for a batchable transform statement.
+
+    *op* is ``add``, ``mul`` or ``set``; *value* must be loop invariant.
+    """
+    call = _call(stmt)
+    if call is not None:
+        name = _dotted(call.func)
+        value = _kwarg(call, "value")
+        if value is None or not _loop_invariant(value, var) or len(call.keywords) != 1:
+            return None
+        if name == "bpy.ops.transform.translate":
+            return "add", "location", value
+        if name == "bpy.ops.transform.resize":
+            return "mul", "scale", value
+        return None
+    if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1:
+        target = stmt.targets[0]
+        if (isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name)
+                and target.value.id == var and target.attr in VECTOR_ATTRS
+                and _loop_invariant(stmt.value, var)):
+            return "set", target.attr, stmt.value
+    return None
+
+
+def _per_object(stmt: ast.stmt, var: str, only_selected: bool, active: bool) -> Optional[ast.stmt]:
+    """Data-API replacement for an operator acting on *var*.
+
+    Transform operators act on the selection, so they need *var* to be the
+    *only_selected* object; object operators act on the *active* one.
+    """
+    call = _call(stmt)
+    if call is None:
+        return None
+    name = _dotted(call.func)
+    obj = ast.Name(var, ast.Load())
+    value = _kwarg(call, "value")
+    single_value = value is not None and len(call.keywords) == 1 and only_selected
+    if name == "bpy.ops.transform.translate" and single_value:
+        return _rt("add_one", obj, ast.Constant("location"), value)
+    if name == "bpy.ops.transform.resize" and single_value:
+        return _rt("mul_one", obj, ast.Constant("scale"), value)
+    if not active:
+        return None
+    if name == "bpy.ops.object.modifier_add":
+        mod_type = _kwarg(call, "type")
+        if (mod_type is None or len(call.keywords) != 1 or not isinstance(mod_type, ast.Constant)
+                or not isinstance(mod_type.value, str) or mod_type.value not in MODIFIER_NAMES):
+            return None
+        new = ast.Attribute(ast.Attribute(obj, "modifiers", ast.Load()), "new", ast.Load())
+        label = ast.Constant(MODIFIER_NAMES[mod_type.value])
+        return ast.Expr(ast.Call(new, [], [ast.keyword("name", label), ast.keyword("type", mod_type)]))
+    if name == "bpy.ops.object.material_slot_add" and not call.args and not call.keywords:
+        materials = ast.Attribute(ast.Attribute(obj, "data", ast.Load()), "materials", ast.Load())
+        append = ast.Attribute(materials, "append", ast.Load())
+        return ast.Expr(ast.Call(append, [ast.Constant(None)], []))
+    return None
+
+
+class OpsLoopRewriter(ast.NodeTransformer):
+    """Rewrites per-object operator loops; ``rewrites`` counts changed loops."""
+
+    def __init__(self) -> None:
+        self.rewrites = 0
+        self._temp = 0
+        # Name -> line numbers where it is read; None until a module is visited.
+        self._reads: Optional[Dict[str, List[int]]] = None
+
+    def visit_Module(self, node: ast.Module) -> Any:
+        self._reads = {}
+        for name in ast.walk(node):
+            if isinstance(name, ast.Name) and isinstance(name.ctx, ast.Load):
+                self._reads.setdefault(name.id, []).append(name.lineno)
+        return self.generic_visit(node)
+
+    def _read_outside(self, node: ast.For, var: str) -> bool:
+        """True if *var* may be read outside *node* (unknown counts as read)."""
+        if self._reads is None:
+            return True
+        return any(not node.lineno <= line <= node.end_lineno for line in self._reads.get(var, ()))
+
+    def visit_For(self, node: ast.For) -> Any:
+        self.generic_visit(node)
+        if not isinstance(node.target, ast.Name) or node.orelse:
+            return node
+        var = node.target.id
+        kinds = [_boilerplate(stmt, var) for stmt in node.body]
+        body = [stmt for stmt, kind in zip(node.body, kinds) if kind is None]
+        boilerplate = [stmt for stmt, kind in zip(node.body, kinds) if kind is not None]
+        only_selected = "deselect" in kinds and "select" in kinds
+        active = "activate" in kinds
+        if not body or _jumps(body) or (boilerplate and _reads_context(body)):
+            return node
+
+        transforms = [_transform(stmt, var) for stmt in body]
+        batchable = (all(transforms) and not self._read_outside(node, var)
+                     and (only_selected or all(op == "set" for op, _, _ in transforms)))
+        if batchable:
+            self._temp += 1
+            items = f"_blendair_items_{self._temp}"
+            out: List[ast.stmt] = [ast.Assign(
+                [ast.Name(items, ast.Store())],
+                ast.Call(ast.Attribute(ast.Name(RUNTIME, ast.Load()), "items", ast.Load()), [node.iter], []),
+            )]
+            for op, attr, value in transforms:
+                out.append(_rt(op, ast.Name(items, ast.Load()), ast.Constant(attr), value))
+            if boilerplate:
+                # Leave the last object selected/active, as the loop did.
+                last = ast.Call(ast.Attribute(ast.Name(RUNTIME, ast.Load()), "last", ast.Load()),
+                                [ast.Name(items, ast.Load())], [])
+                out.append(ast.For(ast.Name(var, ast.Store()), last, boilerplate, []))
+            self.rewrites += 1
+            return [ast.copy_location(stmt, node) for stmt in out]
+
+        if not (only_selected or active):
+            return node
+        new_body: List[ast.stmt] = []
+        changed = False
+        for stmt in body:
+            replacement = _per_object(stmt, var, only_selected, active)
+            changed = changed or replacement is not None
+            new_body.append(ast.copy_location(replacement, stmt) if replacement is not None else stmt)
+        remaining_ops = any(_dotted(getattr(_call(stmt), "func", ast.Pass())).startswith("bpy.ops.")
+                            for stmt in new_body)
+        if not changed or remaining_ops:
+            # Some operator still relies on the selection; leave the loop alone.
+            return node
+        # Run the boilerplate once for the object the loop ended on.
+        self._temp += 1
+        seen = f"_blendair_seen_{self._temp}"
+        node.body = [ast.Assign([ast.Name(seen, ast.Store())], ast.Constant(True))] + new_body
+        after = ast.If(ast.Name(seen, ast.Load()), boilerplate, [])
+        before = ast.Assign([ast.Name(seen, ast.Store())], ast.Constant(False))
+        self.rewrites += 1
+        return [ast.copy_location(before, node), node, ast.copy_location(after, node)]
+
+
+def rewrite_tree(tree: ast.Module) -> Tuple[ast.Module, int]:
+    """Rewrite *tree* in place; return it with the number of loops changed."""
+    rewriter = OpsLoopRewriter()
+    tree = rewriter.visit(tree)
+    ast.fix_missing_locations(tree)
+    return tree, rewriter.rewrites
+
+
+def rewrite_source(source: str) -> Tuple[str, int]:
+    """Source-level convenience wrapper around :func:`rewrite_tree`."""
+    tree, count = rewrite_tree(ast.parse(source))
+    return (ast.unparse(tree) if count else source), count
@@ -0,0 +1,56 @@
+"""Adaptive provider routing.
+
+Picks, per prompt, the cheapest provider whose measured p90 latency meets
+the configured SLO, skipping providers whose circuit breaker is open.
+Providers without enough samples are assumed to meet the SLO so they get
+explored, and are costed from their list prices until real costs exist.
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional
+
+from . import provider_stats, providers, tokens
+
+
+def available(candidates: List[str]) -> List[str]:
+    """Return the candidates whose circuit breaker lets requests through.
+
+    Only checks; the request itself claims a half-open trial (see
+    :func:`.prompts.fetch_script`).
+    """
+    return [name for name in candidates if provider_stats.get(name).breaker.ready()]
+
+
+def expected_cost(name: str, prompt: str) -> float:
+    """Measured mean cost per request, or a list-price estimate without data."""
+    measured = provider_stats.get(name).mean_cost
+    if measured is not None:
+        return measured
+    adapter = providers.get_provider(name)
+    if adapter is None:
+        return float("inf")
+    return adapter.cost(tokens.count_tokens(prompt, adapter.token_family), tokens.max_tokens_for(prompt))
+
+
+def meets_slo(name: str, slo: float) -> bool:
+    stats = provider_stats.get(name)
+    if stats.count < provider_stats.MIN_SAMPLES:
+        return True
+    p90 = stats.percentile(90)
+    return p90 is not None and p90 <= slo
+
+
+def choose(candidates: List[str], prompt: str, slo: float) -> Optional[str]:
+    """Return the provider to use for *prompt*, or None if every circuit is open.
+
+    If no provider meets *slo*, the one with the lowest p90 wins.
+    """
+    names = available(candidates)
+    if not names:
+        return None
+    within = [name for name in names if meets_slo(name, slo)]
+    if within:
+        # Stable sort keeps the configured order for equal costs.
+        return min(within, key=lambda name: expected_cost(name, prompt))
+    return min(names, key=lambda name: provider_stats.get(name).percentile(90) or float("inf"))
@@ -0,0 +1,236 @@
+"""Compact scene summary sent to the LLM along with each prompt.
+
+Summarising a large scene on every prompt is slow, so one line per object is
+cached and refreshed from ``depsgraph_update_post`` for only the objects that
+changed. :func:`render` assembles the cached lines on demand, selected and
+active objects first, trimmed to a character budget derived from the
+provider's context window. The response cache keys on :func:`fingerprint`
+of the summary (object names and types), so moving objects or the playhead
+does not invalidate cached scripts.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import re
+import threading
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, Optional
+
+import bpy
+
+from . import logger, providers, tokens
+
+# Share of the provider context window that scene context may fill.
+CONTEXT_SHARE = 0.5
+MAX_LISTED = 6
+# "Name [TYPE]" at the start of a describe_object() line.
+_NAME_TYPE = re.compile(r"^(?P<head>.*? \[[A-Z_]+\])")
+
+
+def describe_object(obj: Any) -> str:
+    """One line naming *obj*, its type, location, parent, modifiers and materials."""
+    parts = [f"{obj.name} [{obj.type}]"]
+    location = getattr(obj, "location", None)
+    if location is not None:
+        parts.append("at (%.2f, %.2f, %.2f)" % tuple(location))
+    if getattr(obj, "parent", None) is not None:
+        parts.append(f"parent={obj.parent.name}")
+    modifiers = [f"{mod.name}:{mod.type}" for mod in islice(getattr(obj, "modifiers", ()), MAX_LISTED)]
+    if modifiers:
+        parts.append(f"modifiers={','.join(modifiers)}")
+    materials = [slot.material.name for slot in islice(getattr(obj, "material_slots", ()), MAX_LISTED)
+                 if slot.material is not None]
+    if materials:
+        parts.append(f"materials={','.join(materials)}")
+    return " ".join(parts)
+
+
+class SceneContext:
+    """Per-object summary lines for one scene, kept current incrementally."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.scene_name: Optional[str] = None
+        # Keyed by ``as_pointer()`` so renames replace the line in place.
+        self.lines: Dict[int, str] = {}
+        self.build_time = 0.0
+        self.update_time = 0.0
+        self.render_time = 0.0
+        self.updates = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self.scene_name = None
+            self.lines = {}
+
+    def build(self, scene: Any) -> None:
+        """Describe every object of *scene* from scratch."""
+        start = time.perf_counter()
+        lines = {obj.as_pointer(): describe_object(obj) for obj in scene.objects}
+        with self._lock:
+            self.lines = lines
+            self.scene_name = scene.name
+        self.build_time = time.perf_counter() - start
+
+    def update(self, scene: Any, updates: Iterable[Any]) -> None:
+        """Refresh the objects named in depsgraph *updates*.
+
+        Added or removed objects show up as a collection or scene update and
+        are reconciled by comparing the object count before a full pass.
+        """
+        if scene.name != self.scene_name:
+            self.build(scene)
+            return
+        start = time.perf_counter()
+        membership_changed = False
+        with self._lock:
+            for update in updates:
+                id_data = getattr(update.id, "original", update.id)
+                if isinstance(id_data, bpy.types.Object):
+                    self.lines[id_data.as_pointer()] = describe_object(id_data)
+                elif isinstance(id_data, (bpy.types.Collection, bpy.types.Scene)):
+                    membership_changed = True
+            if membership_changed and len(scene.objects) != len(self.lines):
+                current = {obj.as_pointer(): obj for obj in scene.objects}
+                for key in self.lines.keys() - current.keys():
+                    del self.lines[key]
+                for key in current.keys() - self.lines.keys():
+                    self.lines[key] = describe_object(current[key])
+        self.update_time = time.perf_counter() - start
+        self.updates += 1
+
+    def render(self, scene: Any, budget: int, selected: Iterable[Any] = (),
+               active: Any = None) -> str:
+        """Return the summary, selected and active objects first, within *budget* chars."""
+        start = time.perf_counter()
+        if scene.name != self.scene_name:
+            self.build(scene)
+        with self._lock:
+            lines = dict(self.lines)
+        selected = list(selected)
+        first = [obj.as_pointer() for obj in selected]
+        if active is not None:
+            first.insert(0, active.as_pointer())
+        out = [f"Scene '{scene.name}': {len(lines)} objects, "
+               f"active: {active.name if active is not None else 'none'}, selected: {len(selected)}"]
+        used = len(out[0])
+        listed = 0
+        ordered = list(dict.fromkeys(key for key in first if key in lines))
+        seen = set(ordered)
+        ordered += [key for key in lines if key not in seen]
+        for key in ordered:
+            line = lines[key]
+            if used + len(line) + 1 > budget:
+                break
+            out.append(line)
+            used += len(line) + 1
+            listed += 1
+        if listed < len(ordered):
+            out.append(f"... {len(ordered) - listed} more objects")
+        self.render_time = time.perf_counter() - start
+        return "\n".join(out)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "objects": len(self.lines),
+            "build_ms": self.build_time * 1000,
+            "update_ms": self.update_time * 1000,
+            "render_ms": self.render_time * 1000,
+            "updates": self.updates,
+        }
+
+
+_CONTEXT = SceneContext()
+# While a script runs, updates are only noted and the cache is dropped after.
+_PAUSE = {"depth": 0, "missed": False}
+
+
+def _on_depsgraph_update(scene, depsgraph) -> None:
+    if _PAUSE["depth"]:
+        _PAUSE["missed"] = True
+        return
+    try:
+        _CONTEXT.update(scene, depsgraph.updates)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning(f"Scene context update failed: {exc}", exc)
+        _CONTEXT.clear()
+
+
+def _on_load_post(*_args) -> None:
+    # Loading a file or an undo step re-reads IDs, so cached pointers are stale.
+    _CONTEXT.clear()
+
+
+@contextlib.contextmanager
+def paused():
+    """Skip incremental updates inside the block; rebuild lazily afterwards if any were missed."""
+    _PAUSE["depth"] += 1
+    try:
+        yield
+    finally:
+        _PAUSE["depth"] -= 1
+        if not _PAUSE["depth"] and _PAUSE["missed"]:
+            _PAUSE["missed"] = False
+            _CONTEXT.clear()
+
+
+def budget_for(prefs: Any, prompt: str) -> int:
+    """Characters of scene context that fit the configured provider's window."""
+    adapter = providers.get_provider(getattr(prefs, "llm_provider", "blendair_cloud"))
+    window = adapter.context_window(prefs) if adapter is not None else 4096
+    remaining = window * CONTEXT_SHARE - tokens.count_tokens(prompt)
+    return max(0, int(remaining * tokens.FAMILY_RATIOS["default"]))
+
+
+def fingerprint(summary: str) -> str:
+    """The parts of *summary* a cached script depends on: header, object names and types.
+
+    Locations, modifiers and materials change with every edit, and keying the
+    response cache on them would make it miss after each nudge.
+    """
+    kept = []
+    for line in summary.splitlines():
+        match = _NAME_TYPE.match(line)
+        kept.append(match.group("head") if match else line)
+    return "\n".join(kept)
+
+
+def for_prompt(context: Any, prefs: Any, prompt: str) -> str:
+    """Scene context for *prompt*, or '' when disabled (main thread only)."""
+    if not getattr(prefs, "send_scene_context", True):
+        return ""
+    return _CONTEXT.render(context.scene, budget_for(prefs, prompt),
+                           getattr(context, "selected_objects", ()) or (),
+                           getattr(context, "active_object", None))
+
+
+def stats() -> Dict[str, Any]:
+    return _CONTEXT.stats()
+
+
+def _handler_lists(handlers):
+    return ((handlers.depsgraph_update_post, _on_depsgraph_update),
+            (handlers.load_post, _on_load_post),
+            (handlers.undo_post, _on_load_post),
+            (handlers.redo_post, _on_load_post))
+
+
+def start() -> None:
+    """Install the depsgraph, file-load and undo handlers (no-op outside Blender)."""
+    handlers = getattr(getattr(bpy, "app", None), "handlers", None)
+    if handlers is None:
+        return
+    for handler_list, func in _handler_lists(handlers):
+        if func not in handler_list:
+            handler_list.append(handlers.persistent(func))
+
+
+def stop() -> None:
+    handlers = getattr(getattr(bpy, "app", None), "handlers", None)
+    if handlers is not None:
+        for handler_list, func in _handler_lists(handlers):
+            if func in handler_list:
+                handler_list.remove(func)
+    _CONTEXT.clear()
@@ -0,0 +1,315 @@
+"""Resumable, chunked uploads to (and downloads from) Supabase Storage.
+
+Exports can be several GB, so files are never read into memory whole.
+:func:`upload_file` speaks the TUS protocol of Supabase's resumable upload
+endpoint: it creates an upload, then streams fixed-size chunks from disk
+with ``PATCH`` requests. A background reader loads and checksums the next
+chunk while the current one is on the wire. Each chunk carries a TUS
+``Upload-Checksum`` header and the server's acknowledged offset is checked
+after every chunk and once more at the end. When a chunk fails, the server
+is asked how much it received and the upload resumes from there.
+
+Downloads stream straight to a ``.part`` file and are renamed into place
+once complete. :func:`fetch_cached` keeps downloaded objects with their
+ETag and revalidates them with ``If-None-Match``, so an unchanged model is
+not transferred again.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import requests
+
+from . import logger
+
+# Supabase's resumable endpoint requires 6 MB chunks (except the last one).
+CHUNK_SIZE = 6 * 1024 * 1024
+MAX_RESUMES = 5
+RESUME_BACKOFF = 1.0
+TUS_VERSION = "1.0.0"
+UPLOAD_BUCKET = "input_models"
+DOWNLOAD_BUCKET = "output_models"
+DOWNLOAD_BLOCK = 1024 * 1024
+LIST_PAGE = 1000
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+class StorageError(RuntimeError):
+    """A transfer to or from Supabase Storage failed."""
+
+
+class UploadError(StorageError):
+    """An upload could not be completed or verified."""
+
+
+class Download(NamedTuple):
+    path: str
+    size: int
+    etag: str
+    downloaded: bool  # False when the cached copy was still current
+
+
+def credentials(prefs: Any) -> Optional[Tuple[str, str]]:
+    """Return ``(url, key)`` from preferences or the environment, if configured."""
+    url = (getattr(prefs, "supabase_url", "") or "").rstrip("/")
+    key = getattr(prefs, "supabase_key", "")
+    if not url or not key or "YOURPROJECT" in url:
+        url = (os.getenv("SUPABASE_URL") or "").rstrip("/")
+        key = os.getenv("SUPABASE_SERVICE_KEY") or ""
+    return (url, key) if url and key else None
+
+
+def _client(prefs: Any, session: Optional[requests.Session]) -> Tuple[str, Dict[str, str], Any, Any]:
+    from . import transport
+    creds = credentials(prefs)
+    if creds is None:
+        raise StorageError("Supabase is not configured")
+    url, api_key = creds
+    headers = {"apikey": api_key, "Authorization": f"Bearer {api_key}"}
+    return (f"{url}/storage/v1", headers, session or transport.session_for(prefs, "supabase"),
+            transport.request_timeout(prefs))
+
+
+def project_name(filepath: str) -> str:
+    """Storage-safe project name from a ``.blend`` path (``untitled`` if unsaved)."""
+    stem = os.path.splitext(os.path.basename(filepath or ""))[0]
+    return _UNSAFE.sub("_", stem).strip("._") or "untitled"
+
+
+def object_key(project: str, filename: str, version: Optional[str] = None) -> str:
+    """Unique object key ``<project>/<version>/<filename>``.
+
+    *version* defaults to a UTC timestamp plus a short random suffix, so two
+    uploads never overwrite each other.
+    """
+    version = version or f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+    parts = (project or "untitled", version, filename)
+    return "/".join(_UNSAFE.sub("_", part).strip("._") or "_" for part in parts)
+
+
+def _metadata(**values: str) -> str:
+    return ",".join(f"{name} {base64.b64encode(value.encode('utf-8')).decode('ascii')}"
+                    for name, value in values.items())
+
+
+def _read_chunk(path: str, offset: int, size: int) -> Tuple[bytes, str]:
+    with open(path, "rb") as fp:
+        fp.seek(offset)
+        data = fp.read(size)
+    return data, base64.b64encode(hashlib.sha1(data).digest()).decode("ascii")
+
+
+def _catch_up(digest: Any, path: str, hashed: int, offset: int, chunk_size: int) -> int:
+    """Hash bytes the server received without an acknowledgement reaching us."""
+    while hashed < offset:
+        data, _ = _read_chunk(path, hashed, min(chunk_size, offset - hashed))
+        digest.update(data)
+        hashed += len(data)
+    return hashed
+
+
+class _Upload:
+    """State of one TUS upload: where it lives and how far the server got."""
+
+    def __init__(self, session: requests.Session, endpoint: str, headers: Dict[str, str],
+                 timeout: Any) -> None:
+        self.session = session
+        self.endpoint = endpoint
+        self.headers = dict(headers, **{"Tus-Resumable": TUS_VERSION})
+        self.timeout = timeout
+        self.location = ""
+
+    def create(self, size: int, bucket: str, key: str, content_type: str, upsert: bool) -> None:
+        resp = self.session.post(self.endpoint, timeout=self.timeout, headers=dict(
+            self.headers,
+            **{"Upload-Length": str(size), "x-upsert": "true" if upsert else "false",
+               "Upload-Metadata": _metadata(bucketName=bucket, objectName=key,
+                                            contentType=content_type, cacheControl="3600")}))
+        resp.raise_for_status()
+        location = resp.headers.get("Location", "")
+        if not location:
+            raise UploadError("Storage server did not return an upload location")
+        self.location = requests.compat.urljoin(self.endpoint, location)
+
+    def offset(self) -> int:
+        resp = self.session.head(self.location, headers=self.headers, timeout=self.timeout)
+        resp.raise_for_status()
+        return int(resp.headers["Upload-Offset"])
+
+    def send(self, offset: int, data: bytes, checksum: str) -> int:
+        resp = self.session.patch(self.location, data=data, timeout=self.timeout, headers=dict(
+            self.headers,
+            **{"Upload-Offset": str(offset), "Content-Type": "application/offset+octet-stream",
+               "Upload-Checksum": f"sha1 {checksum}"}))
+        resp.raise_for_status()
+        return int(resp.headers.get("Upload-Offset", offset + len(data)))
+
+
+def upload_file(prefs: Any, path: str, key: str, bucket: str = UPLOAD_BUCKET,
+                content_type: str = "application/octet-stream", upsert: bool = False,
+                on_progress: Optional[Callable[[int, int], None]] = None,
+                cancel: Optional[Callable[[], bool]] = None,
+                session: Optional[requests.Session] = None,
+                chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """Upload *path* to ``bucket/key`` in resumable chunks.
+
+    ``on_progress(sent, total)`` is called after every chunk; ``cancel()``
+    is polled between chunks. Returns the key, size and SHA-256 of the file
+    as uploaded.
+    """
+    base, headers, session, timeout = _client(prefs, session)
+    upload = _Upload(session, f"{base}/upload/resumable", headers, timeout)
+    size = os.path.getsize(path)
+    upload.create(size, bucket, key, content_type, upsert)
+
+    digest = hashlib.sha256()
+    hashed = 0  # bytes folded into *digest*; resent bytes are not hashed twice
+    offset = 0
+    resumes = 0
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="BlendAIrUpload") as reader:
+        pending = reader.submit(_read_chunk, path, 0, chunk_size)
+        while offset < size:
+            if cancel is not None and cancel():
+                raise UploadError("Upload cancelled")
+            data, checksum = pending.result()
+            if offset + len(data) < size:
+                pending = reader.submit(_read_chunk, path, offset + len(data), chunk_size)
+            try:
+                acknowledged = upload.send(offset, data, checksum)
+            except requests.RequestException as exc:
+                resumes += 1
+                if resumes > MAX_RESUMES:
+                    raise UploadError(f"Upload failed after {MAX_RESUMES} resumes: {exc}") from exc
+                logger.warning(f"Upload chunk at {offset} failed ({exc}); resuming.", key=key, offset=offset)
+                time.sleep(RESUME_BACKOFF * resumes)
+                offset = upload.offset()
+                hashed = _catch_up(digest, path, hashed, offset, chunk_size)
+                pending.cancel()
+                pending = reader.submit(_read_chunk, path, offset, chunk_size)
+                continue
+            if acknowledged != offset + len(data):
+                raise UploadError(f"Server acknowledged {acknowledged} bytes, expected {offset + len(data)}")
+            if acknowledged > hashed:
+                digest.update(data[hashed - offset:])
+                hashed = acknowledged
+            offset = acknowledged
+            if on_progress is not None:
+                on_progress(offset, size)
+
+    if size and upload.offset() != size:
+        raise UploadError("Upload incomplete: server offset does not match file size")
+    return {"bucket": bucket, "key": key, "size": size, "sha256": digest.hexdigest()}
+
+
+def list_objects(prefs: Any, bucket: str = DOWNLOAD_BUCKET, prefix: str = "",
+                 session: Optional[requests.Session] = None) -> List[str]:
+    """Names of the objects directly under the folder *prefix* in *bucket*."""
+    base, headers, session, timeout = _client(prefs, session)
+    names: List[str] = []
+    while True:
+        resp = session.post(f"{base}/object/list/{bucket}", headers=headers, timeout=timeout,
+                            json={"prefix": prefix, "limit": LIST_PAGE, "offset": len(names)})
+        resp.raise_for_status()
+        page = [row["name"] for row in resp.json()]
+        names += page
+        if len(page) < LIST_PAGE:
+            return names
+
+
+def download_file(prefs: Any, key: str, dest: str, bucket: str = DOWNLOAD_BUCKET,
+                  session: Optional[requests.Session] = None, etag: str = "",
+                  on_progress: Optional[Callable[[int, int], None]] = None,
+                  cancel: Optional[Callable[[], bool]] = None) -> Download:
+    """Stream ``bucket/key`` to *dest* without holding it in memory.
+
+    With *etag*, the server may answer 304 and *dest* is left untouched
+    (``downloaded`` is False). Partial files never replace *dest*.
+    """
+    base, headers, session, timeout = _client(prefs, session)
+    if etag:
+        headers["If-None-Match"] = etag
+    part = f"{dest}.part"
+    with session.get(f"{base}/object/{bucket}/{key}", headers=headers, timeout=timeout,
+                     stream=True) as resp:
+        if resp.status_code == 304:
+            return Download(dest, os.path.getsize(dest), etag, False)
+        resp.raise_for_status()
+        total = int(resp.headers.get("Content-Length") or 0)
+        size = 0
+        try:
+            with open(part, "wb") as fp:
+                for block in resp.iter_content(DOWNLOAD_BLOCK):
+                    if cancel is not None and cancel():
+                        raise StorageError("Download cancelled")
+                    fp.write(block)
+                    size += len(block)
+                    if on_progress is not None:
+                        on_progress(size, max(total, size))
+            os.replace(part, dest)
+        finally:
+            if os.path.exists(part):
+                os.remove(part)
+    return Download(dest, size, resp.headers.get("ETag", ""), True)
+
+
+# -----------------------------------------------------------------------------
+# ETag-validated download cache
+# -----------------------------------------------------------------------------
+
+_CACHE_LOCK = threading.Lock()
+INDEX_NAME = "etags.json"
+
+
+def download_dir(prefs: Any) -> Path:
+    """Where downloads are kept: ``downloads`` next to the response cache."""
+    from .cache import DEFAULT_CACHE_DIR
+    return Path(getattr(prefs, "cache_dir", "") or DEFAULT_CACHE_DIR) / "downloads"
+
+
+def _load_index(directory: Path) -> Dict[str, str]:
+    try:
+        return json.loads((directory / INDEX_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def fetch_cached(prefs: Any, key: str, bucket: str = DOWNLOAD_BUCKET,
+                 session: Optional[requests.Session] = None,
+                 on_progress: Optional[Callable[[int, int], None]] = None,
+                 cancel: Optional[Callable[[], bool]] = None) -> Download:
+    """Download ``bucket/key`` into the download cache unless the cached copy is current."""
+    directory = download_dir(prefs)
+    directory.mkdir(parents=True, exist_ok=True)
+    cache_id = f"{bucket}/{key}"
+    dest = str(directory / (hashlib.sha256(cache_id.encode("utf-8")).hexdigest()[:24]
+                            + "_" + _UNSAFE.sub("_", os.path.basename(key))))
+    with _CACHE_LOCK:
+        etag = _load_index(directory).get(cache_id, "") if os.path.exists(dest) else ""
+    result = download_file(prefs, key, dest, bucket, session, etag, on_progress, cancel)
+    if result.downloaded:
+        with _CACHE_LOCK:
+            index = _load_index(directory)
+            index[cache_id] = result.etag
+            (directory / INDEX_NAME).write_text(json.dumps(index), encoding="utf-8")
+    return result
+
+
+def format_size(num: float) -> str:
+    """Human-readable byte count for status messages."""
+    for unit in ("B", "KB", "MB"):
+        if num < 1024:
+            return f"{num:.0f} {unit}" if unit == "B" else f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.2f} GB"
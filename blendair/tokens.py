@@ -0,0 +1,174 @@
+"""Token accounting and per-request input/output budgeting.
+
+Token counts are estimated locally (no tokenizer download) from word and
+punctuation pieces, with a characters-per-token ratio per tokenizer family.
+:func:`plan` splits a provider's context window between the completion
+(sized from the kind of prompt) and the input, compacting the scene context
+until prompt plus context fit.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+from . import logger
+
+# Average characters per token inside one word/number piece, per family.
+FAMILY_RATIOS = {
+    "gpt": 4.0,
+    "claude": 3.5,
+    "gemini": 4.0,
+    "llama": 3.8,
+    "default": 3.6,
+}
+# Completion budget per prompt class.
+MAX_TOKENS_BY_CLASS = {
+    "edit": 256,
+    "create": 512,
+    "complex": 1536,
+}
+# Tokens reserved for chat framing and the instruction wrapper.
+OVERHEAD_TOKENS = 32
+USAGE_LOG_SIZE = 100
+
+_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_EDIT = re.compile(r"^\s*(rename|move|rotate|scale|set|change|delete|remove|hide|show|select|"
+                   r"make .* (bigger|smaller|red|blue|green))\b", re.I)
+_COMPLEX = re.compile(r"\b(rig|animate|animation|procedural|generate|scene|city|forest|"
+                      r"for (each|every)|each of|loop|node tree|geometry nodes|shader)\b", re.I)
+_ZERO_LOCATION = " at (0.00, 0.00, 0.00)"
+_LOCATION = re.compile(r" at \([^)]*\)")
+_NUMBERED = re.compile(r"^(?P<base>.+?)\.(?P<num>\d{3,})(?P<rest> \[.*)$")
+
+
+def count_tokens(text: str, family: str = "default") -> int:
+    """Estimate the number of tokens of *text* for a tokenizer *family*."""
+    if not text:
+        return 0
+    ratio = FAMILY_RATIOS.get(family, FAMILY_RATIOS["default"])
+    return sum(math.ceil(len(piece) / ratio) for piece in _PIECE.findall(text))
+
+
+def classify(prompt: str) -> str:
+    """Return ``edit``, ``create`` or ``complex`` for *prompt*."""
+    if _COMPLEX.search(prompt) or prompt.count(".") + prompt.count("\n") >= 3:
+        return "complex"
+    if _EDIT.search(prompt):
+        return "edit"
+    return "create"
+
+
+def max_tokens_for(prompt: str) -> int:
+    return MAX_TOKENS_BY_CLASS[classify(prompt)]
+
+
+# -----------------------------------------------------------------------------
+# Context compaction
+# -----------------------------------------------------------------------------
+
+def _collapse_numbered(lines: List[str]) -> List[str]:
+    """Merge runs like ``Cube.001 [MESH] ...``, ``Cube.002 [MESH] ...`` that differ only by number."""
+    out: List[str] = []
+    run: List[str] = []
+    run_key = None
+
+    def flush() -> None:
+        if len(run) > 2:
+            first = _NUMBERED.match(run[0])
+            last = _NUMBERED.match(run[-1])
+            out.append(f"{first['base']}.{first['num']}..{last['num']} (x{len(run)}){first['rest']}")
+        else:
+            out.extend(run)
+
+    for line in lines:
+        match = _NUMBERED.match(line)
+        key = (match["base"], match["rest"]) if match else None
+        if key is not None and key == run_key:
+            run.append(line)
+            continue
+        flush()
+        run, run_key = [line], key
+    flush()
+    return out
+
+
+def compact_context(context: str, budget: int, family: str = "default") -> str:
+    """Shrink *context* to at most *budget* tokens.
+
+    Lossless steps go first: default transforms are dropped, duplicate
+    lines removed and numbered copies sharing one description collapsed.
+    Then all locations are dropped and copies collapsed again. Only then
+    are trailing lines cut, keeping the header and the selected objects
+    that the scene summary lists first.
+    """
+    if budget <= 0:
+        return ""
+    if count_tokens(context, family) <= budget:
+        return context
+    lines = [line.replace(_ZERO_LOCATION, "") for line in context.splitlines()]
+    lines = _collapse_numbered(list(dict.fromkeys(lines)))
+    if count_tokens("\n".join(lines), family) > budget:
+        lines = _collapse_numbered([_LOCATION.sub("", line) for line in lines])
+    costs = [count_tokens(line, family) + 1 for line in lines]
+    if sum(costs) <= budget:
+        return "\n".join(lines)
+    kept, used = [], 0
+    for line, cost in zip(lines, costs):
+        if used + cost > budget - 8:
+            break
+        kept.append(line)
+        used += cost
+    if len(kept) < len(lines):
+        kept.append(f"... {len(lines) - len(kept)} more lines omitted")
+    return "\n".join(kept)
+
+
+# -----------------------------------------------------------------------------
+# Per-request planning and usage log
+# -----------------------------------------------------------------------------
+
+class Plan(NamedTuple):
+    context: str
+    max_tokens: int
+    prompt_tokens: int
+    prompt_class: str
+
+
+def plan(adapter: Any, prefs: Any, prompt: str, context: str = "") -> Plan:
+    """Split *adapter*'s context window between output and input for *prompt*."""
+    family = getattr(adapter, "token_family", "default")
+    window = adapter.context_window(prefs)
+    prompt_class = classify(prompt)
+    max_tokens = min(MAX_TOKENS_BY_CLASS[prompt_class], window // 4)
+    prompt_tokens = count_tokens(prompt, family) + OVERHEAD_TOKENS
+    context = compact_context(context, window - max_tokens - prompt_tokens, family) if context else ""
+    return Plan(context, max_tokens, prompt_tokens + count_tokens(context, family), prompt_class)
+
+
+_LOCK = threading.Lock()
+_USAGE: Deque[Dict[str, Any]] = deque(maxlen=USAGE_LOG_SIZE)
+
+
+def log_usage(provider: str, tokens_in: int, tokens_out: int, max_tokens: int,
+              prompt_class: str, latency: float, cost: float, reported: bool) -> None:
+    """Remember and log the token usage of one request."""
+    entry = {
+        "provider": provider, "tokens_in": tokens_in, "tokens_out": tokens_out,
+        "max_tokens": max_tokens, "class": prompt_class, "latency": latency,
+        "cost": cost, "reported": reported,
+    }
+    with _LOCK:
+        _USAGE.append(entry)
+    source = "reported" if reported else "estimated"
+    logger.info(f"{provider}: {tokens_in} tokens in / {tokens_out} out ({source}), "
+                f"max_tokens {max_tokens} ({prompt_class}), {latency:.2f}s, ${cost:.4f}", **entry)
+
+
+def recent_usage(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    with _LOCK:
+        entries = list(_USAGE)
+    return entries[-limit:] if limit else entries
@@ -0,0 +1,155 @@
+"""Timing spans for the prompt, transfer and render paths.
+
+Code under measurement wraps each stage in :func:`span`::
+
+    with tracing.span("prompt.network", provider=name):
+        resp = session.post(...)
+
+Durations measured elsewhere (for example the script and depsgraph times
+returned by :func:`.execution.run`) are added with :func:`record`.
+Finished spans are kept twice: as a bounded list of events that
+:func:`export_chrome` writes in Chrome's trace event format (open it in
+``chrome://tracing`` or Perfetto), and as rolling per-name windows that
+:func:`summary` turns into percentiles for the Performance panel.
+
+Tracing is off by default. While it is off, :func:`span` returns a shared
+no-op context manager and :func:`record` returns at once, so instrumented
+code pays one flag check per call.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .utils import current_job
+
+MAX_EVENTS = 5000
+WINDOW = 500  # durations kept per span name for percentiles
+PERCENTILES = (50, 95, 99)
+
+_enabled = False
+_LOCK = threading.Lock()
+# (name, start, duration, thread id, thread name, args); times in perf_counter seconds.
+_EVENTS: Deque[Tuple[str, float, float, int, str, Dict[str, Any]]] = deque(maxlen=MAX_EVENTS)
+_DURATIONS: Dict[str, Deque[float]] = {}
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(value: bool) -> None:
+    global _enabled  # noqa: PLW0603
+    _enabled = bool(value)
+
+
+def record(name: str, duration: float, start: Optional[float] = None, **args: Any) -> None:
+    """Add a finished span of *duration* seconds (ending now unless *start* is given)."""
+    if not _enabled:
+        return
+    if start is None:
+        start = time.perf_counter() - duration
+    job = current_job()
+    if job is not None:
+        args["job"] = job.id
+    thread = threading.current_thread()
+    with _LOCK:
+        _EVENTS.append((name, start, duration, thread.ident or 0, thread.name, args))
+        window = _DURATIONS.get(name)
+        if window is None:
+            window = _DURATIONS[name] = deque(maxlen=WINDOW)
+        window.append(duration)
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: Dict[str, Any]) -> None:
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        record(self.name, time.perf_counter() - self.start, self.start, **self.args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NULL = _NullSpan()
+
+
+def span(name: str, **args: Any):
+    """Context manager timing the enclosed block as *name*; *args* are kept with it."""
+    if not _enabled:
+        return _NULL
+    return _Span(name, args)
+
+
+# -----------------------------------------------------------------------------
+# Reports
+# -----------------------------------------------------------------------------
+
+def _percentile(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+
+
+def summary() -> Dict[str, Dict[str, float]]:
+    """``{name: {count, mean, p50, p95, p99}}`` over each name's recent spans, in seconds."""
+    with _LOCK:
+        windows = {name: sorted(values) for name, values in _DURATIONS.items() if values}
+    result = {}
+    for name, values in sorted(windows.items()):
+        row = {"count": len(values), "mean": sum(values) / len(values)}
+        for q in PERCENTILES:
+            row[f"p{q}"] = _percentile(values, q)
+        result[name] = row
+    return result
+
+
+def chrome_trace() -> Dict[str, Any]:
+    """The recorded spans as a Chrome trace event document."""
+    with _LOCK:
+        events = list(_EVENTS)
+    pid = os.getpid()
+    trace: List[Dict[str, Any]] = []
+    threads = {}
+    for name, start, duration, tid, thread_name, args in events:
+        threads[tid] = thread_name
+        trace.append({"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                      "ts": round(start * 1e6, 3), "dur": round(duration * 1e6, 3), "args": args})
+    for tid, thread_name in threads.items():
+        trace.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                      "args": {"name": thread_name}})
+    return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+
+def export_chrome(path: Path) -> int:
+    """Write :func:`chrome_trace` to *path*; return the number of spans written."""
+    document = chrome_trace()
+    Path(path).write_text(json.dumps(document, default=str), encoding="utf-8")
+    return sum(1 for event in document["traceEvents"] if event["ph"] == "X")
+
+
+def reset() -> None:
+    with _LOCK:
+        _EVENTS.clear()
+        _DURATIONS.clear()
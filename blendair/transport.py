@@ -0,0 +1,234 @@
+"""Pooled HTTP transport shared by the prompt and preference helpers.
+
+Every provider gets its own keep-alive ``requests.Session`` so repeated
+prompts reuse the TCP/TLS connection instead of paying a fresh handshake.
+Sessions retry 429/5xx answers with exponential backoff and count how many
+connections were opened versus reused. Non-idempotent requests (POST,
+PATCH) are only re-sent when the server cannot have acted on them: failed
+connects and 429/503 answers, never read timeouts, since re-sending a
+completion request that timed out pays for it twice.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_RETRIES = 2
+DEFAULT_TIMEOUT = 30.0
+CONNECT_TIMEOUT_CAP = 10.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Statuses meaning the request was refused before any work was done.
+UNPROCESSED_STATUSES = (429, 503)
+IDEMPOTENT_METHODS = frozenset({"GET", "PUT", "DELETE", "HEAD", "OPTIONS"})
+BACKOFF_FACTOR = 0.5
+
+
+# -----------------------------------------------------------------------------
+# Connection counters
+# -----------------------------------------------------------------------------
+
+class PoolStats:
+    """Thread-safe counters for one provider's connection pool."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.checkouts = 0
+
+    def record_open(self) -> None:
+        with self._lock:
+            self.opened += 1
+
+    def record_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    @property
+    def reused(self) -> int:
+        return max(0, self.checkouts - self.opened)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"opened": self.opened, "reused": self.reused}
+
+
+def _counting_pool(base: type, stats: PoolStats) -> type:
+    """Return a urllib3 pool class that reports opens/checkouts to *stats*."""
+
+    class _CountingPool(base):  # type: ignore[misc, valid-type]
+        def _new_conn(self):
+            stats.record_open()
+            return super()._new_conn()
+
+        def _get_conn(self, *args, **kwargs):
+            stats.record_checkout()
+            return super()._get_conn(*args, **kwargs)
+
+    return _CountingPool
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools feed a :class:`PoolStats` instance."""
+
+    def __init__(self, stats: PoolStats, **kwargs: Any) -> None:
+        self._stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self._stats),
+            "https": _counting_pool(HTTPSConnectionPool, self._stats),
+        }
+
+
+class _Retry(Retry):
+    """Retry that also re-sends non-idempotent requests answered 429 or 503.
+
+    Only :data:`IDEMPOTENT_METHODS` are in ``allowed_methods``, so urllib3
+    never retries a POST after a read error; connect errors are retried for
+    every method because nothing was sent.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method.upper() in IDEMPOTENT_METHODS:
+            return super().is_retry(method, status_code, has_retry_after)
+        return status_code in UNPROCESSED_STATUSES and status_code in (self.status_forcelist or ())
+
+
+class _PooledSession(requests.Session):
+    """Session that, once replaced, closes only after its in-flight requests finish."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._state_lock = threading.Lock()
+        self._active = 0
+        self._retired = False
+
+    def request(self, *args: Any, **kwargs: Any) -> requests.Response:
+        with self._state_lock:
+            self._active += 1
+        try:
+            return super().request(*args, **kwargs)
+        finally:
+            with self._state_lock:
+                self._active -= 1
+                close = self._retired and not self._active
+            if close:
+                self.close()
+
+    def retire(self) -> None:
+        """Close now if idle, otherwise when the last running request returns."""
+        with self._state_lock:
+            self._retired = True
+            close = not self._active
+        if close:
+            self.close()
+
+
+# -----------------------------------------------------------------------------
+# Session registry
+# -----------------------------------------------------------------------------
+
+_LOCK = threading.Lock()
+_SESSIONS: Dict[str, Tuple[Tuple[int, int], _PooledSession]] = {}
+_STATS: Dict[str, PoolStats] = {}
+
+
+def _build_session(stats: PoolStats, pool_size: int, retries: int) -> _PooledSession:
+    retry = _Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=IDEMPOTENT_METHODS,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = _CountingAdapter(
+        stats,
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+    )
+    session = _PooledSession()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(name: str, pool_size: int = DEFAULT_POOL_SIZE,
+                retries: int = DEFAULT_RETRIES) -> requests.Session:
+    """Return the shared keep-alive session for *name* (usually a provider id).
+
+    The session is rebuilt if the pool size or retry count changed since it
+    was created, so preference edits take effect without a restart. The old
+    session is closed once requests other threads are running on it return.
+    """
+    config = (max(1, int(pool_size)), max(0, int(retries)))
+    with _LOCK:
+        cached = _SESSIONS.get(name)
+        if cached and cached[0] == config:
+            return cached[1]
+        stats = _STATS.setdefault(name, PoolStats())
+        session = _build_session(stats, *config)
+        _SESSIONS[name] = (config, session)
+    if cached:
+        cached[1].retire()
+    return session
+
+
+def session_for(prefs: Any, name: str) -> requests.Session:
+    """Return the session for *name* configured from add-on preferences."""
+    return get_session(
+        name,
+        pool_size=getattr(prefs, "http_pool_size", DEFAULT_POOL_SIZE),
+        retries=getattr(prefs, "http_max_retries", DEFAULT_RETRIES),
+    )
+
+
+def request_timeout(prefs: Any) -> Tuple[float, float]:
+    """Return the ``(connect, read)`` timeout tuple derived from preferences."""
+    read = float(getattr(prefs, "local_llm_timeout", DEFAULT_TIMEOUT) or DEFAULT_TIMEOUT)
+    return (min(CONNECT_TIMEOUT_CAP, read), read)
+
+
+_SLOTS: Dict[str, Tuple[int, threading.BoundedSemaphore]] = {}
+
+
+def provider_slot(name: str, limit: int) -> threading.BoundedSemaphore:
+    """Return the semaphore bounding concurrent requests to provider *name*.
+
+    All callers share one semaphore per provider, so concurrent batches
+    together never exceed *limit* in-flight requests.
+    """
+    limit = max(1, int(limit))
+    with _LOCK:
+        slot = _SLOTS.get(name)
+        if slot is None or slot[0] != limit:
+            slot = (limit, threading.BoundedSemaphore(limit))
+            _SLOTS[name] = slot
+        return slot[1]
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """Return ``{name: {"opened": n, "reused": m}}`` for every session."""
+    with _LOCK:
+        return {name: stats.as_dict() for name, stats in _STATS.items()}
+
+
+def close_all() -> None:
+    """Close every pooled session (called on add-on unregister)."""
+    with _LOCK:
+        sessions = [s for _, s in _SESSIONS.values()]
+        _SESSIONS.clear()
+    for session in sessions:
+        session.close()
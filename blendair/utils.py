@@ -1,115 +1,264 @@
-"""BlendAIr utility helpers.
-
-Works in Blender (real `bpy`) and in CI/tests (no `bpy`).
-"""
-
-from __future__ import annotations
-
-import os
-import threading
-import traceback
-from functools import wraps
-from pathlib import Path
-from queue import Queue
-from types import SimpleNamespace
-from typing import Any, Optional, Final
-
-# -----------------------------------------------------------------------------
-# bpy import setup
-# -----------------------------------------------------------------------------
-try:
-    import bpy  # type: ignore
-    IN_BLENDER: Final = True
-    # Ensure required attributes exist for tests
-    if not hasattr(bpy, "app"):
-        bpy.app = SimpleNamespace(tempdir="/tmp")  # type: ignore
-except ModuleNotFoundError:
-    bpy = SimpleNamespace(app=SimpleNamespace(tempdir="/tmp"))  # type: ignore
-    IN_BLENDER = False  # type: ignore
-
-# -----------------------------------------------------------------------------
-# Logging utilities
-# -----------------------------------------------------------------------------
-LOG_PATH = Path(getattr(bpy.app, "tempdir", ".")) / "blendair.log"
-
-def log_error(exc: BaseException) -> None:
-    """Log exception traceback to file and console."""
-    LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with LOG_PATH.open("a", encoding="utf-8") as fp:
-        fp.write("\n---\n")
-        traceback.print_exc(file=fp)
-    print(f"[BlendAIr] Error logged to {LOG_PATH}")
-
-# -----------------------------------------------------------------------------
-# Decorators
-# -----------------------------------------------------------------------------
-
-def safe_exec(func):  # noqa: D401
-    """Decorator wrapping Blender operator execute methods."""
-    @wraps(func)
-    def wrapper(self, context, *args, **kwargs):  # type: ignore[override]
-        try:
-            return func(self, context, *args, **kwargs)
-        except Exception as exc:  # noqa: BLE001
-            log_error(exc)
-            if IN_BLENDER and hasattr(self, "report"):
-                self.report({"ERROR"}, f"BlendAIr: {exc}")
-            return {"CANCELLED"}
-    return wrapper
-
-# -----------------------------------------------------------------------------
-# Job queue
-# -----------------------------------------------------------------------------
-JOB_QUEUE: Queue[dict[str, Any]] = Queue()
-
-def enqueue_job(job: dict[str, Any]) -> None:
-    """Add a job dict to the global queue."""
-    JOB_QUEUE.put(job)
-
-# -----------------------------------------------------------------------------
-# Supabase helper (optional)
-# -----------------------------------------------------------------------------
-_SUPABASE_CLIENT: Optional[Any] = None
-
-def get_supabase():
-    """Return Supabase client or None if env or dependency missing."""
-    global _SUPABASE_CLIENT  # noqa: PLW0603
-    if _SUPABASE_CLIENT is not None:
-        return _SUPABASE_CLIENT
-
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_SERVICE_KEY")
-    if not (url and key):
-        return None
-    try:
-        from supabase import create_client  # lazy import
-        _SUPABASE_CLIENT = create_client(url, key)
-        return _SUPABASE_CLIENT
-    except Exception as exc:  # noqa: BLE001
-        print("[BlendAIr] Supabase client init failed:", exc)
-        return None
-
-# -----------------------------------------------------------------------------
-# Background thread stubs (threads disabled in CI)
-# -----------------------------------------------------------------------------
-_RUNNING_THREADS: list[threading.Thread] = []
-_STOP_EVENT = threading.Event()
-
-def start_background_threads() -> None:
-    """Start background threads inside Blender only."""
-    if not IN_BLENDER or _RUNNING_THREADS:
-        return
-    # Example thread: Supabase poller (define your real function elsewhere)
-    # t = threading.Thread(target=_supabase_poller, daemon=True, name="BlendAIrPoller")
-    # t.start()
-    # _RUNNING_THREADS.append(t)
-
-
-def stop_background_threads() -> None:
-    """Stop and join background threads."""
-    _STOP_EVENT.set()
-    for t in _RUNNING_THREADS:
-        t.join(timeout=2)
-    _RUNNING_THREADS.clear()
-    _STOP_EVENT.clear()
-
+"""BlendAIr utility helpers.
+
+Works in Blender (real `bpy`) and in CI/tests (no `bpy`).
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from pathlib import Path
+from queue import Empty, PriorityQueue
+from types import SimpleNamespace
+from typing import Any, Callable, Optional, Final
+
+# -----------------------------------------------------------------------------
+# bpy import setup
+# -----------------------------------------------------------------------------
+try:
+    import bpy  # type: ignore
+    IN_BLENDER: Final = True
+    # Ensure required attributes exist for tests
+    if not hasattr(bpy, "app"):
+        bpy.app = SimpleNamespace(tempdir="/tmp")  # type: ignore
+except ModuleNotFoundError:
+    bpy = SimpleNamespace(app=SimpleNamespace(tempdir="/tmp"))  # type: ignore
+    IN_BLENDER = False  # type: ignore
+
+# -----------------------------------------------------------------------------
+# Logging utilities
+# -----------------------------------------------------------------------------
+LOG_PATH = Path(getattr(bpy.app, "tempdir", ".")) / "blendair.log"
+
+def log_error(exc: BaseException) -> None:
+    """Queue *exc* and its traceback for the background log writer."""
+    from . import logger
+    logger.error(f"{type(exc).__name__}: {exc}", exc)
+
+# -----------------------------------------------------------------------------
+# Decorators
+# -----------------------------------------------------------------------------
+
+def safe_exec(func):  # noqa: D401
+    """Decorator wrapping Blender operator execute methods."""
+    @wraps(func)
+    def wrapper(self, context, *args, **kwargs):  # type: ignore[override]
+        try:
+            return func(self, context, *args, **kwargs)
+        except Exception as exc:  # noqa: BLE001
+            log_error(exc)
+            if IN_BLENDER and hasattr(self, "report"):
+                self.report({"ERROR"}, f"BlendAIr: {exc}")
+            return {"CANCELLED"}
+    return wrapper
+
+# -----------------------------------------------------------------------------
+# Job queue
+# -----------------------------------------------------------------------------
+# Lower numbers run first: an interactive prompt jumps ahead of queued
+# transfers, which in turn jump ahead of renders.
+JOB_PRIORITIES: Final = {"prompt": 0, "upload": 10, "download": 10, "render": 20, "default": 30}
+DEFAULT_WORKERS: Final = 2
+_JOB_HISTORY: Final = 100
+
+
+class Job:
+    """Status object for one queued unit of background work.
+
+    ``on_done(job)`` is invoked on Blender's main thread once the job has
+    finished, failed or been cancelled.
+    """
+
+    def __init__(self, func: Callable[..., Any], args: tuple = (), kwargs: Optional[dict] = None,
+                 kind: str = "default", priority: Optional[int] = None,
+                 on_done: Optional[Callable[["Job"], None]] = None, label: str = "") -> None:
+        self.id = next(_JOB_IDS)
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.kind = kind
+        self.priority = JOB_PRIORITIES.get(kind, JOB_PRIORITIES["default"]) if priority is None else priority
+        self.on_done = on_done
+        self.label = label or getattr(func, "__name__", "job")
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.submitted = time.perf_counter()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._cancel = threading.Event()
+
+    def cancel(self) -> None:
+        """Request cancellation; queued jobs are skipped, running jobs may poll."""
+        self._cancel.set()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+
+_JOB_IDS = itertools.count(1)
+JOB_QUEUE: PriorityQueue[tuple[int, int, Job]] = PriorityQueue()
+JOBS: "OrderedDict[int, Job]" = OrderedDict()
+_JOBS_LOCK = threading.Lock()
+_CURRENT = threading.local()
+
+
+def enqueue_job(job: dict[str, Any] | Job) -> Job:
+    """Add a job to the global queue and return its status object.
+
+    Accepts either a :class:`Job` or a dict with ``func`` and optional
+    ``args``, ``kwargs``, ``kind``, ``priority``, ``on_done`` and ``label``.
+    """
+    if not isinstance(job, Job):
+        job = Job(**job)
+    with _JOBS_LOCK:
+        JOBS[job.id] = job
+        excess = len(JOBS) - _JOB_HISTORY
+        if excess > 0:
+            # Evict the oldest finished jobs; unfinished ones stay tracked.
+            for old_id in [i for i, j in JOBS.items() if j.done][:excess]:
+                del JOBS[old_id]
+    JOB_QUEUE.put((job.priority, job.id, job))
+    return job
+
+
+def get_job(job_id: int) -> Optional[Job]:
+    with _JOBS_LOCK:
+        return JOBS.get(job_id)
+
+
+def cancel_job(job_id: int) -> bool:
+    """Cancel job *job_id*; return False if it is unknown or already finished."""
+    job = get_job(job_id)
+    if job is None or job.done:
+        return False
+    job.cancel()
+    return True
+
+
+def current_job() -> Optional[Job]:
+    """Return the job running on the calling worker thread, if any."""
+    return getattr(_CURRENT, "job", None)
+
+
+def _finish(job: Job, status: str) -> None:
+    job.status = status
+    job.finished = time.perf_counter()
+    if job.on_done is None:
+        return
+    from . import dispatch  # lazy: dispatch needs bpy
+    dispatch.submit(lambda: job.on_done(job), label=f"{job.label} (done)")
+
+
+def _run_job(job: Job) -> None:
+    if job.cancel_requested:
+        _finish(job, "cancelled")
+        return
+    job.status = "running"
+    job.started = time.perf_counter()
+    _CURRENT.job = job
+    try:
+        job.result = job.func(*job.args, **job.kwargs)
+        _finish(job, "cancelled" if job.cancel_requested else "done")
+    except Exception as exc:  # noqa: BLE001
+        job.error = exc
+        log_error(exc)
+        _finish(job, "failed")
+    finally:
+        _CURRENT.job = None
+
+
+def _worker_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            _, _, job = JOB_QUEUE.get(timeout=0.1)
+        except Empty:
+            continue
+        try:
+            _run_job(job)
+        finally:
+            JOB_QUEUE.task_done()
+
+
+def job_stats() -> dict[str, int]:
+    """Return counts of jobs per status plus the current queue depth."""
+    with _JOBS_LOCK:
+        jobs = list(JOBS.values())
+    counts = {"queued": 0, "running": 0, "done": 0, "failed": 0, "cancelled": 0}
+    for job in jobs:
+        counts[job.status] += 1
+    counts["depth"] = JOB_QUEUE.qsize()
+    counts["workers"] = len(_RUNNING_THREADS)
+    return counts
+
+# -----------------------------------------------------------------------------
+# Supabase helper (optional)
+# -----------------------------------------------------------------------------
+_SUPABASE_CLIENT: Optional[Any] = None
+
+def get_supabase():
+    """Return Supabase client or None if env or dependency missing."""
+    global _SUPABASE_CLIENT  # noqa: PLW0603
+    if _SUPABASE_CLIENT is not None:
+        return _SUPABASE_CLIENT
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_KEY")
+    if not (url and key):
+        return None
+    from . import deps
+    if deps.missing_for("supabase"):
+        return None
+    try:
+        from supabase import create_client  # lazy import
+        _SUPABASE_CLIENT = create_client(url, key)
+        return _SUPABASE_CLIENT
+    except Exception as exc:  # noqa: BLE001
+        from . import logger
+        logger.warning(f"Supabase client init failed: {exc}")
+        return None
+
+# -----------------------------------------------------------------------------
+# Background worker pool
+# -----------------------------------------------------------------------------
+_RUNNING_THREADS: list[threading.Thread] = []
+# Each pool gets its own stop event: a worker still busy when the pool is
+# stopped must not see a later restart clear its event and keep draining.
+_STOP_EVENT = threading.Event()
+
+def start_background_threads(num_workers: int = DEFAULT_WORKERS) -> None:
+    """Start the worker threads draining ``JOB_QUEUE`` (Blender/fake bpy only)."""
+    global _STOP_EVENT  # noqa: PLW0603
+    if not IN_BLENDER or _RUNNING_THREADS:
+        return
+    _STOP_EVENT = threading.Event()
+    for index in range(max(1, num_workers)):
+        t = threading.Thread(target=_worker_loop, args=(_STOP_EVENT,), daemon=True,
+                             name=f"BlendAIrWorker-{index}")
+        t.start()
+        _RUNNING_THREADS.append(t)
+
+
+def stop_background_threads() -> None:
+    """Stop and join background threads, cancelling jobs still queued."""
+    _STOP_EVENT.set()
+    for t in _RUNNING_THREADS:
+        t.join(timeout=2)
+    _RUNNING_THREADS.clear()
+    while True:
+        try:
+            _, _, job = JOB_QUEUE.get_nowait()
+        except Empty:
+            break
+        job.cancel()
+        _finish(job, "cancelled")
+        JOB_QUEUE.task_done()
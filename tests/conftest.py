@@ -13,6 +13,8 @@ collection.
 from types import ModuleType, SimpleNamespace
 import sys
 
+import pytest
+
 # -----------------------------------------------------------------------------
 # Helper factories
 # -----------------------------------------------------------------------------
@@ -99,3 +101,15 @@ def _install_fake_bpy():
 # -----------------------------------------------------------------------------
 
 _install_fake_bpy()
+
+
+@pytest.fixture(autouse=True)
+def _isolated_provider_stats(tmp_path, monkeypatch):
+    """Keep provider latency samples per test and out of the real cache dir."""
+    from blendair import provider_stats
+
+    monkeypatch.setattr(provider_stats, "STATS_PATH", tmp_path / "provider_stats.json")
+    monkeypatch.setattr(provider_stats, "_UNSAVED", 0)
+    provider_stats._STATS.clear()
+    yield
+    provider_stats._STATS.clear()
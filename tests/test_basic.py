@@ -6,6 +6,7 @@ def test_import():
 
 def test_fetch_script_mock(monkeypatch):
     from blendair import prompts
-    monkeypatch.setattr(prompts, 'get_pref', lambda: type('P', (), {'llm_endpoint': 'mock'})())
-    monkeypatch.setattr(prompts.requests, 'post', lambda *a, **kw: type('R', (), {'json': lambda self: {'script': 'print(123)'}, 'raise_for_status': lambda self: None})())
+    monkeypatch.setattr(prompts, 'get_pref', lambda: type('P', (), {'llm_provider': 'local', 'local_llm_endpoint': 'http://mock', 'cache_enabled': False})())
+    session = type('S', (), {'post': lambda self, *a, **kw: type('R', (), {'json': lambda self: {'script': 'print(123)'}, 'raise_for_status': lambda self: None})()})()
+    monkeypatch.setattr(prompts.transport, 'session_for', lambda prefs, name: session)
     assert prompts.fetch_script('hello') == 'print(123)'
@@ -0,0 +1,29 @@
+import threading
+import time
+
+from blendair import batch
+
+
+def test_parse_prompts_skips_blanks_and_comments():
+    assert batch.parse_prompts(['a', '', '# note', '  b  ']) == ['a', 'b']
+
+
+def test_fetch_all_bounds_concurrency_and_keeps_order():
+    lock = threading.Lock()
+    active = [0, 0]  # current, peak
+
+    def fetch(prompt):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.02 if prompt == 'p0' else 0.005)
+        with lock:
+            active[0] -= 1
+        return 'print(1)' if prompt != 'p3' else 'def ('
+
+    report = batch.fetch_all([f'p{i}' for i in range(6)], fetch, 'test-batch', concurrency=2)
+    assert [item.prompt for item in report.items] == [f'p{i}' for i in range(6)]
+    assert active[1] <= 2
+    assert report.items[3].code is None and 'Syntax error' in report.items[3].error
+    assert all(item.code is not None for i, item in enumerate(report.items) if i != 3)
+    assert report.throughput > 0
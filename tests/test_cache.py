@@ -0,0 +1,57 @@
+from blendair import cache, prompts
+
+
+def test_lru_eviction_and_stats(tmp_path):
+    store = cache.ResponseCache(tmp_path, max_bytes=10)
+    store.put('a', '12345')
+    store.put('b', '12345')
+    assert store.get('a') == '12345'
+    store.put('c', '12345')  # evicts 'b', the least recently used
+    assert store.get('b') is None
+    assert store.get('c') == '12345'
+    assert store.stats() == {'hits': 2, 'misses': 1, 'entries': 2, 'bytes': 10}
+
+
+def test_entries_survive_reopen_and_expire(tmp_path):
+    cache.ResponseCache(tmp_path).put('k', 'print(1)')
+    assert cache.ResponseCache(tmp_path).get('k') == 'print(1)'
+    expired = cache.ResponseCache(tmp_path, ttl=-1)
+    assert expired.get('k') is None
+    # The delete is committed: no open write transaction, and other connections see it.
+    assert not expired._db.in_transaction and expired.stats()['entries'] == 0
+    assert cache.ResponseCache(tmp_path).stats()['entries'] == 0
+
+
+def test_key_normalizes_whitespace():
+    assert cache.cache_key('openai', 'gpt-4o', 'add  a light ') == cache.cache_key('openai', 'gpt-4o', 'add a light')
+    assert cache.cache_key('openai', 'gpt-4o', 'x') != cache.cache_key('deepseek', 'gpt-4o', 'x')
+
+
+def test_fetch_script_uses_cache(monkeypatch, tmp_path):
+    class Pref:
+        llm_provider = 'openai'
+        openai_api_key = 'sk-test'
+        cache_dir = str(tmp_path)
+    monkeypatch.setattr(prompts, 'get_pref', lambda: Pref())
+    calls = []
+
+    class MockResp:
+        def raise_for_status(self):
+            pass
+        def json(self):
+            return {'choices': [{'message': {'content': 'print(1)'}}]}
+
+    class MockSession:
+        def post(self, *a, **kw):
+            calls.append(1)
+            return MockResp()
+    monkeypatch.setattr(prompts.transport, 'session_for', lambda prefs, name: MockSession())
+
+    try:
+        assert prompts.fetch_script('light rig') == 'print(1)'
+        assert prompts.fetch_script('light  rig') == 'print(1)'
+        assert len(calls) == 1
+        prompts.fetch_script('light rig', use_cache=False)
+        assert len(calls) == 2
+    finally:
+        cache.close_cache()
@@ -0,0 +1,165 @@
+from types import SimpleNamespace
+
+import bpy
+
+from blendair import delta
+
+
+class FakeCollection(list):
+    def foreach_get(self, attr, out):
+        flat = [v for item in self for v in (item if isinstance(item, tuple) else (item,))]
+        out[:] = type(out)(out.typecode, flat)
+
+
+class FakeMesh:
+    def __init__(self, coords):
+        self.vertices = FakeCollection(coords)
+        self.loops = FakeCollection([0, 1, 2])
+        self.polygons = FakeCollection([3])
+
+    def as_pointer(self):
+        return id(self)
+
+
+class FakeObject(dict):
+    type = 'MESH'
+    modifiers = ()
+    material_slots = ()
+
+    def __init__(self, name, mesh, x=0.0):
+        super().__init__()
+        self.name = name
+        self.data = mesh
+        self.matrix_world = [[1, 0, 0, x], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+
+
+TRIANGLE = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0)]
+
+
+def test_fingerprint_tracks_content_not_name():
+    mesh = FakeMesh(TRIANGLE)
+    a, b = FakeObject('A', mesh), FakeObject('B', mesh)
+    assert delta.fingerprint(a) == delta.fingerprint(b)
+    assert delta.fingerprint(a) != delta.fingerprint(FakeObject('A', mesh, x=1.0))
+    assert delta.fingerprint(a) != delta.fingerprint(FakeObject('A', FakeMesh(TRIANGLE[::-1])))
+
+
+def test_only_changed_objects_are_pending_and_pulled():
+    mesh = FakeMesh(TRIANGLE)
+    objects = [FakeObject('A', mesh), FakeObject('B', mesh, x=2.0)]
+    manifest = delta.scene_manifest(objects)
+    objects[0][delta.SENT_PROP] = manifest['A']
+    assert delta.pending_uploads(objects, manifest) == [objects[1]]
+
+    local = {'A': manifest['A'], 'B': 'old', 'C': 'gone'}
+    changed, removed = delta.diff(local, manifest)
+    assert changed == ['B'] and removed == ['C']
+    assert delta.chunk_key('proj', 'abc') == 'proj/objects/abc.glb'
+
+
+class FakeBuckets:
+    """In-memory storage backend keyed by (bucket, key)."""
+
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.objects = {}
+
+    def list_objects(self, prefs, bucket=delta.storage.DOWNLOAD_BUCKET, prefix="", session=None):
+        prefix = prefix.rstrip('/') + '/'
+        return [key[len(prefix):] for b, key in self.objects
+                if b == bucket and key.startswith(prefix) and '/' not in key[len(prefix):]]
+
+    def upload_file(self, prefs, path, key, bucket=delta.storage.UPLOAD_BUCKET, **kwargs):
+        with open(path, 'rb') as fp:
+            self.objects[(bucket, key)] = fp.read()
+
+    def fetch_cached(self, prefs, key, bucket=delta.storage.DOWNLOAD_BUCKET, **kwargs):
+        path = self.tmp_path / key.replace('/', '_')
+        path.write_bytes(self.objects[(bucket, key)])
+        return delta.storage.Download(str(path), path.stat().st_size, None, True)
+
+
+def test_delta_upload_is_found_by_delta_download(tmp_path, monkeypatch):
+    store = FakeBuckets(tmp_path)
+    for name in ('list_objects', 'upload_file', 'fetch_cached'):
+        monkeypatch.setattr(delta.storage, name, getattr(store, name))
+    monkeypatch.setattr(delta.bpy.app, 'tempdir', str(tmp_path), raising=False)
+    chunk = tmp_path / 'abc.glb'
+    chunk.write_bytes(b'glTF')
+
+    result = delta.upload(None, 'proj', {'Cube': 'abc'}, {'abc': str(chunk)})
+    assert result['uploaded'] == 1
+    remote = delta.fetch_manifest(None, 'proj')
+    assert remote == {'Cube': 'abc'}
+    paths = delta.download_chunks(None, 'proj', remote.values())
+    assert open(paths['abc'], 'rb').read() == b'glTF'
+    assert delta.upload(None, 'proj', {'Cube': 'abc'}, {'abc': str(chunk)})['skipped'] == 1
+
+
+class Selectable:
+    calls = 0
+
+    def __init__(self, name, selected=False):
+        self.name = name
+        self.selected = selected
+
+    def select_get(self):
+        return self.selected
+
+    def select_set(self, state):
+        Selectable.calls += 1
+        self.selected = state
+
+
+def test_export_selects_one_object_at_a_time_and_restores(tmp_path, monkeypatch):
+    objects = [Selectable(f'O{i}', selected=i < 2) for i in range(50)]
+    layer = SimpleNamespace(objects=type('ViewLayerObjects', (list,), {'active': objects[0]})(objects))
+    exported = []
+
+    def gltf(filepath, **_):
+        exported.append([obj.name for obj in objects if obj.selected])
+
+    monkeypatch.setattr(bpy, 'context', SimpleNamespace(view_layer=layer))
+    monkeypatch.setattr(bpy, 'ops', SimpleNamespace(export_scene=SimpleNamespace(gltf=gltf)))
+    Selectable.calls = 0
+    manifest = {obj.name: f'h{obj.name}' for obj in objects}
+    paths = delta.export_chunks(objects[10:], manifest, str(tmp_path))
+    assert len(paths) == 40 and exported[0] == ['O10'] and exported[-1] == ['O49']
+    assert Selectable.calls < 2 * len(objects) + 4
+    assert [obj.name for obj in objects if obj.selected] == ['O0', 'O1']
+    assert layer.objects.active is objects[0]
+
+
+
+def test_download_only_replaces_received_objects(monkeypatch):
+    def obj(name, **props):
+        o = FakeObject(name, FakeMesh(TRIANGLE))
+        o.update(props)
+        return o
+
+    sent, received = delta.SENT_PROP, delta.RECEIVED_PROP
+    objects = [obj('Mine', **{sent: 'h1'}), obj('Edited', **{sent: 'h2'}), obj('Unsynced'),
+               obj('Pulled', **{received: 'old'}), obj('Gone', **{received: 'h5'}),
+               obj('Dropped', **{sent: 'h6'})]
+    remote = {'Mine': 'h1', 'Edited': 'new', 'Unsynced': 'h3', 'Pulled': 'h4'}
+    changed, removed = delta.diff(delta.local_manifest(objects), remote, delta.local_only(objects))
+    assert changed == ['Pulled'] and removed == ['Gone']
+
+    class Objects(dict):
+        def remove(self, o, do_unlink=True):
+            del self[o.name]
+
+    scene = Objects((o.name, o) for o in objects)
+    imported = []
+
+    def gltf(filepath):
+        imported.append(filepath)
+        new = obj('Imported')
+        new.parent = None
+        monkeypatch.setattr(bpy.context, 'selected_objects', [new], raising=False)
+
+    monkeypatch.setattr(bpy, 'data', SimpleNamespace(objects=scene), raising=False)
+    monkeypatch.setattr(bpy, 'ops', SimpleNamespace(import_scene=SimpleNamespace(gltf=gltf)))
+    # 'Unsynced' clashes with a remote name even if asked to replace it.
+    assert delta.apply(remote, ['Pulled', 'Unsynced'], ['Gone', 'Dropped'], {'h4': 'p.glb', 'h3': 'u.glb'}) == 1
+    assert imported == ['p.glb'] and 'Unsynced' in scene and 'Dropped' in scene and 'Gone' not in scene
@@ -0,0 +1,63 @@
+import sys
+
+import pytest
+
+from blendair import deps
+
+
+def test_probe_uses_module_names_and_caches(tmp_path, monkeypatch):
+    monkeypatch.setattr(deps, 'CACHE_PATH', tmp_path / 'deps.json')
+    deps.invalidate()
+    probed = []
+    present = {'cv2', 'supabase'}
+    monkeypatch.setattr(deps.importlib.util, 'find_spec',
+                        lambda name: probed.append(name) or (object() if name in present else None))
+    monkeypatch.setattr(deps.metadata, 'distribution', lambda name: (_ for _ in ()).throw(
+        deps.metadata.PackageNotFoundError(name)))
+
+    assert deps.missing_packages() == ['blendluxcore', 'mediapipe']
+    assert 'cv2' in probed and 'opencv-python' not in probed
+    assert deps.missing_for('gestures') == ['mediapipe']
+
+    probed.clear()
+    deps._STATE.clear()  # a new session reads the on-disk cache instead of probing
+    assert deps.missing_packages() == ['blendluxcore', 'mediapipe']
+    assert probed == []
+    deps.invalidate()
+
+
+def test_single_pip_run_streams_output(monkeypatch, tmp_path):
+    monkeypatch.setattr(deps, 'CACHE_PATH', tmp_path / 'deps.json')
+    cmd = deps.pip_command(['supabase', 'opencv-python'], wheelhouse=str(tmp_path))
+    assert cmd[-2:] == ['supabase', 'opencv-python']
+    assert '--no-index' in cmd and cmd[cmd.index('--find-links') + 1] == str(tmp_path)
+
+    script = "print('Collecting supabase'); print(); print('Successfully installed supabase')"
+    monkeypatch.setattr(deps, 'pip_command', lambda packages, wheelhouse='': [sys.executable, '-c', script])
+    lines = []
+    assert deps.install(['supabase'], on_output=lines.append)[-1] == 'Successfully installed supabase'
+    assert lines == ['Collecting supabase', 'Successfully installed supabase']
+
+    monkeypatch.setattr(deps, 'pip_command', lambda packages, wheelhouse='': [
+        sys.executable, '-c', "print('ERROR: no matching distribution'); raise SystemExit(1)"])
+    with pytest.raises(deps.InstallError, match='no matching distribution'):
+        deps.install(['nothing'])
+
+
+def test_draw_reads_the_cached_result(monkeypatch, tmp_path):
+    monkeypatch.setattr(deps, 'CACHE_PATH', tmp_path / 'deps.json')
+    monkeypatch.setattr(deps, '_probe', lambda pkg: pkg != 'mediapipe')
+    deps.invalidate()
+    assert deps.missing_packages() == ['mediapipe']
+
+    monkeypatch.setattr(deps, '_environment_key', lambda: pytest.fail("draw must not re-check"))
+    assert deps.cached_missing() == ['mediapipe']
+    monkeypatch.undo()
+
+    # An install refreshes the cached result.
+    monkeypatch.setattr(deps, 'CACHE_PATH', tmp_path / 'deps.json')
+    monkeypatch.setattr(deps, '_probe', lambda pkg: True)
+    monkeypatch.setattr(deps, 'pip_command', lambda packages, wheelhouse='': [sys.executable, '-c', "print('ok')"])
+    deps.install(['mediapipe'])
+    assert deps.cached_missing() == []
+    deps.invalidate()
@@ -0,0 +1,28 @@
+import threading
+from types import SimpleNamespace
+
+from blendair import dispatch
+
+
+def test_jobs_run_in_order_on_drain():
+    order = []
+    threads = [threading.Thread(target=dispatch.submit, args=(lambda i=i: order.append(i),)) for i in range(3)]
+    for t in threads:
+        t.start()
+        t.join()
+    assert dispatch.stats()['depth'] == 3
+    assert dispatch.drain(budget=1.0) == 3
+    assert order == [0, 1, 2]
+    assert dispatch.stats()['depth'] == 0
+
+
+def test_submit_code_reports_errors_and_status():
+    scene = SimpleNamespace(blendair_status='')
+    done = []
+    dispatch.submit_code(compile('1 / 0', '<test>', 'exec'), on_done=done.append)
+    dispatch.set_status(scene, 'first')
+    dispatch.set_status(scene, 'latest')
+    dispatch.drain()
+    assert isinstance(done[0].error, ZeroDivisionError)
+    assert done[0].wait_time >= 0 and done[0].exec_time >= 0
+    assert scene.blendair_status == 'latest'
@@ -0,0 +1,25 @@
+import pytest
+
+from blendair import execution, scene_context
+
+
+def test_run_times_script_and_passes_namespace():
+    code = compile("result.append(helper + 1)", "<test>", "exec")
+    result = []
+    timing = execution.run(code, {"helper": 1, "result": result}, "add")
+    assert result == [2]
+    assert timing.script >= 0 and timing.depsgraph >= 0
+
+
+def test_failure_reraises_with_rollback_flag():
+    code = compile("raise ValueError('boom')", "<test>", "exec")
+    with pytest.raises(ValueError, match="boom") as info:
+        execution.run(code, label="bad")
+    assert info.value.rolled_back is False  # no undo system outside Blender
+
+
+def test_missed_depsgraph_updates_drop_scene_cache():
+    scene_context._CONTEXT.scene_name = 'Scene'
+    with scene_context.paused():
+        scene_context._on_depsgraph_update(None, None)
+    assert scene_context._CONTEXT.scene_name is None
@@ -0,0 +1,21 @@
+from blendair import formats
+
+
+def test_negotiation_prefers_requested_then_binary():
+    available = ['model.obj', 'model.obj.gz', 'notes.txt']
+    assert formats.negotiate(available, preferred='obj') == 'model.obj'
+    assert formats.negotiate(available, preferred='glb') == 'model.obj.gz'
+    assert formats.negotiate(['model.glb', 'model.obj'], preferred='obj_gz') == 'model.glb'
+    assert formats.negotiate(['other.obj']) is None
+
+
+def test_suffix_lookup_and_gzip_roundtrip(tmp_path):
+    assert formats.from_filename('a/b/MODEL.OBJ.GZ').name == 'obj_gz'
+    assert formats.from_filename('model.obj').name == 'obj'
+    src = tmp_path / 'model.obj'
+    text = b'v 0 0 0\n' * 10000
+    src.write_bytes(text)
+    packed = formats.compress(str(src), str(tmp_path / 'model.obj.gz'))
+    assert not src.exists()
+    assert (tmp_path / 'model.obj.gz').stat().st_size < len(text) // 10
+    assert open(formats.decompress(packed, str(tmp_path / 'out.obj')), 'rb').read() == text
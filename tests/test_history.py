@@ -0,0 +1,115 @@
+import re
+from types import SimpleNamespace
+
+from blendair import history
+
+PREFS = SimpleNamespace(supabase_url='https://proj.supabase.co', supabase_key='key')
+_KEYSET = re.compile(r'\(created_at\.(gt|lt)\."(.*?)",and\(created_at\.eq\."(.*?)",id\.(?:gt|lt)\."(.*?)"\)\)')
+
+
+class FakeRest:
+    """Just enough of PostgREST for the history table."""
+
+    def __init__(self, rows=()):
+        self.rows = {row['id']: dict(row) for row in rows}
+        self.gets = 0
+
+    def post(self, url, json, **kwargs):
+        for row in json:
+            self.rows[row['id']] = dict(row)
+        return SimpleNamespace(raise_for_status=lambda: None)
+
+    def delete(self, url, params, **kwargs):
+        self.rows.pop(params['id'][3:], None)
+        return SimpleNamespace(raise_for_status=lambda: None)
+
+    def get(self, url, params, **kwargs):
+        self.gets += 1
+        rows = sorted(self.rows.values(), key=lambda r: (r['created_at'], r['id']),
+                      reverse=params['order'].startswith('created_at.desc'))
+        if 'or' in params:
+            op, created_at, _, entry_id = _KEYSET.fullmatch(params['or']).groups()
+            past = (lambda k: k > (created_at, entry_id)) if op == 'gt' else (lambda k: k < (created_at, entry_id))
+            rows = [r for r in rows if past((r['created_at'], r['id']))]
+        rows = rows[:int(params['limit'])]
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: [dict(r) for r in rows])
+
+
+def _remote_rows(prefix, dates):
+    return [{'id': f'{prefix}{i}', 'prompt': f'{prefix} {i}', 'response': '', 'created_at': date}
+            for i, date in enumerate(dates)]
+
+
+def test_search_and_lookup(tmp_path):
+    store = history.HistoryStore(tmp_path / 'h.sqlite3')
+    cube = store.add('add a red cube', 'bpy.ops.mesh.primitive_cube_add()')
+    store.add('add a sphere', 'bpy.ops.mesh.primitive_uv_sphere_add()')
+    assert store.get(cube['id'])['prompt'] == 'add a red cube'
+    assert [e['id'] for e in store.search('red cu')] == [cube['id']]
+    assert len(store.search('add')) == 2
+    assert store.search('red sphere') == []
+
+
+def test_views_invalidate_on_write_and_persist(tmp_path):
+    path = tmp_path / 'h.sqlite3'
+    store = history.HistoryStore(path)
+    entry = store.add('add a light', 'x = 1')
+    assert store.entries() is store.entries()  # cached until the next write
+    store.set_favorite(entry['id'], True)
+    assert store.entries()[0]['favorite'] is True
+    store.delete(entry['id'])
+    assert store.entries() == [] and store.search('light') == []
+    assert store.tombstones() == [entry['id']]
+    assert history.HistoryStore(path).get(entry['id']) is None
+
+
+def test_merge_remote_skips_deleted_rows(tmp_path):
+    store = history.HistoryStore(tmp_path / 'h.sqlite3')
+    gone = store.add('old', 'x = 1')
+    store.delete(gone['id'])
+    rows = [{'id': gone['id'], 'prompt': 'old', 'created_at': '2024'},
+            {'id': 'r1', 'prompt': 'remote cube', 'response': '', 'created_at': '2025'}]
+    assert store.merge_remote(rows) == 1
+    assert store.search('remote')[0]['id'] == 'r1'
+    assert store.unsynced() == []
+
+
+def test_cursor_pages_are_stable_across_inserts(tmp_path):
+    store = history.HistoryStore(tmp_path / 'h.sqlite3')
+    for i in range(5):
+        store.merge_remote([{'id': f'e{i}', 'prompt': f'p{i}', 'created_at': f'2025-01-0{i + 1}'}])
+    first, cursor = store.page(limit=2)
+    assert [e['id'] for e in first] == ['e4', 'e3']
+    store.add('newest', 'x = 1')  # must not shift the next page
+    second, cursor = store.page(cursor=cursor, limit=2)
+    assert [e['id'] for e in second] == ['e2', 'e1']
+    last, cursor = store.page(cursor=cursor, limit=2)
+    assert [e['id'] for e in last] == ['e0'] and cursor is None
+
+
+def test_sync_pulls_every_newer_row_despite_local_pushes(tmp_path, monkeypatch):
+    server = FakeRest(_remote_rows('old', ['2025-01-01', '2025-01-02']))
+    from blendair import transport
+    monkeypatch.setattr(transport, 'session_for', lambda prefs, name: server)
+    store = history.HistoryStore(tmp_path / 'h.sqlite3')
+    assert history.sync(store, PREFS, limit=2) == 2
+
+    # Rows another machine added, then a local row pushed with a later timestamp.
+    server.post(None, _remote_rows('new', ['2025-02-01', '2025-02-02', '2025-02-03', '2025-02-04', '2025-02-05']))
+    store.add('local prompt', 'x = 1')
+    history.sync(store, PREFS, limit=2)
+    assert {f'new{i}' for i in range(5)} <= set(e['id'] for e in store.entries())
+    assert history.sync(store, PREFS, limit=2) == 0
+
+
+def test_older_pages_keep_rows_sharing_a_timestamp(tmp_path, monkeypatch):
+    # Four rows share the timestamp that falls on the page boundary.
+    rows = _remote_rows('a', ['2025-01-01', '2025-01-02', '2025-01-02', '2025-01-02', '2025-01-02', '2025-01-03'])
+    server = FakeRest(rows)
+    from blendair import transport
+    monkeypatch.setattr(transport, 'session_for', lambda prefs, name: server)
+    store = history.HistoryStore(tmp_path / 'h.sqlite3')
+    assert history.sync(store, PREFS, limit=2) == 2
+    while history.fetch_older(store, PREFS, limit=2):
+        pass
+    assert sorted(e['id'] for e in store.entries()) == sorted(r['id'] for r in rows)
@@ -0,0 +1,83 @@
+import threading
+import time
+
+from blendair import dispatch, utils
+
+
+def _wait(job, timeout=2.0):
+    deadline = time.time() + timeout
+    while not job.done and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.done
+
+
+def test_priorities_and_main_thread_results():
+    order = []
+    render = utils.enqueue_job({"func": order.append, "args": ("render",), "kind": "render"})
+    prompt = utils.enqueue_job({"func": order.append, "args": ("prompt",), "kind": "prompt"})
+    done = []
+    upload = utils.enqueue_job({"func": lambda: order.append("upload") or 42, "kind": "upload",
+                                "on_done": done.append})
+    utils.start_background_threads(1)
+    try:
+        for job in (render, prompt, upload):
+            _wait(job)
+        assert order == ["prompt", "upload", "render"]
+        assert done == []  # callbacks wait for the main thread
+        dispatch.drain(budget=1.0)
+        assert done == [upload] and upload.result == 42
+    finally:
+        utils.stop_background_threads()
+
+
+def test_cancel_and_failure_status():
+    cancelled = utils.enqueue_job({"func": lambda: None})
+    assert utils.cancel_job(cancelled.id)
+    failed = utils.enqueue_job({"func": lambda: 1 / 0})
+    utils.start_background_threads(1)
+    try:
+        _wait(cancelled)
+        _wait(failed)
+    finally:
+        utils.stop_background_threads()
+    assert cancelled.status == "cancelled"
+    assert failed.status == "failed" and isinstance(failed.error, ZeroDivisionError)
+
+
+def test_stop_cancels_pending_jobs():
+    job = utils.enqueue_job({"func": lambda: None})
+    utils.stop_background_threads()
+    assert job.status == "cancelled"
+    assert utils.JOB_QUEUE.empty()
+
+
+def test_worker_busy_at_stop_exits_after_restart():
+    release = threading.Event()
+    slow = utils.enqueue_job({"func": release.wait, "args": (5.0,)})
+    utils.start_background_threads(1)
+    try:
+        while slow.status == "queued":
+            time.sleep(0.01)
+        old = list(utils._RUNNING_THREADS)
+        utils.stop_background_threads()  # the busy worker outlives the join timeout
+        utils.start_background_threads(1)
+        release.set()
+        old[0].join(timeout=2)
+        assert not old[0].is_alive()
+        assert utils.job_stats()["workers"] == 1
+    finally:
+        release.set()
+        utils.stop_background_threads()
+
+
+def test_history_evicts_finished_jobs_past_an_unfinished_one(monkeypatch):
+    monkeypatch.setattr(utils, "_JOB_HISTORY", 3)
+    monkeypatch.setattr(utils, "JOBS", utils.OrderedDict())
+    pending = utils.enqueue_job({"func": lambda: None})
+    finished = []
+    for _ in range(4):
+        job = utils.enqueue_job({"func": lambda: None})
+        job.status = "done"
+        finished.append(job)
+    assert list(utils.JOBS) == [pending.id, finished[2].id, finished[3].id]
+    utils.stop_background_threads()
@@ -0,0 +1,38 @@
+import json
+
+from blendair import logger, utils
+
+
+def test_ring_buffer_keeps_fields_and_job_id():
+    logger.info("request done", provider="openai", latency=0.25)
+    event = logger.recent(1)[0]
+    assert event['msg'] == "request done"
+    assert event['provider'] == "openai" and event['latency'] == 0.25
+
+    job = utils.Job(lambda: logger.info("inside job"))
+    utils._run_job(job)
+    assert logger.recent(1)[0]['job'] == job.id
+
+    logger.debug("below the default level")
+    assert logger.recent(1)[0]['msg'] == "inside job"
+
+
+def test_writer_thread_writes_json_lines_and_rotates(tmp_path):
+    path = tmp_path / "blendair.log"
+    logger.start(path, level="DEBUG", max_bytes=400, backups=2, console=False)
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError as exc:
+            logger.error("failed", exc, provider="ollama")
+        for i in range(20):
+            logger.debug(f"filler {i}")
+    finally:
+        logger.stop()
+        logger.set_level("INFO")
+
+    files = sorted(tmp_path.glob("blendair.log*"))
+    assert len(files) == 3
+    assert json.loads(path.read_text().splitlines()[-1])['msg'] == "filler 19"
+    lines = [json.loads(line) for f in files for line in f.read_text().splitlines()]
+    assert all(set(line) >= {'ts', 'level', 'msg', 'thread'} for line in lines)
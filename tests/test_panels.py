@@ -0,0 +1,62 @@
+import itertools
+from types import SimpleNamespace
+
+import bpy
+
+from blendair import dispatch, history, panels
+
+
+class FakeItems(list):
+    """CollectionProperty stand-in counting the rows created."""
+
+    added = 0
+
+    def add(self):
+        FakeItems.added += 1
+        item = SimpleNamespace(entry_id='', prompt='', favorite=False)
+        self.append(item)
+        return item
+
+    def move(self, src, dst):
+        self.insert(dst, self.pop(src))
+
+    def remove(self, index):
+        del self[index]
+
+
+def _setup(tmp_path, monkeypatch, count):
+    ticks = itertools.count()
+    monkeypatch.setattr(history, '_now', lambda: f'2026-01-01T00:{next(ticks):05d}')
+    store = history.HistoryStore(tmp_path / 'history.db')
+    monkeypatch.setattr(history, '_STORE', store)
+    monkeypatch.setattr(history, 'prefetch', lambda: None)
+    monkeypatch.setattr(history, 'schedule_sync', lambda: None)
+    monkeypatch.setattr(dispatch, 'submit', lambda func, **_: func())
+    monkeypatch.setattr(history, '_LISTENERS', [panels.on_history_changed])
+    for i in range(count):
+        store.add(f'prompt {i}', '')
+    scene = SimpleNamespace(name='Scene', blendair_search_query='', blendair_history_items=FakeItems(),
+                            blendair_history_index=0)
+    monkeypatch.setattr(bpy, 'data', SimpleNamespace(scenes=[scene]), raising=False)
+    monkeypatch.setattr(panels, '_history_cursors', {})
+    return store, scene
+
+
+def test_history_write_only_touches_changed_rows(tmp_path, monkeypatch):
+    store, scene = _setup(tmp_path, monkeypatch, 3 * history.PAGE_SIZE)
+    for _ in range(3):
+        panels.load_history_page(scene)
+    items = scene.blendair_history_items
+    assert len(items) == 3 * history.PAGE_SIZE
+
+    FakeItems.added = 0
+    history.record('newest', '')
+    assert FakeItems.added == 1 and items[0].prompt == 'newest'
+    assert [item.prompt for item in items[1:3]] == ['prompt 149', 'prompt 148']
+
+    old = items[120].entry_id
+    history.update_prompt_favorite(old, True)
+    history.delete_entry(items[130].entry_id)
+    assert FakeItems.added == 1 and items[120].favorite
+    assert len(items) == 3 * history.PAGE_SIZE
+    assert [item.entry_id for item in items] == [e['id'] for e in store.page(limit=len(items))[0]]
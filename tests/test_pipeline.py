@@ -0,0 +1,66 @@
+import pytest
+
+from blendair import pipeline
+
+
+def test_extracts_fenced_code():
+    text = "Here you go:\n```python\nimport bpy\nbpy.ops.mesh.primitive_cube_add()\n```\nEnjoy!"
+    prepared = pipeline.prepare(text)
+    assert prepared.source == "import bpy\nbpy.ops.mesh.primitive_cube_add()"
+    assert prepared.warnings == []
+    assert pipeline.prepare(text) is prepared  # compiled once
+
+
+def test_rejects_forbidden_code_and_warns_on_context_ops():
+    with pytest.raises(pipeline.ScriptError, match="import of 'os'"):
+        pipeline.prepare("import os\nos.remove('x')")
+    with pytest.raises(pipeline.ScriptError, match="Syntax error on line 1"):
+        pipeline.prepare("def (")
+    warnings = pipeline.prepare("import bpy\nbpy.ops.view3d.snap_cursor_to_center()").warnings
+    assert warnings and 'editor context' in warnings[0]
+
+
+def test_fetch_prepared_retries_with_error():
+    requests = []
+
+    def fetch(prompt, attempt):
+        requests.append(prompt)
+        return "x = (" if attempt == 0 else "x = 1"
+
+    prepared = pipeline.fetch_prepared(fetch, "add a cube", retries=1)
+    assert prepared.source == "x = 1"
+    assert 'Syntax error' in requests[1] and requests[1].startswith('add a cube')
+    with pytest.raises(pipeline.ScriptError):
+        pipeline.fetch_prepared(lambda p, a: "x = (", "again", retries=0)
+
+
+def _feed(text, size=3):
+    checker = pipeline.StreamChecker()
+    for start in range(0, len(text), size):
+        checker.feed(text[start:start + size])
+    return checker
+
+
+def test_stream_checker_stops_at_the_first_bad_statement():
+    good = ("Sure:\n```python\nimport bpy\nfor i in range(3):\n    bpy.ops.mesh.primitive_cube_add(\n"
+            "        location=(i, 0, 0))\nelse:\n    pass\n```\nIt's done.\n")
+    for size in (1, 4, len(good)):
+        assert _feed(good, size).text == good
+    checker = pipeline.StreamChecker()
+    with pytest.raises(pipeline.ScriptError, match="line 2: import of 'os'"):
+        for line in ["```python\n", "import bpy\n", "import os\n", "x = 1\n"] + ["y = 2\n"] * 100:
+            checker.feed(line)
+    assert checker.text.count("y = 2") == 0  # rejected before the rest arrived
+    with pytest.raises(pipeline.ScriptError, match="Syntax error on line 2"):
+        _feed("```python\nimport bpy\nx = 1 +\ny = 2\n")
+    # Prose before a fence may not parse; only fenced code is held to syntax.
+    _feed("Here's how: it doesn't need os.\n```python\nimport bpy\n```")
+
+
+def test_fetch_prepared_retries_after_a_stream_is_rejected():
+    def fetch(prompt, attempt):
+        if attempt == 0:
+            _feed("```python\nimport subprocess\nx = 1\n")
+        return "x = 1"
+
+    assert pipeline.fetch_prepared(fetch, "add a cube", retries=1).source == "x = 1"
@@ -1,8 +1,11 @@
 from blendair import prompts
 
 def test_parse_response(monkeypatch):
-    # mock get_pref and requests.post
-    class Pref: llm_endpoint = 'http://mock'
+    # mock get_pref and the pooled session's post
+    class Pref:
+        llm_provider = 'local'
+        local_llm_endpoint = 'http://mock'
+        cache_enabled = False
     monkeypatch.setattr(prompts, 'get_pref', lambda: Pref())
 
     class MockResp:
@@ -12,5 +15,47 @@ def test_parse_response(monkeypatch):
             pass
         def json(self):
             return self._json
-    monkeypatch.setattr(prompts.requests, 'post', lambda *a, **kw: MockResp())
+    class MockSession:
+        def post(self, *a, **kw):
+            return MockResp()
+    monkeypatch.setattr(prompts.transport, 'session_for', lambda prefs, name: MockSession())
     assert prompts.fetch_script('hi') == "print('ok')"
+
+
+def test_stream_openai_sse(monkeypatch):
+    class Pref:
+        llm_provider = 'openai'
+        openai_api_key = 'sk-test'
+        cache_enabled = False
+    monkeypatch.setattr(prompts, 'get_pref', lambda: Pref())
+
+    lines = [
+        'data: {"choices": [{"delta": {"content": "print("}}]}',
+        '',
+        'data: {"choices": [{"delta": {"content": "1)"}}]}',
+        'data: [DONE]',
+    ]
+
+    class MockResp:
+        def __enter__(self):
+            return self
+        def __exit__(self, *exc):
+            return False
+        def raise_for_status(self):
+            pass
+        def iter_lines(self, decode_unicode=False):
+            return iter(lines)
+
+    sent = {}
+
+    class MockSession:
+        def post(self, url, json=None, **kw):
+            sent.update(json)
+            return MockResp()
+    monkeypatch.setattr(prompts.transport, 'session_for', lambda prefs, name: MockSession())
+
+    stats = prompts.StreamStats()
+    assert list(prompts.stream_script('hi', stats)) == ['print(', '1)']
+    assert sent['stream'] is True
+    assert stats.chunks == 2 and stats.ttft is not None
+
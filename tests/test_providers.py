@@ -0,0 +1,44 @@
+from blendair import providers
+
+
+def test_registry_covers_all_providers():
+    names = {name for name, _, _ in providers.enum_items()}
+    assert {'openai', 'anthropic', 'pplx', 'replicate', 'local'} <= names
+
+
+def test_missing_key_returns_none():
+    class Pref:
+        openai_api_key = ''
+    assert providers.get_provider('openai').request(Pref(), 'hi') is None
+
+
+def test_huggingface_model_pick_and_parse():
+    class Pref:
+        huggingface_api_key = 'hf'
+    adapter = providers.get_provider('huggingface')
+    url, headers, data = adapter.request(Pref(), 'write a python script')
+    assert url.endswith('starcoder2-15b')
+    assert adapter.parse_response([{'generated_text': 'x'}]) == 'x'
+    assert adapter.parse_response({'generated_text': 'y'}) == 'y'
+
+
+def test_stream_parsers():
+    anthropic = [
+        'event: content_block_delta',
+        'data: {"type": "content_block_delta", "delta": {"text": "a"}}',
+        'data: {"type": "message_stop"}',
+    ]
+    assert list(providers.parse_anthropic_stream(anthropic)) == ['a']
+    gemini = ['data: {"candidates": [{"content": {"parts": [{"text": "b"}]}}]}']
+    assert list(providers.parse_gemini_stream(gemini)) == ['b']
+    ollama = ['{"response": "c", "done": false}', '{"response": "", "done": true}']
+    assert list(providers.parse_ollama_stream(ollama)) == ['c']
+
+
+def test_local_streams_only_known_endpoints():
+    class Pref:
+        local_llm_model = 'llama3'
+    local = providers.get_provider('local')
+    assert local.stream(Pref(), 'http://localhost:8000/generate', {}, 'hi') is None
+    url, body, parser = local.stream(Pref(), 'http://localhost:11434/api/generate', {}, 'hi')
+    assert body['stream'] is True and parser is providers.parse_ollama_stream
@@ -0,0 +1,47 @@
+import time
+
+from blendair import provider_stats, racing
+
+
+def _fetcher(delays, scripts):
+    def fetch(prompt, provider, cancel):
+        deadline = time.perf_counter() + delays[provider]
+        while time.perf_counter() < deadline:
+            if cancel.is_set():
+                return None
+            time.sleep(0.005)
+        return scripts[provider]
+    return fetch
+
+
+def test_race_returns_first_valid_script():
+    fetch = _fetcher({'fast': 0.01, 'slow': 0.2, 'broken': 0.0},
+                     {'fast': 'x = 1', 'slow': 'x = 2', 'broken': 'def ('})
+    result = racing.race('p', ['slow', 'broken', 'fast'], fetch)
+    assert result.provider == 'fast' and result.script == 'x = 1'
+    assert result.latency < 0.2
+
+
+def test_hedge_skips_backup_when_primary_is_fast():
+    calls = []
+    fetch = _fetcher({'a': 0.01, 'b': 0.01}, {'a': 'x = 1', 'b': 'x = 2'})
+    result = racing.hedge('p', 'a', 'b', lambda *args: calls.append(args[1]) or fetch(*args), delay=0.5)
+    assert result.provider == 'a' and calls == ['a']
+
+
+def test_hedge_fires_backup_after_delay():
+    fetch = _fetcher({'a': 1.0, 'b': 0.01}, {'a': 'x = 1', 'b': 'x = 2'})
+    result = racing.hedge('p', 'a', 'b', fetch, delay=0.05)
+    assert result.provider == 'b'
+
+
+def test_stats_percentiles_and_rank():
+    for latency in (0.1, 0.2, 0.3, 0.4, 1.0):
+        provider_stats.record('rank-slow', latency * 10, True)
+        provider_stats.record('rank-fast', latency, True)
+    provider_stats.record('rank-fast', 5.0, False)
+    stats = provider_stats.get('rank-fast')
+    assert stats.percentile(50) == 0.3
+    assert round(stats.error_rate, 2) == round(1 / 6, 2)
+    assert provider_stats.rank(['rank-slow', 'rank-fast']) == ['rank-fast', 'rank-slow']
+    assert sum(stats.histogram()) == 5
@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import bpy
+
+from blendair import pipeline, rewrite
+
+SELECT_LOOP = '''import bpy
+for obj in bpy.data.objects:
+    bpy.ops.object.select_all(action='DESELECT')
+    obj.select_set(True)
+    bpy.ops.transform.translate(value=(0, 0, 1))
+'''
+
+
+class FakeCollection(list):
+    """Objects with ``foreach_get``/``foreach_set`` like ``bpy_prop_collection``."""
+
+    def foreach_get(self, attr, flat):
+        for i, obj in enumerate(self):
+            flat[3 * i:3 * i + 3] = getattr(obj, attr)
+
+    def foreach_set(self, attr, flat):
+        for i, obj in enumerate(self):
+            setattr(obj, attr, list(flat[3 * i:3 * i + 3]))
+
+
+def _obj(selected=False):
+    obj = SimpleNamespace(location=[0.0, 0.0, 0.0], scale=[1.0, 1.0, 1.0], update_tag=lambda: None,
+                          selected=selected)
+    obj.select_set = lambda state: setattr(obj, 'selected', state)
+    return obj
+
+
+def _fake_ops(monkeypatch, objects, deleted):
+    def select_all(action):
+        for obj in objects:
+            obj.selected = False
+
+    def delete():
+        deleted.extend(obj for obj in objects if obj.selected)
+
+    monkeypatch.setattr(bpy, 'ops', SimpleNamespace(object=SimpleNamespace(select_all=select_all, delete=delete)))
+
+
+def test_transform_loop_is_batched(monkeypatch):
+    source, count = rewrite.rewrite_source(SELECT_LOOP)
+    assert count == 1
+    assert 'translate' not in source and "_blendair_rt.add(" in source
+    objects = FakeCollection([_obj(), _obj()])
+    monkeypatch.setattr(bpy.data, 'objects', objects, raising=False)
+    _fake_ops(monkeypatch, objects, [])
+    exec(pipeline.prepare(SELECT_LOOP, rewrite=True).code, rewrite.namespace())
+    assert [o.location for o in objects] == [[0.0, 0.0, 1.0]] * 2
+
+
+def test_batched_loop_leaves_the_selection_the_loop_did(monkeypatch):
+    # The user's selection before the loop must not be what delete() sees.
+    objects = FakeCollection([_obj(selected=True), _obj(), _obj()])
+    deleted = []
+    monkeypatch.setattr(bpy.data, 'objects', objects, raising=False)
+    _fake_ops(monkeypatch, objects, deleted)
+    source = SELECT_LOOP + "bpy.ops.object.delete()\n"
+    assert rewrite.rewrite_source(source)[1] == 1
+    exec(pipeline.prepare(source, rewrite=True).code, rewrite.namespace())
+    assert deleted == [objects[2]]
+
+
+def test_loops_reading_the_active_object_are_left_alone():
+    loop = ("for o in objs:\n"
+            "    bpy.context.view_layer.objects.active = o\n"
+            "    bpy.ops.object.modifier_add(type='SUBSURF')\n"
+            "    bpy.context.object.modifiers['Subdivision'].levels = 2\n")
+    assert rewrite.rewrite_source(loop) == (loop, 0)
+
+
+def test_active_object_ops_become_data_calls():
+    source, count = rewrite.rewrite_source(
+        "for o in objs:\n"
+        "    bpy.context.view_layer.objects.active = o\n"
+        "    bpy.ops.object.modifier_add(type='BEVEL')\n"
+        "    o.name = 'x'\n")
+    assert count == 1
+    assert "o.modifiers.new(name='Bevel', type='BEVEL')" in source
+    assert source.rstrip().endswith("bpy.context.view_layer.objects.active = o")
+
+
+def test_unsafe_loops_are_left_alone():
+    # Translate without deselecting first moves every selected object.
+    unsafe = "for o in objs:\n    o.select_set(True)\n    bpy.ops.transform.translate(value=(1, 0, 0))\n"
+    assert rewrite.rewrite_source(unsafe) == (unsafe, 0)
+    # Values computed per object cannot be hoisted out of the loop.
+    random = "for o in objs:\n    o.location = (random.random(), 0, 0)\n"
+    assert rewrite.rewrite_source(random)[1] == 0
+
+
+def test_modifier_names_match_blender_and_unknown_types_are_kept():
+    loop = ("for o in objs:\n"
+            "    bpy.context.view_layer.objects.active = o\n"
+            "    bpy.ops.object.modifier_add(type={})\n")
+    source, _ = rewrite.rewrite_source(loop.format("'SUBSURF'"))
+    assert "o.modifiers.new(name='Subdivision', type='SUBSURF')" in source
+    source, _ = rewrite.rewrite_source(loop.format("'WEIGHTED_NORMAL'"))
+    assert "name='WeightedNormal'" in source
+    for kept in ("'NODES'", "kind", "3"):
+        assert rewrite.rewrite_source(loop.format(kept))[1] == 0
+
+
+def test_translate_moves_parented_objects_in_world_space():
+    # Parent scaled by 2 on every axis: a world move of 1 is 0.5 in parent space.
+    parent = SimpleNamespace(matrix_world=[[2, 0, 0, 0], [0, 2, 0, 0], [0, 0, 2, 0], [0, 0, 0, 1]])
+    child = _obj()
+    child.parent = parent
+    child.matrix_parent_inverse = [[1, 0, 0, 0], [0, 1, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+    loose = _obj()
+    rewrite.Runtime.add(FakeCollection([child, loose]), "location", (1.0, 0.0, 2.0))
+    assert child.location == [0.5, 0.0, 1.0] and loose.location == [1.0, 0.0, 2.0]
+
+
+def test_loop_variable_read_after_the_loop_is_not_batched():
+    source = SELECT_LOOP + "print(obj.name)\n"
+    rewritten, _ = rewrite.rewrite_source(source)
+    assert "_blendair_rt.add(" not in rewritten
+    assert "for obj in bpy.data.objects:" in rewritten and "add_one(obj, 'location'" in rewritten
@@ -0,0 +1,50 @@
+from blendair import provider_stats, routing
+
+
+def test_cheapest_provider_within_slo():
+    for _ in range(provider_stats.MIN_SAMPLES):
+        provider_stats.record('route-pricey', 0.5, True, cost=0.01)
+        provider_stats.record('route-cheap-slow', 9.0, True, cost=0.0001)
+        provider_stats.record('route-cheap', 1.0, True, cost=0.001)
+    candidates = ['route-pricey', 'route-cheap-slow', 'route-cheap']
+    assert routing.choose(candidates, 'p', slo=2.0) == 'route-cheap'
+    assert routing.choose(candidates, 'p', slo=0.1) == 'route-pricey'
+
+
+def test_circuit_breaker_opens_and_recovers():
+    for _ in range(provider_stats.FAILURE_THRESHOLD):
+        provider_stats.record('route-flaky', 1.0, False)
+    breaker = provider_stats.get('route-flaky').breaker
+    assert breaker.state == 'open'
+    assert routing.choose(['route-flaky'], 'p', slo=5.0) is None
+    breaker.opened_at -= breaker.cooldown
+    assert breaker.state == 'half-open'
+    provider_stats.record('route-flaky', 1.0, True)
+    assert breaker.state == 'closed'
+
+
+def test_stats_persist(tmp_path):
+    provider_stats.record('route-saved', 0.7, True, cost=0.002)
+    path = tmp_path / 'stats.json'
+    provider_stats.save(path)
+    provider_stats._STATS.pop('route-saved')
+    provider_stats.load(path)
+    assert provider_stats.get('route-saved').mean_cost == 0.002
+
+
+def test_half_open_breaker_lets_one_trial_through():
+    for _ in range(provider_stats.FAILURE_THRESHOLD):
+        provider_stats.record('route-trial', 1.0, False)
+    breaker = provider_stats.get('route-trial').breaker
+    breaker.opened_at -= breaker.cooldown
+    assert routing.available(['route-trial']) == ['route-trial']
+    assert breaker.allow()
+    assert not breaker.allow() and routing.available(['route-trial']) == []
+    provider_stats.record('route-trial', 1.0, False)  # the trial failed: open again
+    assert breaker.state == 'open' and not breaker.allow()
+    breaker.opened_at -= breaker.cooldown
+    assert breaker.allow()
+    breaker.release()  # cancelled without an outcome
+    assert breaker.allow()
+    provider_stats.record('route-trial', 1.0, True)
+    assert breaker.state == 'closed' and breaker.allow() and breaker.allow()
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import bpy
+
+from blendair import scene_context
+
+
+class FakeObject:
+    def __init__(self, name, modifiers=(), materials=()):
+        self.name = name
+        self.type = 'MESH'
+        self.location = (0.0, 0.0, 0.0)
+        self.parent = None
+        self.modifiers = [SimpleNamespace(name=m, type=m.upper()) for m in modifiers]
+        self.material_slots = [SimpleNamespace(material=SimpleNamespace(name=m)) for m in materials]
+
+    def as_pointer(self):
+        return id(self)
+
+
+def _scene(objects):
+    return SimpleNamespace(name='Scene', frame_current=1, objects=objects)
+
+
+def test_describe_object():
+    line = scene_context.describe_object(FakeObject('Cube', ['Bevel'], ['Red']))
+    assert line == 'Cube [MESH] at (0.00, 0.00, 0.00) modifiers=Bevel:BEVEL materials=Red'
+
+
+def test_render_puts_selection_first_and_trims():
+    objects = [FakeObject(f'Obj{i}') for i in range(100)]
+    ctx = scene_context.SceneContext()
+    text = ctx.render(_scene(objects), budget=200, selected=[objects[50]], active=objects[50])
+    lines = text.splitlines()
+    assert lines[1].startswith('Obj50 ') and len(text) < 260
+    assert lines[-1].endswith('more objects')
+
+
+def test_update_refreshes_only_changed_objects(monkeypatch):
+    monkeypatch.setattr(bpy.types, 'Object', FakeObject, raising=False)
+    monkeypatch.setattr(bpy.types, 'Collection', type('Collection', (), {}), raising=False)
+    objects = [FakeObject('A'), FakeObject('B')]
+    ctx = scene_context.SceneContext()
+    ctx.build(_scene(objects))
+    objects[0].name = 'Renamed'
+    ctx.update(_scene(objects), [SimpleNamespace(id=objects[0])])
+    assert sorted(line.split()[0] for line in ctx.lines.values()) == ['B', 'Renamed']
+    assert ctx.stats()['updates'] == 1
+
+
+def test_fingerprint_ignores_frame_and_locations():
+    objects = [FakeObject('Cube', ['Bevel']), FakeObject('Lamp')]
+    ctx = scene_context.SceneContext()
+    scene = _scene(objects)
+    before = ctx.render(scene, budget=1000, selected=[objects[0]], active=objects[0])
+    scene.frame_current = 42
+    objects[0].location = (1.5, 0.0, 2.0)
+    ctx.clear()
+    after = ctx.render(scene, budget=1000, selected=[objects[0]], active=objects[0])
+    assert 'frame' not in after and before != after
+    assert scene_context.fingerprint(before) == scene_context.fingerprint(after)
+    objects[1].name = 'Sun'
+    ctx.clear()
+    renamed = ctx.render(scene, budget=1000, selected=[objects[0]], active=objects[0])
+    assert scene_context.fingerprint(renamed) != scene_context.fingerprint(after)
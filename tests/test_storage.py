@@ -0,0 +1,110 @@
+import io
+import base64
+import hashlib
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from blendair import storage
+
+PREFS = SimpleNamespace(supabase_url='https://proj.supabase.co', supabase_key='key')
+
+
+class FakeTus:
+    """In-memory TUS server; ``fail_after`` drops the response of one PATCH."""
+
+    def __init__(self, fail_after=None):
+        self.data = bytearray()
+        self.metadata = ''
+        self.patches = 0
+        self.fail_after = fail_after
+
+    @staticmethod
+    def _resp(status=204, **headers):
+        resp = requests.Response()
+        resp.status_code = status
+        resp.headers.update(headers)
+        return resp
+
+    def post(self, url, headers, timeout):
+        self.metadata = headers['Upload-Metadata']
+        return self._resp(201, Location='/storage/v1/upload/resumable/abc')
+
+    def head(self, url, headers, timeout):
+        return self._resp(200, **{'Upload-Offset': str(len(self.data))})
+
+    def patch(self, url, data, headers, timeout):
+        assert int(headers['Upload-Offset']) == len(self.data)
+        _, checksum = headers['Upload-Checksum'].split()
+        assert base64.b64decode(checksum) == hashlib.sha1(data).digest()
+        self.data += data
+        self.patches += 1
+        if self.patches == self.fail_after:
+            raise requests.ConnectionError('connection reset')
+        return self._resp(**{'Upload-Offset': str(len(self.data))})
+
+
+def test_object_keys_are_unique_and_safe():
+    first = storage.object_key('My Scene', 'model.obj')
+    assert first.startswith('My_Scene/') and first.endswith('/model.obj')
+    assert first != storage.object_key('My Scene', 'model.obj')
+    assert storage.object_key('', 'a b.glb', version='v1') == 'untitled/v1/a_b.glb'
+
+
+def test_chunked_upload_resumes_and_verifies(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, 'RESUME_BACKOFF', 0)
+    payload = bytes(range(256)) * 100
+    path = tmp_path / 'model.obj'
+    path.write_bytes(payload)
+    server = FakeTus(fail_after=2)  # server keeps chunk 2 but the reply is lost
+    progress = []
+    result = storage.upload_file(PREFS, str(path), 'p/v/model.obj', session=server,
+                                 chunk_size=4096, on_progress=lambda sent, total: progress.append(sent))
+    assert bytes(server.data) == payload
+    assert result['sha256'] == hashlib.sha256(payload).hexdigest()
+    assert progress[-1] == len(payload)
+    assert base64.b64encode(b'p/v/model.obj').decode() in server.metadata
+
+
+def test_upload_can_be_cancelled(tmp_path):
+    path = tmp_path / 'model.obj'
+    path.write_bytes(b'x' * 10000)
+    with pytest.raises(storage.UploadError, match='cancelled'):
+        storage.upload_file(PREFS, str(path), 'k', session=FakeTus(), chunk_size=4096,
+                            cancel=lambda: True)
+
+
+class FakeObjectStore:
+    """Answers GETs for one object with an ETag, honouring If-None-Match."""
+
+    def __init__(self, data, etag='"v1"'):
+        self.data = data
+        self.etag = etag
+        self.transfers = 0
+
+    def get(self, url, headers, timeout, stream):
+        resp = requests.Response()
+        if headers.get('If-None-Match') == self.etag:
+            resp.status_code = 304
+            resp.raw = io.BytesIO(b'')
+            return resp
+        self.transfers += 1
+        resp.status_code = 200
+        resp.headers.update({'ETag': self.etag, 'Content-Length': str(len(self.data))})
+        resp.raw = io.BytesIO(self.data)
+        return resp
+
+
+def test_download_streams_and_revalidates_with_etag(tmp_path):
+    prefs = SimpleNamespace(cache_dir=str(tmp_path), **vars(PREFS))
+    server = FakeObjectStore(b'glb' * 1000)
+    progress = []
+    first = storage.fetch_cached(prefs, 'model.glb', session=server,
+                                 on_progress=lambda done, total: progress.append((done, total)))
+    assert first.downloaded and open(first.path, 'rb').read() == server.data
+    assert progress[-1] == (3000, 3000)
+    again = storage.fetch_cached(prefs, 'model.glb', session=server)
+    assert not again.downloaded and again.path == first.path and server.transfers == 1
+    server.data, server.etag = b'new', '"v2"'
+    assert open(storage.fetch_cached(prefs, 'model.glb', session=server).path, 'rb').read() == b'new'
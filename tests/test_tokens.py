@@ -0,0 +1,35 @@
+from blendair import providers, tokens
+
+
+def test_count_tokens_by_family():
+    assert tokens.count_tokens('') == 0
+    assert tokens.count_tokens('add a cube', 'gpt') == 3
+    text = 'bpy.ops.mesh.primitive_cube_add(size=2)'
+    assert tokens.count_tokens(text, 'claude') >= tokens.count_tokens(text, 'gpt')
+
+
+def test_classify_sets_max_tokens():
+    assert tokens.classify('rename the cube to Box') == 'edit'
+    assert tokens.classify('add a cone') == 'create'
+    assert tokens.classify('rig the character and animate a walk cycle') == 'complex'
+    assert tokens.max_tokens_for('add a cone') == tokens.MAX_TOKENS_BY_CLASS['create']
+
+
+def test_compaction_collapses_copies_before_cutting():
+    context = "Scene 'S': 52 objects\nCamera [CAMERA] at (0.00, 0.00, 0.00)\n" + "\n".join(
+        f"Tree.{i:03d} [MESH] at ({i}.00, 0.00, 0.00) materials=Bark" for i in range(1, 51))
+    compact = tokens.compact_context(context, 40)
+    assert 'Tree.001..050 (x50) [MESH] materials=Bark' in compact
+    assert 'Camera [CAMERA]' in compact and 'at (' not in compact
+    assert tokens.count_tokens(compact) <= 40
+
+
+def test_plan_fits_small_window():
+    class Pref:
+        local_llm_context = 512
+    adapter = providers.get_provider('local')
+    context = '\n'.join(f'Object{i} [MESH]' for i in range(500))
+    plan = tokens.plan(adapter, Pref(), 'add a cone', context)
+    assert plan.max_tokens == 128
+    assert plan.prompt_tokens + plan.max_tokens <= 512
+    assert plan.context.endswith('more lines omitted')
@@ -0,0 +1,40 @@
+import json
+
+from blendair import tracing
+
+
+def test_disabled_spans_record_nothing():
+    tracing.reset()
+    tracing.set_enabled(False)
+    with tracing.span("prompt.network") as span:
+        pass
+    tracing.record("exec.script", 0.5)
+    assert span is tracing._NULL
+    assert tracing.summary() == {}
+
+
+def test_percentiles_and_chrome_export(tmp_path):
+    tracing.reset()
+    tracing.set_enabled(True)
+    try:
+        for ms in range(1, 101):
+            tracing.record("prompt.network", ms / 1000, provider="openai")
+        try:
+            with tracing.span("prompt.parse"):
+                raise ValueError("bad json")
+        except ValueError:
+            pass
+    finally:
+        tracing.set_enabled(False)
+
+    row = tracing.summary()["prompt.network"]
+    assert row["count"] == 100
+    assert (round(row["p50"], 3), row["p95"], row["p99"]) == (0.051, 0.095, 0.099)
+
+    path = tmp_path / "trace.json"
+    assert tracing.export_chrome(path) == 101
+    events = json.loads(path.read_text())["traceEvents"]
+    parse = next(e for e in events if e["name"] == "prompt.parse")
+    assert parse["ph"] == "X" and parse["cat"] == "prompt" and parse["args"]["error"] == "ValueError"
+    assert any(e["ph"] == "M" for e in events)
+    tracing.reset()
@@ -0,0 +1,96 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from blendair import transport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    # Status answered to the first request on each path; later ones get 200.
+    first_status = {}
+    delay = 0.0
+    hits = {}
+
+    def do_GET(self):
+        self._answer()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._answer()
+
+    def _answer(self):
+        hits = _Handler.hits
+        hits[self.path] = hits.get(self.path, 0) + 1
+        time.sleep(_Handler.delay)
+        status = _Handler.first_status.get(self.path, 200) if hits[self.path] == 1 else 200
+        body = b"ok"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    _Handler.first_status, _Handler.delay, _Handler.hits = {}, 0.0, {}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+    transport.close_all()
+
+
+def test_session_reuses_connections(server_url):
+    session = transport.get_session("test-reuse")
+    for _ in range(3):
+        assert session.get(f"{server_url}/", timeout=5).text == "ok"
+    stats = transport.pool_stats()["test-reuse"]
+    assert stats == {"opened": 1, "reused": 2}
+
+
+def test_post_is_only_retried_when_the_server_refused_it(server_url):
+    _Handler.first_status = {"/get-500": 500, "/post-500": 500, "/post-503": 503}
+    session = transport.get_session("test-retry", retries=1)
+    assert session.get(f"{server_url}/get-500", timeout=5).status_code == 200
+    assert session.post(f"{server_url}/post-503", json={}, timeout=5).status_code == 200
+    assert session.post(f"{server_url}/post-500", json={}, timeout=5).status_code == 500
+    assert _Handler.hits == {"/get-500": 2, "/post-503": 2, "/post-500": 1}
+
+
+def test_post_read_timeout_is_not_resent(server_url):
+    _Handler.delay = 0.3
+    session = transport.get_session("test-timeout", retries=2)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        session.post(f"{server_url}/slow", json={}, timeout=(5, 0.05))
+    time.sleep(0.4)
+    assert _Handler.hits == {"/slow": 1}
+
+
+def test_replaced_session_closes_after_in_flight_requests(server_url):
+    _Handler.delay = 0.2
+    old = transport.get_session("test-swap", retries=0)
+    closed = []
+    old.close = lambda: closed.append(True)
+    worker = threading.Thread(target=lambda: old.get(f"{server_url}/", timeout=5))
+    worker.start()
+    time.sleep(0.05)
+    assert transport.get_session("test-swap", retries=1) is not old
+    assert not closed
+    worker.join()
+    assert closed == [True]
+
+
+def test_request_timeout_uses_prefs():
+    class Pref:
+        local_llm_timeout = 45.0
+    assert transport.request_timeout(Pref()) == (transport.CONNECT_TIMEOUT_CAP, 45.0)